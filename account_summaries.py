@@ -0,0 +1,221 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, case, cast, delete, event, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import object_session
+
+from transaction_partitions import add_months, month_start
+
+MEASURES = ('txn_count', 'credits', 'debits')
+
+
+class AccountSummaries:
+    """Per-account monthly totals by transaction type, kept up to date as transactions are written.
+
+    Every transaction adds to one ``(account, month, transaction_type)``
+    row: one to its count and its amount to ``credits`` (money in) or
+    ``debits`` (money out, stored positive). Deltas are collected from ORM
+    inserts and upserted in the same database transaction; Core writers
+    call ``record()``. Opening and closing balances are derived when read,
+    from the accounts' current balances less the net of every later month,
+    so a backdated or bulk-loaded transaction never leaves a stored balance
+    stale. Summaries outlive archived transactions (see transaction_archive).
+    """
+
+    def __init__(self, db, model, Transaction, archive=None):
+        self.db = db
+        self.model = model
+        self.Transaction = Transaction
+        self.archive = archive
+
+        event.listen(Transaction, 'after_insert', self._on_transaction_insert)
+        event.listen(db.session, 'after_flush', self._after_flush)
+
+    # ---- ORM hooks ----
+
+    def _on_transaction_insert(self, mapper, connection, target):
+        object_session(target).info.setdefault('summary_rows', []).append({
+            'account_id': target.account_id,
+            'timestamp': target.timestamp,
+            'transaction_type': target.transaction_type,
+            'amount': target.amount,
+        })
+
+    def _after_flush(self, session, flush_context):
+        rows = session.info.pop('summary_rows', None)
+        if rows:
+            self.record(session, rows)
+
+    # ---- bulk writers ----
+
+    def record(self, session, transactions):
+        """Add transactions written with Core statements, which skip the ORM hooks.
+
+        ``transactions`` are the parameter dicts that were inserted; call
+        this inside the same database transaction.
+        """
+        deltas = {}
+        for row in transactions:
+            month = month_start(row.get('timestamp') or datetime.utcnow())
+            measures = deltas.setdefault((row['account_id'], month, row['transaction_type']), [0, 0.0, 0.0])
+            amount = row['amount'] or 0.0
+            measures[0] += 1
+            measures[1 if amount > 0 else 2] += abs(amount)
+        self._apply(session, deltas)
+
+    def _apply(self, session, deltas):
+        if not deltas:
+            return
+        # Sorted so concurrent writers take row locks in the same order
+        rows = [{
+            'account_id': account_id, 'month': month, 'transaction_type': transaction_type,
+            'txn_count': measures[0], 'credits': measures[1], 'debits': measures[2]
+        } for (account_id, month, transaction_type), measures in sorted(deltas.items())]
+
+        table = self.model.__table__
+        dialect = session.get_bind(self.model).dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = dialect_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['account_id', 'month', 'transaction_type'],
+                set_={name: table.c[name] + stmt.excluded[name] for name in MEASURES}
+            )
+            session.execute(stmt, rows)
+            return
+
+        # Portable fallback: increment, then insert the rows that did not exist yet
+        for row in rows:
+            result = session.execute(
+                update(table).where(
+                    table.c.account_id == row['account_id'], table.c.month == row['month'],
+                    table.c.transaction_type == row['transaction_type']
+                ).values({name: table.c[name] + row[name] for name in MEASURES})
+            )
+            if result.rowcount == 0:
+                session.execute(insert(table), row)
+
+    # ---- rebuild ----
+
+    def rebuild(self, since=None):
+        """Recompute summaries from ``transaction``, for months from ``since`` on.
+
+        Runs as one INSERT ... SELECT in the caller's transaction, with the
+        summary table locked against concurrent increments on PostgreSQL.
+        Archived transactions are no longer in the table, so archived months
+        are left as they are: ``since`` is moved up to the month after the
+        newest one. Returns the number of rows written.
+        """
+        session = self.db.session
+        Summary, Transaction = self.model, self.Transaction
+        floor = self.archive.live_since(kinds=('transactions',)) if self.archive is not None else None
+        if floor is not None and (since is None or since < floor):
+            since = floor
+        dialect = session.get_bind(Summary).dialect.name
+        if dialect == 'postgresql':
+            session.execute(text(f"LOCK TABLE {Summary.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+
+        cleared = delete(Summary)
+        if since is not None:
+            since = month_start(since)
+            cleared = cleared.where(Summary.month >= since)
+        session.execute(cleared)
+
+        if dialect == 'sqlite':
+            month = func.date(Transaction.timestamp, 'start of month')
+        else:
+            month = cast(func.date_trunc('month', Transaction.timestamp), Date)
+        query = select(
+            Transaction.account_id, month, Transaction.transaction_type,
+            func.count(Transaction.id),
+            func.coalesce(func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0.0)), 0.0),
+            func.coalesce(func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0.0)), 0.0),
+        ).where(Transaction.timestamp.is_not(None))
+        if since is not None:
+            query = query.where(Transaction.timestamp >= datetime(since.year, since.month, 1))
+        columns = ['account_id', 'month', 'transaction_type'] + list(MEASURES)
+        return session.execute(insert(Summary).from_select(
+            columns, query.group_by(Transaction.account_id, month, Transaction.transaction_type)
+        )).rowcount or 0
+
+    # ---- queries ----
+
+    def monthly(self, accounts, start=None, end=None, today=None):
+        """Month by month totals of ``accounts`` combined, oldest first.
+
+        Covers the months of ``[start, end)`` (from the first summarized
+        month when ``start`` is None, up to this month when ``end`` is
+        None), including months without transactions.
+        """
+        Summary = self.model
+        account_ids = [account.id for account in accounts]
+        # ``end`` is exclusive: a period ending on the 1st stops at the month before
+        last = month_start(end - timedelta(microseconds=1)) if end is not None else month_start(today or date.today())
+        first = month_start(start) if start is not None else None
+        if not account_ids:
+            return []
+
+        query = select(
+            Summary.month, Summary.transaction_type,
+            func.sum(Summary.txn_count), func.sum(Summary.credits), func.sum(Summary.debits)
+        ).where(Summary.account_id.in_(account_ids))
+        if first is not None:
+            # Later months are needed too: the balances are worked back from today's
+            query = query.where(Summary.month >= first)
+        rows = self.db.session.execute(query.group_by(Summary.month, Summary.transaction_type)).all()
+
+        totals = {}
+        for month, transaction_type, count, credits, debits in rows:
+            month = month if isinstance(month, date) else date.fromisoformat(str(month))
+            entry = totals.setdefault(month, {'transactions': 0, 'credits': 0.0, 'debits': 0.0, 'by_type': {}})
+            entry['transactions'] += int(count or 0)
+            entry['credits'] += float(credits or 0.0)
+            entry['debits'] += float(debits or 0.0)
+            entry['by_type'][transaction_type] = {
+                'transactions': int(count or 0),
+                'credits': round(float(credits or 0.0), 2),
+                'debits': round(float(debits or 0.0), 2),
+            }
+        if first is None:
+            first = min(totals, default=last)
+
+        closing = sum(account.balance or 0.0 for account in accounts)
+        closing -= sum(t['credits'] - t['debits'] for month, t in totals.items() if month > last)
+        months = []
+        month = last
+        while month >= first:
+            entry = totals.get(month, {'transactions': 0, 'credits': 0.0, 'debits': 0.0, 'by_type': {}})
+            opening = closing - (entry['credits'] - entry['debits'])
+            months.append({
+                'month': month.strftime('%Y-%m'),
+                'opening_balance': round(opening, 2),
+                'closing_balance': round(closing, 2),
+                'credits': round(entry['credits'], 2),
+                'debits': round(entry['debits'], 2),
+                'transactions': entry['transactions'],
+                'by_type': entry['by_type'],
+            })
+            closing = opening
+            month = add_months(month, -1)
+        months.reverse()
+        return months
+
+    def header(self, accounts, start=None, end=None, today=None):
+        """Statement totals over the whole months spanning ``[start, end)``, or None without data"""
+        months = self.monthly(accounts, start, end, today)
+        if not months:
+            return None
+        by_type = {}
+        for entry in months:
+            for transaction_type, measures in entry['by_type'].items():
+                by_type[transaction_type] = by_type.get(transaction_type, 0) + measures['transactions']
+        return {
+            'first_month': months[0]['month'],
+            'last_month': months[-1]['month'],
+            'opening_balance': months[0]['opening_balance'],
+            'closing_balance': months[-1]['closing_balance'],
+            'credits': round(sum(entry['credits'] for entry in months), 2),
+            'debits': round(sum(entry['debits'] for entry in months), 2),
+            'transactions': sum(entry['transactions'] for entry in months),
+            'by_type': dict(sorted(by_type.items())),
+        }
@@ -0,0 +1,210 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, inspect, tuple_
+
+
+def serialize_alert(alert):
+    return {
+        'id': alert.id,
+        'transaction_id': alert.transaction_id,
+        'alert_type': alert.alert_type,
+        'severity': alert.severity,
+        'description': alert.description,
+        'is_resolved': bool(alert.is_resolved),
+        'created_at': alert.created_at.isoformat() if alert.created_at else None,
+        'resolved_at': alert.resolved_at.isoformat() if alert.resolved_at else None,
+    }
+
+
+# Resolutions are re-read this far behind the newest one seen: another
+# server's clock, or a slow commit, can land a row behind the high-water mark
+RESOLVED_LOOKBACK = timedelta(seconds=30)
+TAIL_PAGE_SIZE = 500
+
+
+def format_sse(event_name, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_name}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class AlertBroadcaster:
+    """In-process fan-out of fraud alert events to Server-Sent Event streams.
+
+    Alerts committed by this process are published straight from ORM
+    events. One tail thread per process (not per admin) picks up alerts
+    written elsewhere, such as other workers or the billing job, by
+    watching the id and resolved_at high-water marks. Each subscriber gets
+    a bounded queue; a subscriber that stops reading loses old events
+    instead of slowing everyone else down.
+    """
+
+    def __init__(self, app, db, model, queue_size=100, poll_interval=2.0):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=2000)
+        self._recent_set = set()
+        self._tail_thread = None
+        self._last_id = None
+        self._last_resolved_at = None
+        self._resolved_seen = {}
+
+        event.listen(model, 'after_insert', self._on_insert)
+        event.listen(model, 'after_update', self._on_update)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_soft_rollback', self._after_rollback)
+
+    # ---- subscribers ----
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        self._ensure_tail()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, event_name, data):
+        key = (event_name, data.get('id'))
+        with self._lock:
+            if key in self._recent_set:
+                return
+            if len(self._recent) == self._recent.maxlen:
+                self._recent_set.discard(self._recent[0])
+            self._recent.append(key)
+            self._recent_set.add(key)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event_name, data))
+            except queue.Full:
+                # Drop the oldest event for a slow reader rather than block the publisher
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait((event_name, data))
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def stream(self, subscriber, max_seconds=300, heartbeat=15, backlog=()):
+        """Yield SSE frames for one subscriber until ``max_seconds`` elapse.
+
+        Capping the connection lifetime bounds how long a worker thread is
+        held; EventSource reconnects on its own and resumes from Last-Event-ID.
+        """
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield "retry: 3000\n\n"
+            for alert in backlog:
+                yield format_sse('created', alert, event_id=alert['id'])
+            while time.monotonic() < deadline:
+                try:
+                    event_name, data = subscriber.get(timeout=min(heartbeat, max(0.1, deadline - time.monotonic())))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                event_id = data['id'] if event_name == 'created' else None
+                yield format_sse(event_name, data, event_id=event_id)
+        finally:
+            self.unsubscribe(subscriber)
+
+    # ---- ORM hooks ----
+
+    # Alerts are serialized at flush time because attributes are expired
+    # (and SQL cannot be emitted) by the time after_commit runs
+
+    def _on_insert(self, mapper, connection, target):
+        self._pending(target).append(('created', serialize_alert(target)))
+
+    def _on_update(self, mapper, connection, target):
+        history = inspect(target).attrs.is_resolved.history
+        if history.added and history.added[0]:
+            self._pending(target).append(('resolved', serialize_alert(target)))
+
+    def _pending(self, target):
+        session = inspect(target).session
+        return session.info.setdefault('alert_events', [])
+
+    def _after_commit(self, session):
+        events = session.info.pop('alert_events', None)
+        if not events or not self._subscribers:
+            return
+        for event_name, data in events:
+            self.publish(event_name, data)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('alert_events', None)
+
+    # ---- cross-process tail ----
+
+    def _ensure_tail(self):
+        with self._lock:
+            if self._tail_thread is not None:
+                return
+            self._tail_thread = threading.Thread(target=self._tail, name='alert-stream-tail', daemon=True)
+            self._tail_thread.start()
+
+    def _tail(self):
+        Alert = self.model
+        while True:
+            time.sleep(self.poll_interval)
+            if not self._subscribers:
+                self._last_id = None
+                continue
+            try:
+                with self.app.app_context():
+                    if self._last_id is None:
+                        self._last_id = self.db.session.query(func.max(Alert.id)).scalar() or 0
+                        self._last_resolved_at = datetime.utcnow()
+                        self._resolved_seen = {}
+                        continue
+                    created = Alert.query.filter(Alert.id > self._last_id)\
+                        .order_by(Alert.id).limit(TAIL_PAGE_SIZE).all()
+                    for alert in created:
+                        self.publish('created', serialize_alert(alert))
+                        self._last_id = alert.id
+                    self._tail_resolved()
+            except Exception as e:
+                print("Alert stream error:", e)
+
+    def _tail_resolved(self):
+        """Publish resolutions since the lookback window, paging on (resolved_at, id).
+
+        A bulk resolve stamps one resolved_at on every row, so the
+        timestamp alone cannot be a cursor.
+        """
+        Alert = self.model
+        cursor = (self._last_resolved_at - RESOLVED_LOOKBACK, 0)
+        while True:
+            page = Alert.query.filter(tuple_(Alert.resolved_at, Alert.id) > cursor)\
+                .order_by(Alert.resolved_at, Alert.id).limit(TAIL_PAGE_SIZE).all()
+            for alert in page:
+                if self._resolved_seen.get(alert.id) != alert.resolved_at:
+                    self._resolved_seen[alert.id] = alert.resolved_at
+                    self.publish('resolved', serialize_alert(alert))
+            if page:
+                cursor = (page[-1].resolved_at, page[-1].id)
+                self._last_resolved_at = max(self._last_resolved_at, page[-1].resolved_at)
+            if len(page) < TAIL_PAGE_SIZE:
+                break
+        horizon = self._last_resolved_at - RESOLVED_LOOKBACK
+        self._resolved_seen = {i: at for i, at in self._resolved_seen.items() if at > horizon}
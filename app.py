@@ -1,28 +1,47 @@
+import hmac
 import os
 import random
-import smtplib
 import time
 import io
-from datetime import datetime
+import click
+from concurrent.futures import TimeoutError as HashTimeout
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 from flask import (
     Flask, render_template, request, jsonify, redirect, url_for, flash,
-    session, send_file
+    session, send_file, abort, g, Response
 )
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text, update
+from sqlalchemy.orm import joinedload
 from flask_migrate import Migrate
 from flask_login import (
     LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
 
 from fraud_detection import FraudDetector
+from cache import QueryCache, create_backend
+from passwords import PasswordHasher, HasherBusy
+from mailer import EmailOutbox
+from billing import BillingEngine
+from alert_stream import AlertBroadcaster, serialize_alert
+from fraud_rollups import DIMENSIONS, FraudRollups
+from transaction_search import SearchError, TransactionSearch
+from data_versions import DataVersions, code_fingerprint
+from assets import AssetPipeline, build_assets
+from template_cache import TemplateCaching
+from metrics import AppMetrics, MetricsRegistry
+from sql_profiler import SQLProfiler
+from request_profiler import RequestProfiler
+from rate_limit import RATE_LIMIT_DEFAULTS, RateLimited, RateLimiter, create_buckets
+from transaction_partitions import Period, TransactionPartitions
+from transaction_archive import TransactionArchive
+from account_summaries import AccountSummaries
+from sqlite_tuning import SQLITE_DEFAULTS, configure_sqlite, immediate_transaction
+from db_routing import (
+    ReplicaRouter, RoutingSession, engine_options, normalize_database_url, replica_binds
+)
 
 
 # ---------------- CONFIG ----------------
@@ -30,24 +49,91 @@ load_dotenv()
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key')
 
-database_url = os.getenv('DATABASE_URL')
-if database_url and database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://', 1)
+database_url = normalize_database_url(os.getenv('DATABASE_URL'))
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url or 'sqlite:///banking_system.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options('DB')
+replica_urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+app.config['SQLALCHEMY_BINDS'] = replica_binds(replica_urls, engine_options('DB_REPLICA'))
+app.config['DB_REPLICA_STICKY_SECONDS'] = float(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+for key, default in SQLITE_DEFAULTS.items():
+    app.config[key] = type(default)(os.getenv(key, default))
+app.config['CACHE_URL'] = os.getenv('CACHE_URL', 'memory://')
+app.config['CACHE_TTL'] = int(os.getenv('CACHE_TTL', 60))
+app.config['CACHE_MAX_ENTRIES'] = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+app.config['PASSWORD_HASH_ALGORITHM'] = os.getenv('PASSWORD_HASH_ALGORITHM', 'bcrypt')
+app.config['PASSWORD_BCRYPT_ROUNDS'] = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None
+app.config['PASSWORD_HASH_MAX_QUEUE'] = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 64))
+app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'localhost')
+app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
+app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
+app.config['MAIL_SENDER'] = os.getenv('MAIL_SENDER', app.config['MAIL_USERNAME'] or 'no-reply@securebank.local')
+app.config['MAIL_SENDER_NAME'] = os.getenv('MAIL_SENDER_NAME', 'SecureBank')
+app.config['MAIL_OUTBOX_WORKERS'] = int(os.getenv('MAIL_OUTBOX_WORKERS', 1))
+app.config['MAIL_BATCH_SIZE'] = int(os.getenv('MAIL_BATCH_SIZE', 50))
+app.config['MAIL_POLL_INTERVAL'] = float(os.getenv('MAIL_POLL_INTERVAL', 5))
+app.config['MAIL_MAX_ATTEMPTS'] = int(os.getenv('MAIL_MAX_ATTEMPTS', 6))
+app.config['MAIL_RETRY_BACKOFF'] = float(os.getenv('MAIL_RETRY_BACKOFF', 30))
+app.config['MAIL_MAX_BACKOFF'] = float(os.getenv('MAIL_MAX_BACKOFF', 3600))
+app.config['MAIL_CLAIM_LEASE'] = int(os.getenv('MAIL_CLAIM_LEASE', 600))
+app.config['BILLING_CHUNK_SIZE'] = int(os.getenv('BILLING_CHUNK_SIZE', 500))
+app.config['ANALYTICS_ROLLUP_SHARDS'] = int(os.getenv('ANALYTICS_ROLLUP_SHARDS', 8))
+app.config['ALERT_STREAM_MAX_SECONDS'] = int(os.getenv('ALERT_STREAM_MAX_SECONDS', 300))
+app.config['ALERT_STREAM_HEARTBEAT'] = int(os.getenv('ALERT_STREAM_HEARTBEAT', 15))
+app.config['ALERT_STREAM_POLL_SECONDS'] = float(os.getenv('ALERT_STREAM_POLL_SECONDS', 2))
+app.config['FRAGMENT_CACHE_URL'] = os.getenv('FRAGMENT_CACHE_URL', app.config['CACHE_URL'])
+app.config['FRAGMENT_CACHE_TTL'] = int(os.getenv('FRAGMENT_CACHE_TTL', 300))
+app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = os.getenv('TEMPLATE_BYTECODE_CACHE_DIR', '')
+app.config['FRAUD_MODEL_WARMUP'] = os.getenv('FRAUD_MODEL_WARMUP', 'background')
+app.config['METRICS_DIR'] = os.getenv('METRICS_DIR', '')
+app.config['METRICS_FLUSH_SECONDS'] = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN', '')
+app.config['SQL_PROFILER'] = os.getenv('SQL_PROFILER', 'off').lower() in ('1', 'on', 'true', 'yes')
+app.config['SQL_SLOW_QUERY_MS'] = float(os.getenv('SQL_SLOW_QUERY_MS', 200))
+app.config['SQL_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 5))
+app.config['PROFILER_DIR'] = os.getenv('PROFILER_DIR', os.path.join(app.instance_path, 'profiles'))
+app.config['PROFILER_POLL_SECONDS'] = float(os.getenv('PROFILER_POLL_SECONDS', 1))
+app.config['RATE_LIMIT_URL'] = os.getenv('RATE_LIMIT_URL', 'memory://')
+app.config['TRANSACTION_HISTORY_MONTHS'] = int(os.getenv('TRANSACTION_HISTORY_MONTHS', 12))
+app.config['TRANSACTION_PARTITION_MONTHS_AHEAD'] = int(os.getenv('TRANSACTION_PARTITION_MONTHS_AHEAD', 3))
+app.config['ARCHIVE_DIR'] = os.getenv('ARCHIVE_DIR', os.path.join(app.instance_path, 'archive'))
+app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 730))
+for key, default in RATE_LIMIT_DEFAULTS.items():
+    app.config[key] = os.getenv(key, default)
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+db_router = ReplicaRouter(app, db)
+with app.app_context():
+    for engine in db.engines.values():
+        configure_sqlite(engine, app.config)
+query_cache = QueryCache(db, create_backend(
+    app.config['CACHE_URL'],
+    max_entries=app.config['CACHE_MAX_ENTRIES'],
+    ttl=app.config['CACHE_TTL']
+))
 migrate = Migrate(app, db)
+asset_pipeline = AssetPipeline(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
+password_hasher = PasswordHasher(
+    algorithm=app.config['PASSWORD_HASH_ALGORITHM'],
+    bcrypt_rounds=app.config['PASSWORD_BCRYPT_ROUNDS'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_queue=app.config['PASSWORD_HASH_MAX_QUEUE']
+)
 fraud_detector = FraudDetector()
+if app.config['FRAUD_MODEL_WARMUP'] == 'eager':
+    fraud_detector.warm_up()
 
 # ---------------- MODELS ----------------
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     first_name = db.Column(db.String(50), nullable=False)
     last_name = db.Column(db.String(50), nullable=False)
     phone = db.Column(db.String(20))
@@ -86,16 +172,23 @@ class Account(db.Model):
 
 
 class Transaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_transaction_account_id_timestamp', 'account_id', 'timestamp'),
+        db.Index('ix_transaction_timestamp', 'timestamp'),
+        db.Index('ix_transaction_amount', 'amount'),
+        db.Index('ix_transaction_ip_address', 'ip_address'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     transaction_type = db.Column(db.String(20), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(200))
     account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False)
     recipient_account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=True)
-    card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=True)
+    card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=True, index=True)
     subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.id'), nullable=True)
     upi_id = db.Column(db.Integer, db.ForeignKey('upi.id'), nullable=True)
-    related_transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=True)
+    related_transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=True, index=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     is_fraudulent = db.Column(db.Boolean, default=False)
     fraud_score = db.Column(db.Float, default=0.0)
@@ -110,14 +203,19 @@ class Transaction(db.Model):
 
 
 class FraudAlert(db.Model):
+    __table_args__ = (
+        db.Index('ix_fraud_alert_created_at_id', 'created_at', 'id'),
+        db.Index('ix_fraud_alert_resolved_created_at', 'is_resolved', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=False)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=False, index=True)
     alert_type = db.Column(db.String(50), nullable=False)
     severity = db.Column(db.String(20), nullable=False)
     description = db.Column(db.Text, nullable=False)
     is_resolved = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    resolved_at = db.Column(db.DateTime, nullable=True)
+    resolved_at = db.Column(db.DateTime, nullable=True, index=True)
     resolved_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
 
 
@@ -134,6 +232,8 @@ class Card(db.Model):
 
 
 class Subscription(db.Model):
+    __table_args__ = (db.Index('ix_subscription_status_next_billing', 'status', 'next_billing_date'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     amount = db.Column(db.Float, nullable=False)
@@ -142,7 +242,9 @@ class Subscription(db.Model):
     account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=True)
     card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default="active")
+    status = db.Column(db.String(20), default="active")  # active, past_due, canceled
+    next_billing_date = db.Column(db.DateTime, default=datetime.utcnow)
+    last_billed_at = db.Column(db.DateTime, nullable=True)
 
 
 class UPI(db.Model):
@@ -151,11 +253,173 @@ class UPI(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class FraudRollup(db.Model):
+    """Daily fraud analytics counters per dimension value, maintained by FraudRollups"""
+    __tablename__ = 'fraud_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'dimension', 'value', 'shard', name='uq_fraud_rollup_bucket'),
+        db.Index('ix_fraud_rollup_dimension_day', 'dimension', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    dimension = db.Column(db.String(30), nullable=False)  # all, transaction_type, account_type, hour_of_day, alert_severity
+    value = db.Column(db.String(50), nullable=False)
+    shard = db.Column(db.Integer, nullable=False, default=0)
+    txn_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_sum = db.Column(db.Float, nullable=False, default=0.0)
+    flagged_count = db.Column(db.Integer, nullable=False, default=0)
+    alert_count = db.Column(db.Integer, nullable=False, default=0)
+
+class AccountMonthlySummary(db.Model):
+    """Monthly totals per account and transaction type, maintained by AccountSummaries"""
+    __tablename__ = 'account_monthly_summary'
+    __table_args__ = (
+        db.UniqueConstraint('account_id', 'month', 'transaction_type', name='uq_account_monthly_summary_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id', ondelete='CASCADE'), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # first day of the month
+    transaction_type = db.Column(db.String(20), nullable=False)
+    txn_count = db.Column(db.Integer, nullable=False, default=0)
+    credits = db.Column(db.Float, nullable=False, default=0.0)
+    debits = db.Column(db.Float, nullable=False, default=0.0)  # money out, as a positive total
+
+class DataVersion(db.Model):
+    """Write counter per user/account scope, used for ETags (see data_versions.py)"""
+    __tablename__ = 'data_version'
+
+    scope = db.Column(db.String(64), primary_key=True)  # "user:<id>" or "account:<id>"
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class EmailMessage(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    claim_token = db.Column(db.String(32), nullable=True, index=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+
+email_outbox = EmailOutbox(app, db, EmailMessage)
+data_versions = DataVersions(
+    db, DataVersion, Account,
+    account_models=(Transaction,),
+    user_models=(User, Card, UPI, Subscription),
+    salt=code_fingerprint(app.root_path)
+)
+transaction_archive = TransactionArchive(
+    db, app.config['ARCHIVE_DIR'], Transaction, FraudAlert, Account, User, versions=data_versions
+)
+fraud_rollups = FraudRollups(
+    db, FraudRollup, Transaction, Account, FraudAlert, shards=app.config['ANALYTICS_ROLLUP_SHARDS'],
+    archive=transaction_archive
+)
+account_summaries = AccountSummaries(db, AccountMonthlySummary, Transaction, archive=transaction_archive)
+transaction_search = TransactionSearch(db, Transaction, Account, archive=transaction_archive)
+template_caching = TemplateCaching(
+    app,
+    create_backend(app.config['FRAGMENT_CACHE_URL'], max_entries=app.config['CACHE_MAX_ENTRIES'],
+                   ttl=app.config['FRAGMENT_CACHE_TTL']),
+    data_versions,
+    scope=lambda: [f"user:{current_user.id}"] if current_user.is_authenticated else None,
+    ttl=app.config['FRAGMENT_CACHE_TTL'],
+    bytecode_dir=app.config['TEMPLATE_BYTECODE_CACHE_DIR']
+)
+billing_engine = BillingEngine(
+    app, db, fraud_detector, Subscription, Account, Card, Transaction, FraudAlert,
+    query_cache=query_cache, rollups=fraud_rollups, summaries=account_summaries, versions=data_versions,
+    chunk_size=app.config['BILLING_CHUNK_SIZE']
+)
+alert_broadcaster = AlertBroadcaster(
+    app, db, FraudAlert, poll_interval=app.config['ALERT_STREAM_POLL_SECONDS']
+)
+app_metrics = AppMetrics(
+    app, db,
+    MetricsRegistry(app.config['METRICS_DIR'] or None, flush_interval=app.config['METRICS_FLUSH_SECONDS']),
+    fraud_detector, Transaction, FraudAlert
+)
+sql_profiler = SQLProfiler(
+    app, db,
+    enabled=app.config['SQL_PROFILER'],
+    slow_query_ms=app.config['SQL_SLOW_QUERY_MS'],
+    n_plus_one_threshold=app.config['SQL_N_PLUS_ONE_THRESHOLD']
+)
+request_profiler = RequestProfiler(
+    app, app.config['PROFILER_DIR'], poll_interval=app.config['PROFILER_POLL_SECONDS']
+)
+rate_limiter = RateLimiter(app, create_buckets(app.config['RATE_LIMIT_URL']))
+transaction_partitions = TransactionPartitions(db, months_ahead=app.config['TRANSACTION_PARTITION_MONTHS_AHEAD'])
+
+query_cache.register(User)
+query_cache.register(Account, lookups=('account_number', 'user_id'), volatile=('balance',))
+query_cache.register(UPI, lookups=('upi_id', 'user_id'))
+query_cache.register(FraudAlert, aggregates=('fraud_alert:summary',))
+
+
+@app.errorhandler(RateLimited)
+def rate_limited(e):
+    headers = {'Retry-After': str(int(e.retry_after) + 1)}
+    if request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'error': e.description, 'retry_after': round(e.retry_after, 1)}), 429, headers
+    return render_template('rate_limited.html', message=e.description), 429, headers
+
+
+@app.before_request
+def warm_up_fraud_models():
+    # Models load in a background thread, so the worker serves pages meanwhile
+    if app.config['FRAUD_MODEL_WARMUP'] == 'background':
+        fraud_detector.warm_up(background=True)
+
 
 # ---------------- LOGIN MANAGER ----------------
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return query_cache.get(User, user_id)
+
+
+# ---------------- CONDITIONAL GET SCOPES ----------------
+def user_scope(**kwargs):
+    return [f"user:{current_user.id}"]
+
+
+def account_scope(account_id):
+    account = query_cache.get(Account, account_id)
+    if account is None or (account.user_id != current_user.id and not current_user.is_admin):
+        return None
+    return [f"account:{account_id}", f"user:{current_user.id}"]
+
+
+def transactions_scope(**kwargs):
+    account_id = request.args.get('account_id', type=int)
+    return account_scope(account_id) if account_id else user_scope()
+
+
+def with_archived(transactions, account_ids, period):
+    """Add the archived transactions of ``account_ids`` (None for all) in ``period``, newest first"""
+    archived = transaction_archive.statement_rows(account_ids, period.start, period.end)
+    if not archived:
+        return transactions
+    return sorted(transactions + archived, key=lambda t: t.timestamp, reverse=True)
+
+
+def requested_period():
+    """The period of transactions asked for in the query string (default: recent months)"""
+    try:
+        return Period.from_args(request.args, app.config['TRANSACTION_HISTORY_MONTHS'])
+    except ValueError as e:
+        abort(400, description=str(e))
 
 
 # ---------------- ROUTES ----------------
@@ -169,7 +433,6 @@ def register():
     if request.method == 'POST':
         username = request.form['username']
         email = request.form['email']
-        password = generate_password_hash(request.form['password'])
         first_name = request.form['first_name']
         last_name = request.form['last_name']
 
@@ -177,6 +440,15 @@ def register():
             flash("Username or email already exists!", "danger")
             return redirect(url_for('register'))
 
+        try:
+            password = password_hasher.hash(request.form['password'])
+        except ValueError as e:
+            flash(str(e), "danger")
+            return redirect(url_for('register'))
+        except (HasherBusy, HashTimeout):
+            flash("The server is busy. Please try again in a moment.", "warning")
+            return redirect(url_for('register'))
+
         new_user = User(username=username, email=email,
                         password_hash=password, first_name=first_name, last_name=last_name)
         db.session.add(new_user)
@@ -187,13 +459,26 @@ def register():
 
 
 @app.route('/login', methods=['GET', 'POST'])
+@rate_limiter.limit('login')
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
 
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password_hash, password):
+        try:
+            valid = bool(user) and password_hasher.verify(user.password_hash, password)
+            if valid and password_hasher.needs_rehash(user.password_hash):
+                # Transparently upgrade the stored hash to the configured algorithm/cost
+                try:
+                    user.password_hash = password_hasher.hash(password)
+                    db.session.commit()
+                except ValueError:
+                    pass
+        except (HasherBusy, HashTimeout):
+            flash("The server is busy. Please try again in a moment.", "warning")
+            return render_template('login.html'), 503
+        if valid:
             login_user(user)
             flash("Logged in successfully!", "success")
             return redirect(url_for('dashboard'))
@@ -210,9 +495,11 @@ def logout():
 
 
 @app.route('/dashboard')
+@db_router.read_only
 @login_required
+@data_versions.conditional(user_scope)
 def dashboard():
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = query_cache.list_by(Account, 'user_id', current_user.id)
     recent_transactions = []
     for account in accounts:
         transactions = Transaction.query.filter_by(account_id=account.id)\
@@ -221,7 +508,7 @@ def dashboard():
     recent_transactions.sort(key=lambda x: x.timestamp, reverse=True)
     recent_transactions = recent_transactions[:10]
     cards = Card.query.filter_by(user_id=current_user.id).all()
-    upis = current_user.upis
+    upis = query_cache.list_by(UPI, 'user_id', current_user.id)
     return render_template('dashboard.html', accounts=accounts, transactions=recent_transactions, cards=cards, upis=upis)
 
 # ---------------- PROFILE ROUTES ----------------
@@ -229,7 +516,7 @@ def dashboard():
 @app.route('/profile')
 @login_required
 def profile():
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = query_cache.list_by(Account, 'user_id', current_user.id)
     return render_template('profile.html', accounts=accounts)
 
 
@@ -291,7 +578,7 @@ def create_account():
 @app.route('/profile/delete_account/<int:account_id>', methods=['POST'])
 @login_required
 def delete_account(account_id):
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = query_cache.list_by(Account, 'user_id', current_user.id)
     account = Account.query.filter_by(id=account_id, user_id=current_user.id).first()
 
     if not account:
@@ -317,17 +604,24 @@ def delete_account(account_id):
     return redirect(url_for('profile'))
 
 @app.route('/account/<int:account_id>')
+@db_router.read_only
 @login_required
+@data_versions.conditional(account_scope)
 def account_detail(account_id):
-    account = Account.query.get_or_404(account_id)
+    account = query_cache.get(Account, account_id) or abort(404)
     if account.user_id != current_user.id and not current_user.is_admin:
         flash('Access denied', 'danger')
         return redirect(url_for('dashboard'))
-    transactions = Transaction.query.filter_by(account_id=account.id).order_by(Transaction.timestamp.desc()).all()
-    return render_template('account_detail.html', account=account, transactions=transactions)
+    # Bounded by time, so a partitioned table only reads the months asked for
+    period = requested_period()
+    transactions = Transaction.query.filter(Transaction.account_id == account.id, *period.filter(Transaction.timestamp))\
+        .order_by(Transaction.timestamp.desc()).all()
+    return render_template('account_detail.html', account=account, transactions=transactions, period=period)
 
 
 @app.route('/transfer', methods=['GET', 'POST'])
+@rate_limiter.limit('transfer')
+@immediate_transaction
 @login_required
 def transfer():
     if request.method == 'POST':
@@ -337,7 +631,9 @@ def transfer():
         description = request.form.get('description')
 
         from_account = Account.query.get(from_account_id)
-        to_account = Account.query.filter_by(account_number=to_account_number).first()
+        # Only the number -> id mapping is cached; balances are always read fresh here
+        to_account_id = query_cache.get_id_by(Account, 'account_number', to_account_number)
+        to_account = db.session.get(Account, to_account_id) if to_account_id else None
 
         if not from_account or from_account.user_id != current_user.id:
             flash('Invalid source account', 'danger')
@@ -373,7 +669,7 @@ def transfer():
         withdrawal.is_fraudulent = fraud_score > 0.7
         if withdrawal.is_fraudulent:
             alert = FraudAlert(
-                transaction_id=withdrawal.id,
+                transaction=withdrawal,
                 alert_type='High Fraud Score',
                 severity='high',
                 description=f'Transaction flagged with fraud score: {fraud_score:.3f}'
@@ -389,11 +685,13 @@ def transfer():
         flash('Transfer completed successfully', 'success')
         return redirect(url_for('dashboard'))
 
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = query_cache.list_by(Account, 'user_id', current_user.id)
     return render_template('transfer.html', accounts=accounts)
 
 
 @app.route('/deposit', methods=['GET', 'POST'])
+@rate_limiter.limit('deposit')
+@immediate_transaction
 @login_required
 def deposit():
     if request.method == 'POST':
@@ -420,11 +718,13 @@ def deposit():
         flash(f'Deposit of ${amount:.2f} successful!', 'success')
         return redirect(url_for('dashboard'))
 
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = query_cache.list_by(Account, 'user_id', current_user.id)
     return render_template('deposit.html', accounts=accounts)
 
 
 @app.route('/withdraw', methods=['GET', 'POST'])
+@rate_limiter.limit('withdraw')
+@immediate_transaction
 @login_required
 def withdraw():
     if request.method == 'POST':
@@ -454,12 +754,13 @@ def withdraw():
         flash(f'Withdrawal of ₹{amount:.2f} successful!', 'success')
         return redirect(url_for('dashboard'))
 
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = query_cache.list_by(Account, 'user_id', current_user.id)
     return render_template('withdraw.html', accounts=accounts)
 
 from flask import jsonify
 
 @app.route('/card/delete/<int:card_id>', methods=['POST'])
+@immediate_transaction
 @login_required
 def delete_card(card_id):
     card = Card.query.get_or_404(card_id)
@@ -471,10 +772,52 @@ def delete_card(card_id):
         return jsonify({"success": False, "error": "Access denied"}), 403
 from flask import request
 
+def card_summaries(user_id):
+    """A user's cards with their account and per-card transaction aggregates, in one query"""
+    stats = db.session.query(
+        Transaction.card_id.label('card_id'),
+        db.func.count(Transaction.id).label('transaction_count'),
+        db.func.sum(db.case((Transaction.is_fraudulent.is_(True), 1), else_=0)).label('fraudulent_count'),
+        db.func.max(Transaction.timestamp).label('last_used')
+    ).join(Card, Card.id == Transaction.card_id)\
+     .filter(Card.user_id == user_id)\
+     .group_by(Transaction.card_id).subquery()
+    return db.session.query(
+        Card.id, Card.card_number, Card.expiry_date, Card.cvv, Card.blocked, Card.created_at,
+        Account.id.label('account_id'), Account.account_number, Account.account_type, Account.balance,
+        stats.c.transaction_count, stats.c.fraudulent_count, stats.c.last_used
+    ).join(Account, Card.account_id == Account.id)\
+     .outerjoin(stats, stats.c.card_id == Card.id)\
+     .filter(Card.user_id == user_id)\
+     .order_by(Card.id).all()
+
+
+def serialize_card(card):
+    return {
+        "id": card.id,
+        "card_number": card.card_number,
+        "expiry_date": card.expiry_date,
+        "cvv": card.cvv,
+        "account_id": card.account_id,
+        "account_number": card.account_number,
+        "account_type": card.account_type,
+        "balance": card.balance,
+        "first_name": current_user.first_name,
+        "last_name": current_user.last_name,
+        "blocked": bool(card.blocked),
+        "created_at": card.created_at.strftime("%b %Y") if card.created_at else None,
+        "transaction_count": card.transaction_count or 0,
+        "fraudulent_count": int(card.fraudulent_count or 0),
+        "last_used": card.last_used.isoformat() if card.last_used else None
+    }
+
+
 @app.route('/cards', methods=['GET', 'POST'])
+@db_router.read_only
 @login_required
+@data_versions.conditional(user_scope)
 def cards():
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = query_cache.list_by(Account, 'user_id', current_user.id)
 
     if request.method == 'POST':
         card_number = request.form.get('card_number')
@@ -504,59 +847,21 @@ def cards():
         db.session.commit()
 
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return jsonify({
-                "success": True,
-                "card": {
-                    "id": new_card.id,
-                    "card_number": new_card.card_number,
-                    "expiry_date": new_card.expiry_date,
-                    "cvv": new_card.cvv,
-                    "account_id": new_card.account.id,
-                    "account_number": new_card.account.account_number,
-                    "account_type": new_card.account.account_type,
-                    "balance": new_card.account.balance,
-                    "first_name": current_user.first_name,
-                    "last_name": current_user.last_name,
-                    "blocked": new_card.blocked,
-                    "created_at": new_card.created_at.strftime("%b %Y"),
-                    "transactions": [
-                        {"is_fraudulent": t.is_fraudulent} for t in new_card.transactions
-                    ]
-                }
-            })
+            card = next(c for c in card_summaries(current_user.id) if c.id == new_card.id)
+            return jsonify({"success": True, "card": serialize_card(card)})
 
         flash('Card added successfully!', 'success')
         return redirect(url_for('cards'))
 
-    user_cards = Card.query.filter_by(user_id=current_user.id).all()
-
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({
-            "cards": [
-                {
-                    "id": card.id,
-                    "card_number": card.card_number,
-                    "expiry_date": card.expiry_date,
-                    "cvv": card.cvv,
-                    "account_id": card.account.id,
-                    "account_number": card.account.account_number,
-                    "account_type": card.account.account_type,
-                    "balance": card.account.balance,
-                    "first_name": current_user.first_name,
-                    "last_name": current_user.last_name,
-                    "blocked": card.blocked,
-                    "created_at": card.created_at.strftime("%b %Y"),
-                    "transactions": [
-                        {"is_fraudulent": t.is_fraudulent} for t in card.transactions
-                    ]
-                }
-                for card in user_cards
-            ]
-        })
+        return jsonify({"cards": [serialize_card(card) for card in card_summaries(current_user.id)]})
 
+    user_cards = Card.query.options(joinedload(Card.account))\
+        .filter_by(user_id=current_user.id).order_by(Card.id).all()
     return render_template('cards.html', cards=user_cards, accounts=accounts)
 
 @app.route('/toggle_card_view/<int:card_id>', methods=['POST'])
+@immediate_transaction
 @login_required
 def toggle_card_view(card_id):
     card = Card.query.get_or_404(card_id)
@@ -614,7 +919,7 @@ def subscriptions():
 
     # GET: Load subscriptions, accounts, and cards
     user_subscriptions = Subscription.query.filter_by(user_id=current_user.id).all()
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = query_cache.list_by(Account, 'user_id', current_user.id)
     cards = Card.query.filter_by(user_id=current_user.id).all()
 
     return render_template(
@@ -669,7 +974,7 @@ def deactivate_subscription(subscription_id):
 def upis():
     if request.method == 'POST':
         upi_id = request.form.get('upi_id')
-        if not upi_id or UPI.query.filter_by(upi_id=upi_id).first():
+        if not upi_id or query_cache.get_id_by(UPI, 'upi_id', upi_id):
             flash('Invalid or duplicate UPI ID.', 'danger')
             return redirect(url_for('upis'))
         new_upi = UPI(upi_id=upi_id, user_id=current_user.id)
@@ -677,7 +982,7 @@ def upis():
         db.session.commit()
         flash('UPI ID added successfully!', 'success')
         return redirect(url_for('upis'))
-    user_upis = UPI.query.filter_by(user_id=current_user.id).all()
+    user_upis = query_cache.list_by(UPI, 'user_id', current_user.id)
     return render_template('upis.html', upis=user_upis)
 
 
@@ -694,14 +999,150 @@ def delete_upi(upi_id):
     return redirect(url_for('upis'))
 
 
+ALERTS_PER_PAGE = 50
+ALERT_DATE_RANGES = {'week': timedelta(days=7), 'month': timedelta(days=30)}
+
+
+def filter_alerts(query, filters):
+    """Apply the admin console's status/severity/type/date filters to a FraudAlert query"""
+    if filters.get('status') in ('active', 'resolved'):
+        query = query.filter(FraudAlert.is_resolved == (filters['status'] == 'resolved'))
+    if filters.get('severity'):
+        query = query.filter(FraudAlert.severity == filters['severity'])
+    if filters.get('type'):
+        query = query.filter(FraudAlert.alert_type == filters['type'])
+    if filters.get('date') == 'today':
+        query = query.filter(FraudAlert.created_at >= datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0))
+    elif filters.get('date') in ALERT_DATE_RANGES:
+        query = query.filter(FraudAlert.created_at >= datetime.utcnow() - ALERT_DATE_RANGES[filters['date']])
+    return query
+
+
+def parse_alert_cursor(value):
+    try:
+        created_at, alert_id = value.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(alert_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def alert_summary():
+    """Alert counts per state, severity and type from one grouped query"""
+    rows = db.session.query(
+        FraudAlert.severity, FraudAlert.is_resolved, FraudAlert.alert_type, db.func.count(FraudAlert.id)
+    ).group_by(FraudAlert.severity, FraudAlert.is_resolved, FraudAlert.alert_type).all()
+    summary = {'total': 0, 'active': 0, 'resolved': 0,
+               'by_severity': {'low': 0, 'medium': 0, 'high': 0, 'critical': 0}, 'types': []}
+    for severity, is_resolved, alert_type, count in rows:
+        summary['total'] += count
+        summary['resolved' if is_resolved else 'active'] += count
+        summary['by_severity'][severity] = summary['by_severity'].get(severity, 0) + count
+        if alert_type not in summary['types']:
+            summary['types'].append(alert_type)
+    summary['types'].sort()
+    return summary
+
+
 @app.route('/admin/alerts')
+@db_router.read_only
 @login_required
 def admin_alerts():
     if not current_user.is_admin:
         flash('Access denied', 'danger')
         return redirect(url_for('dashboard'))
-    alerts = FraudAlert.query.order_by(FraudAlert.created_at.desc()).all()
-    return render_template('admin_alerts.html', alerts=alerts)
+    filters = {key: request.args.get(key, '') for key in ('status', 'severity', 'type', 'date')}
+    query = FraudAlert.query.options(
+        joinedload(FraudAlert.transaction).joinedload(Transaction.account)
+    )
+    query = filter_alerts(query, filters)
+
+    # Keyset pagination on (created_at, id) so deep pages stay as cheap as the first
+    cursor = parse_alert_cursor(request.args.get('before'))
+    if cursor:
+        created_at, alert_id = cursor
+        query = query.filter(db.or_(
+            FraudAlert.created_at < created_at,
+            db.and_(FraudAlert.created_at == created_at, FraudAlert.id < alert_id)
+        ))
+    alerts = query.order_by(FraudAlert.created_at.desc(), FraudAlert.id.desc())\
+        .limit(ALERTS_PER_PAGE + 1).all()
+
+    next_cursor = None
+    if len(alerts) > ALERTS_PER_PAGE:
+        alerts = alerts[:ALERTS_PER_PAGE]
+        next_cursor = f"{alerts[-1].created_at.isoformat()}_{alerts[-1].id}"
+
+    summary = query_cache.aggregate('fraud_alert:summary', alert_summary, ttl=30)
+    return render_template('admin_alerts.html', alerts=alerts, summary=summary,
+                           filters=filters, next_cursor=next_cursor)
+
+
+@app.route('/admin/alerts/resolve', methods=['POST'])
+@login_required
+def bulk_resolve_alerts():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object with alert_ids or filters'}), 400
+    if payload.get('alert_ids'):
+        try:
+            if not isinstance(payload['alert_ids'], list):
+                raise ValueError
+            alert_ids = [int(i) for i in payload['alert_ids']]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'alert_ids must be a list of alert ids'}), 400
+        query = FraudAlert.query.filter(FraudAlert.id.in_(alert_ids))
+    elif payload.get('filters') is not None:
+        if not isinstance(payload['filters'], dict):
+            return jsonify({'error': 'filters must be an object'}), 400
+        query = filter_alerts(FraudAlert.query, payload['filters'])
+    else:
+        return jsonify({'error': 'No alerts selected'}), 400
+
+    resolved_at = datetime.utcnow()
+    subquery = query.filter_by(is_resolved=False).with_entities(FraudAlert.id).scalar_subquery()
+    resolved_ids = db.session.execute(
+        update(FraudAlert).where(FraudAlert.id.in_(subquery)).values(
+            is_resolved=True, resolved_at=resolved_at, resolved_by=current_user.id
+        ).returning(FraudAlert.id)
+    ).scalars().all()
+    db.session.commit()
+    query_cache.invalidate_model(FraudAlert)
+    # Bulk UPDATEs skip the ORM hooks, so tell live consoles directly
+    for alert_id in resolved_ids:
+        alert_broadcaster.publish('resolved', {
+            'id': alert_id, 'is_resolved': True, 'resolved_at': resolved_at.isoformat()
+        })
+    return jsonify({'success': True, 'resolved': len(resolved_ids)})
+
+
+@app.route('/admin/alerts/stream')
+@login_required
+def alert_stream():
+    """Server-Sent Events feed of new and resolved fraud alerts for the admin console"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    # Replay what a reconnecting browser missed, starting after the last id it saw
+    backlog = []
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    if last_event_id.isdigit():
+        missed = FraudAlert.query.filter(FraudAlert.id > int(last_event_id))\
+            .order_by(FraudAlert.id).limit(ALERTS_PER_PAGE * 2).all()
+        backlog = [serialize_alert(alert) for alert in missed]
+    subscriber = alert_broadcaster.subscribe()
+    # Hand the connection back to the pool; the stream itself never touches the database
+    db.session.remove()
+    return Response(
+        alert_broadcaster.stream(
+            subscriber,
+            max_seconds=app.config['ALERT_STREAM_MAX_SECONDS'],
+            heartbeat=app.config['ALERT_STREAM_HEARTBEAT'],
+            backlog=backlog
+        ),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/admin/resolve_alert/<int:alert_id>', methods=['POST'])
@@ -717,16 +1158,226 @@ def resolve_alert(alert_id):
     return jsonify({'success': True})
 
 
+@app.route('/admin/analytics')
+@db_router.read_only
+@login_required
+def fraud_analytics():
+    """Fraud rate, volume and alert counts from the daily rollups"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    dimension = request.args.get('dimension', 'all')
+    if dimension not in DIMENSIONS:
+        return jsonify({'error': f"dimension must be one of: {', '.join(DIMENSIONS)}"}), 400
+    days = min(max(request.args.get('days', 30, type=int), 1), 366)
+    return jsonify(fraud_rollups.report(dimension=dimension, days=days))
+
+
+@app.route('/admin/transactions/search')
+@db_router.read_only
+@login_required
+def search_transactions():
+    """Ranked full-text and attribute search over all transactions, for investigators"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    args = request.args
+    try:
+        since = datetime.fromisoformat(args['since']) if args.get('since') else None
+        until = datetime.fromisoformat(args['until']) if args.get('until') else None
+    except ValueError:
+        return jsonify({'error': 'since/until must be ISO dates (YYYY-MM-DD)'}), 400
+
+    account_id = None
+    if args.get('account'):
+        account_id = query_cache.get_id_by(Account, 'account_number', args['account'].strip())
+        if account_id is None:
+            return jsonify({'results': [], 'page': 1, 'has_more': False})
+
+    page = args.get('page', 1, type=int)
+    try:
+        rows, has_more = transaction_search.search(
+            q=args.get('q'),
+            account_id=account_id,
+            min_amount=args.get('min_amount', type=float),
+            max_amount=args.get('max_amount', type=float),
+            ip_address=args.get('ip'),
+            transaction_type=args.get('type'),
+            since=since,
+            until=until,
+            page=page,
+            per_page=args.get('per_page', 25, type=int)
+        )
+    except SearchError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'results': [{
+            'id': t.id,
+            'account_number': account_number,
+            'type': t.transaction_type,
+            'amount': t.amount,
+            'description': t.description,
+            'location': t.location,
+            'ip_address': t.ip_address,
+            'timestamp': t.timestamp.isoformat() if t.timestamp else None,
+            'is_fraudulent': t.is_fraudulent,
+            'fraud_score': t.fraud_score,
+            'score': score,
+            'archived': getattr(t, 'archived', False)
+        } for t, account_number, score in rows],
+        'page': max(page, 1),
+        'has_more': has_more
+    })
+
+
+@app.route('/readyz')
+def readiness():
+    """503 until the database answers and the fraud models are loaded"""
+    checks = {'fraud_models': fraud_detector.ready}
+    try:
+        db.session.execute(text('SELECT 1'))
+        checks['database'] = True
+    except Exception as e:
+        print("Readiness check failed:", e)
+        checks['database'] = False
+    # In lazy mode the models load on the first scored transaction instead
+    ready = checks['database'] and (checks['fraud_models'] or app.config['FRAUD_MODEL_WARMUP'] == 'lazy')
+    return jsonify({'status': 'ready' if ready else 'starting', 'checks': checks}), 200 if ready else 503
+
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint, summed over all gunicorn workers.
+
+    Needs ``Authorization: Bearer <METRICS_TOKEN>``; without a token
+    configured it only answers scrapers on this host.
+    """
+    token = app.config['METRICS_TOKEN']
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            return jsonify({'error': 'Access denied'}), 403
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'Set METRICS_TOKEN to scrape /metrics from another host'}), 403
+    return app_metrics.response()
+
+
+@app.route('/admin/cache/stats')
+@login_required
+def cache_stats():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(query_cache.metrics.snapshot())
+
+
+@app.route('/admin/templates/stats')
+@login_required
+def template_stats():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(template_caching.metrics.snapshot())
+
+
+@app.route('/admin/sql/profile')
+@login_required
+def sql_profile():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(sql_profiler.snapshot())
+
+
+@app.route('/admin/profiler')
+@login_required
+def profiler_status():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify({'active': request_profiler.active(), 'sessions': request_profiler.sessions()})
+
+
+@app.route('/admin/profiler/start', methods=['POST'])
+@login_required
+def profiler_start():
+    """Profile the next N requests and/or the next S seconds, optionally on one route"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    payload = request.get_json(silent=True) or {}
+    try:
+        profile_session = request_profiler.start(
+            route=payload.get('route'),
+            requests=payload.get('requests'),
+            seconds=payload.get('seconds'),
+            mode=payload.get('mode', 'cprofile'),
+            interval_ms=payload.get('interval_ms', 5)
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'success': True, 'session': profile_session})
+
+
+@app.route('/admin/profiler/stop', methods=['POST'])
+@login_required
+def profiler_stop():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify({'success': True, 'stopped': request_profiler.stop()})
+
+
+@app.route('/admin/profiler/<session_id>/profile.<fmt>')
+@login_required
+def profiler_download(session_id, fmt):
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    try:
+        outputs = request_profiler.aggregate(session_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    if fmt not in outputs:
+        return jsonify({'error': f"No {fmt} profile in this session"}), 404
+    return send_file(outputs[fmt], as_attachment=True, download_name=f"{session_id}.{fmt}")
+
+
+@app.route('/admin/rate-limits')
+@login_required
+def rate_limit_stats():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(rate_limiter.snapshot())
+
+
+@app.route('/admin/db/pools')
+@login_required
+def db_pool_stats():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(db_router.pool_stats())
+
+
+@app.route('/admin/db/partitions')
+@login_required
+def db_partition_stats():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify({
+        'partitioned': transaction_partitions.is_partitioned(),
+        'partitions': transaction_partitions.partitions(),
+    })
+
+
 @app.route('/api/transactions')
+@db_router.read_only
 @login_required
+@data_versions.conditional(transactions_scope)
 def api_transactions():
-    account_id = request.args.get('account_id')
+    account_id = request.args.get('account_id', type=int)
+    period = requested_period()
     if account_id:
-        transactions = Transaction.query.filter_by(account_id=account_id).order_by(Transaction.timestamp.desc()).all()
+        account = query_cache.get(Account, account_id)
+        if account is None or (account.user_id != current_user.id and not current_user.is_admin):
+            return jsonify({'error': 'Access denied'}), 403
+        transactions = Transaction.query.filter(Transaction.account_id == account_id, *period.filter(Transaction.timestamp))\
+            .order_by(Transaction.timestamp.desc()).all()
     else:
         accounts = Account.query.filter_by(user_id=current_user.id).all()
         account_ids = [acc.id for acc in accounts]
-        transactions = Transaction.query.filter(Transaction.account_id.in_(account_ids)).order_by(Transaction.timestamp.desc()).all()
+        transactions = Transaction.query.filter(Transaction.account_id.in_(account_ids), *period.filter(Transaction.timestamp))\
+            .order_by(Transaction.timestamp.desc()).all()
     return jsonify([{
         'id': t.id,
         'type': t.transaction_type,
@@ -738,6 +1389,25 @@ def api_transactions():
     } for t in transactions])
 
 
+@app.route('/api/summary')
+@db_router.read_only
+@login_required
+@data_versions.conditional(transactions_scope)
+def api_summary():
+    """Monthly opening/closing balances, credits, debits and counts by type, from the summary rows"""
+    account_id = request.args.get('account_id', type=int)
+    period = requested_period()
+    if account_id:
+        account = query_cache.get(Account, account_id)
+        if account is None or (account.user_id != current_user.id and not current_user.is_admin):
+            return jsonify({'error': 'Access denied'}), 403
+        accounts = [account]
+    else:
+        accounts = query_cache.list_by(Account, 'user_id', current_user.id)
+    return jsonify({
+        'accounts': [account.id for account in accounts],
+        'months': account_summaries.monthly(accounts, period.start, period.end),
+    })
 
 
 # ------------------------
@@ -748,32 +1418,150 @@ def generate_otp():
     return str(random.randint(100000, 999999))
 
 def send_email(to_email, subject, message):
-    sender_email = "ashrielnhembo.dev@gmail.com"  # your real email
-    sender_name = "SecureBank"
-    password = "mdsp qcvg uivq ypdd"  # your app password
-
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = f"{sender_name} <{sender_email}>"
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(message, 'plain'))
-
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(sender_email, password)
-        server.send_message(msg)
-        server.quit()
-
-        return True
-    except Exception as e:
-        print("Email error:", e)
-        return False
+    """Queue an email in the outbox; delivery happens on the outbox workers"""
+    email_outbox.enqueue(to_email, subject, message)
+    return True
+
+
+@app.cli.command('outbox-worker')
+def outbox_worker():
+    """Drain the email outbox in the foreground (for a dedicated worker process)"""
+    email_outbox.run()
+
+
+@app.cli.command('bill-subscriptions')
+@click.option('--processes', default=1, show_default=True, help='Worker processes (accounts are sharded across them)')
+def bill_subscriptions(processes):
+    """Charge every active subscription that is due"""
+    g.sqlite_immediate = True
+    result = billing_engine.run_parallel(processes)
+    print(f"Charged {result.charged} subscriptions (${result.amount:.2f}), "
+          f"{result.flagged} flagged, {result.insufficient_funds} insufficient funds, "
+          f"{result.card_blocked} blocked cards, {result.no_funding_source} without funding source")
+    for error in result.errors:
+        print("Billing error:", error)
+
+
+@app.cli.command('build-assets')
+def build_static_assets():
+    """Fingerprint and precompress static/ into static/dist (run on every deploy)"""
+    manifest = build_assets(app.static_folder)
+    print(f"Built {len(manifest)} assets into {os.path.join(app.static_folder, 'dist')}")
+
+
+@app.cli.command('compile-templates')
+def compile_templates():
+    """Compile every template into the bytecode cache (run on every deploy)"""
+    count = template_caching.precompile(app.jinja_env)
+    print(f"Compiled {count} templates")
+
+
+@app.cli.command('generate-data')
+@click.option('--scale', type=float, default=1.0, show_default=True, help='Thousands of users to generate')
+@click.option('--transactions-per-account', type=float, default=20.0, show_default=True)
+@click.option('--transfers-per-user', type=float, default=2.0, show_default=True)
+@click.option('--processes', type=int, default=os.cpu_count(), show_default=True, help='Generator processes')
+@click.option('--rate', type=int, default=0, help='Target rows per second (default: as fast as possible)')
+@click.option('--seed', type=int, default=42, show_default=True)
+def generate_data(scale, transactions_per_account, transfers_per_user, processes, rate, seed):
+    """Bulk-load synthetic users, accounts, cards, subscriptions, transactions and alerts"""
+    # numpy is only needed here; importing it lazily keeps app startup fast
+    from synthetic_data import GenerationSpec, SyntheticDataGenerator
+
+    spec = GenerationSpec(
+        users=max(1, int(scale * 1000)), transactions_per_account=transactions_per_account,
+        transfers_per_user=transfers_per_user, seed=seed
+    )
+    generator = SyntheticDataGenerator(app, db)
+    last_id = db.session.execute(db.select(db.func.max(Transaction.id))).scalar() or 0
+    db.session.commit()  # don't hold a read transaction open while the generator writes
+
+    def progress(result):
+        print(f"  {result.rows.get('user', 0)}/{spec.users} users, {result.total_rows} rows")
+
+    # Every generated user signs in with password123
+    with transaction_search.bulk_load():
+        result = generator.generate(spec, processes=processes, rate=rate,
+                                    password_hash=password_hasher.hash('password123'), progress=progress)
+    print(f"Loaded {result.total_rows} rows in {result.seconds:.1f}s ({result.rows_per_second:,.0f} rows/s): "
+          + ', '.join(f"{count} {table}" for table, count in result.rows.items()))
+    # Only the days the new rows landed on (alerts share their transactions' timestamps)
+    first = db.session.execute(
+        db.select(db.func.min(Transaction.timestamp)).where(Transaction.id > last_id)
+    ).scalar()
+    if first is None:
+        return
+    floor = transaction_archive.live_since()
+    if floor is not None and first.date() < floor:
+        print(f"Months before {floor:%Y-%m} are archived; rows loaded into them are not summarized")
+    written = fraud_rollups.rebuild(since=first.date())
+    summaries = account_summaries.rebuild(since=first.date())
+    db.session.commit()
+    print(f"Rebuilt fraud rollups: {written} rows, account summaries: {summaries} rows")
+
+
+@app.cli.command('create-partitions')
+@click.option('--months-ahead', type=int, default=None,
+              help='Months of partitions to keep ready (default: TRANSACTION_PARTITION_MONTHS_AHEAD)')
+def create_partitions(months_ahead):
+    """Create upcoming monthly transaction partitions on PostgreSQL (run daily)"""
+    if not transaction_partitions.is_partitioned():
+        print("transaction is not partitioned on this database; nothing to do")
+        return
+    created = transaction_partitions.ensure_future(months_ahead)
+    print(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ''))
+
+
+@app.cli.command('archive-transactions')
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Archive rows older than this date (default: ARCHIVE_AFTER_DAYS ago)')
+@click.option('--batch-size', type=int, default=10000, show_default=True)
+def archive_transactions(before, batch_size):
+    """Move old transactions and resolved fraud alerts to compressed Parquet files in ARCHIVE_DIR"""
+    g.sqlite_immediate = True
+    cutoff = before or datetime.utcnow() - timedelta(days=app.config['ARCHIVE_AFTER_DAYS'])
+
+    def progress(kind, count):
+        print(f"  {count} {kind.replace('_', ' ')} archived")
+
+    archived = transaction_archive.archive(cutoff, batch_size=batch_size, progress=progress)
+    query_cache.invalidate_model(FraudAlert)
+    print(f"Archived {archived['transactions']} transactions and {archived['fraud_alerts']} resolved alerts "
+          f"older than {cutoff:%Y-%m-%d} into {app.config['ARCHIVE_DIR']}")
+
+
+@app.cli.command('rebuild-fraud-rollups')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Only rebuild days on or after this date (default: everything after the archive)')
+def rebuild_fraud_rollups(since):
+    """Recompute the fraud analytics rollups from transactions and alerts"""
+    g.sqlite_immediate = True
+    floor = transaction_archive.live_since()
+    if floor is not None and (since is None or since.date() < floor):
+        print(f"Months before {floor:%Y-%m} are archived; rebuilding from {floor:%Y-%m-%d}")
+    written = fraud_rollups.rebuild(since=since.date() if since else None)
+    db.session.commit()
+    print(f"Rebuilt fraud rollups: {written} rows")
+
+
+@app.cli.command('rebuild-account-summaries')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Only rebuild months from this date on (default: everything after the archive)')
+def rebuild_account_summaries(since):
+    """Recompute the monthly account summaries from transactions"""
+    g.sqlite_immediate = True
+    floor = transaction_archive.live_since(kinds=('transactions',))
+    if floor is not None and (since is None or since.date() < floor):
+        print(f"Months before {floor:%Y-%m} are archived; rebuilding from {floor:%Y-%m-%d}")
+    written = account_summaries.rebuild(since=since.date() if since else None)
+    db.session.commit()
+    print(f"Rebuilt account summaries: {written} rows")
 
 # ------------------------
 # --- OTP Request ---
 # ------------------------
 @app.route('/statements/request-otp')
+@rate_limiter.limit('statement_otp', methods=('GET',))
 @login_required
 def request_statement_otp():
     otp = generate_otp()
@@ -819,8 +1607,10 @@ def verify_statement_otp():
 # --- View Statement ---
 # ------------------------
 @app.route('/statements/view')
+@db_router.read_only
 @login_required
 def view_statement():
+    period = requested_period()
     if current_user.is_admin:
         transactions = db.session.query(
             Transaction.id,
@@ -833,14 +1623,17 @@ def view_statement():
             Transaction.is_fraudulent
         ).join(Account, Transaction.account_id == Account.id)\
          .join(User, Account.user_id == User.id)\
+         .filter(*period.filter(Transaction.timestamp))\
          .order_by(Transaction.timestamp.desc()).all()
     else:
         accounts = Account.query.filter_by(user_id=current_user.id).all()
         account_ids = [acc.id for acc in accounts]
-        transactions = Transaction.query.filter(Transaction.account_id.in_(account_ids))\
+        transactions = Transaction.query.filter(Transaction.account_id.in_(account_ids), *period.filter(Transaction.timestamp))\
             .order_by(Transaction.timestamp.desc()).all()
+    transactions = with_archived(transactions, None if current_user.is_admin else account_ids, period)
+    summary = None if current_user.is_admin else account_summaries.header(accounts, period.start, period.end)
 
-    return render_template("statements.html", transactions=transactions)
+    return render_template("statements.html", transactions=transactions, period=period, summary=summary)
 
 # ------------------------
 # --- Download Statement PDF ---
@@ -848,6 +1641,11 @@ def view_statement():
 @app.route('/statements/download')
 @login_required
 def download_statement():
+    # reportlab is only needed here; importing it lazily keeps app startup fast
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    period = requested_period()
     buffer = io.BytesIO()
     p = canvas.Canvas(buffer, pagesize=letter)
 
@@ -861,6 +1659,7 @@ def download_statement():
     # Subtitle with generation date
     p.setFont("Helvetica", 12)
     p.drawString(100, 800, f"Generated on: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    p.drawString(350, 800, f"Period: {period.describe()}")
 
     # Account details header
     p.setFont("Helvetica-Bold", 12)
@@ -877,6 +1676,17 @@ def download_statement():
         p.drawString(120, account_details_y - 45, f"Account Type: {acc.account_type if hasattr(acc, 'account_type') else 'N/A'}")
         account_details_y -= 60  # space for next account
 
+    # Period totals come from the monthly summaries, not from the rows below
+    summary = None if current_user.is_admin else account_summaries.header(accounts, period.start, period.end)
+    if summary:
+        p.setFont("Helvetica-Bold", 12)
+        p.drawString(100, account_details_y, f"Summary ({summary['first_month']} to {summary['last_month']}):")
+        p.setFont("Helvetica", 10)
+        p.drawString(120, account_details_y - 15, f"Opening balance: {summary['opening_balance']:.2f}")
+        p.drawString(120, account_details_y - 30, f"Credits: {summary['credits']:.2f}    Debits: {summary['debits']:.2f}")
+        p.drawString(120, account_details_y - 45, f"Closing balance: {summary['closing_balance']:.2f}")
+        account_details_y -= 60
+
     y = account_details_y - 20  # space before table
 
     # Table headers
@@ -903,11 +1713,13 @@ def download_statement():
             Transaction.is_fraudulent
         ).join(Account, Transaction.account_id == Account.id)\
          .join(User, Account.user_id == User.id)\
+         .filter(*period.filter(Transaction.timestamp))\
          .order_by(Transaction.timestamp.desc()).all()
     else:
         account_ids = [acc.id for acc in accounts]
-        transactions = Transaction.query.filter(Transaction.account_id.in_(account_ids))\
+        transactions = Transaction.query.filter(Transaction.account_id.in_(account_ids), *period.filter(Transaction.timestamp))\
             .order_by(Transaction.timestamp.desc()).all()
+    transactions = with_archived(transactions, None if current_user.is_admin else [acc.id for acc in accounts], period)
 
     # Table rows
     for t in transactions:
@@ -940,4 +1752,5 @@ def download_statement():
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        transaction_search.ensure_index()
     app.run(debug=True)
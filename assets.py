@@ -0,0 +1,153 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+# Fingerprinted files never change under the same name
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+TEXT_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+}
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+
+def minify_css(source):
+    """Conservative CSS minifier: comments and insignificant whitespace only"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+
+def build_assets(static_folder, gzip_level=9, brotli_quality=11):
+    """Fingerprint and precompress everything under ``static_folder``.
+
+    Writes ``dist/<name>.<hash><ext>`` for each source file (CSS minified),
+    ``.gz`` and, when the brotli package is installed, ``.br`` siblings for
+    text assets, and ``dist/manifest.json`` mapping source paths to the
+    fingerprinted ones. Files from earlier builds are left in place so
+    pages still cached by browsers (or served by workers not yet restarted)
+    keep resolving. Returns the manifest.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    for directory, dirnames, filenames in os.walk(static_folder):
+        dirnames[:] = [d for d in dirnames if os.path.join(directory, d) != dist]
+        for filename in sorted(filenames):
+            source_path = os.path.join(directory, filename)
+            relative = os.path.relpath(source_path, static_folder).replace(os.sep, '/')
+            with open(source_path, 'rb') as fh:
+                content = fh.read()
+            if filename.endswith('.css'):
+                content = minify_css(content.decode('utf-8')).encode('utf-8')
+
+            stem, ext = os.path.splitext(relative)
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            target = f"{stem}.{digest}{ext}"
+            target_path = os.path.join(dist, target)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(target_path, 'wb') as fh:
+                fh.write(content)
+            if ext in COMPRESSIBLE_EXTENSIONS:
+                with open(target_path + '.gz', 'wb') as fh:
+                    fh.write(gzip.compress(content, compresslevel=gzip_level, mtime=0))
+                if brotli is not None:
+                    with open(target_path + '.br', 'wb') as fh:
+                        fh.write(brotli.compress(content, quality=brotli_quality))
+            manifest[relative] = f"{DIST_DIR}/{target}"
+
+    with open(os.path.join(dist, MANIFEST), 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    return manifest
+
+
+def negotiate_encoding(accept_encoding, available=('br', 'gzip')):
+    """Pick the best of ``available`` that the client accepts"""
+    for encoding in available:
+        if encoding == 'br' and brotli is None:
+            continue
+        if accept_encoding[encoding]:
+            return encoding
+    return None
+
+
+class AssetPipeline:
+    """Serves the built assets and compresses dynamic responses.
+
+    ``asset_url('css/base.css')`` resolves to the fingerprinted file from
+    the manifest, or to the plain source (revalidated on every load) when
+    assets have not been built, as in development. Fingerprinted files are
+    served precompressed with an immutable cache lifetime. Compressible
+    dynamic responses are gzip/brotli encoded on the way out.
+    """
+
+    def __init__(self, app, compress_min_size=500, compress_level=6, brotli_quality=5):
+        self.app = app
+        self.static_folder = app.static_folder
+        self.compress_min_size = compress_min_size
+        self.compress_level = compress_level
+        self.brotli_quality = brotli_quality
+        self.manifest = self._load_manifest()
+        app.jinja_env.globals['asset_url'] = self.asset_url
+        app.view_functions['static'] = self.send_static
+        app.after_request(self.compress_response)
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.static_folder, DIST_DIR, MANIFEST)) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def asset_url(self, path):
+        return url_for('static', filename=self.manifest.get(path, path))
+
+    def send_static(self, filename):
+        immutable = filename.startswith(DIST_DIR + '/')
+        response = None
+        if immutable:
+            encoding = negotiate_encoding(request.accept_encodings)
+            suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding)
+            if suffix and os.path.isfile(os.path.join(self.static_folder, filename + suffix)):
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                response = send_from_directory(self.static_folder, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+        if response is None:
+            response = send_from_directory(self.static_folder, filename)
+        if immutable:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def compress_response(self, response):
+        if (response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in TEXT_TYPES
+                or not 200 <= response.status_code < 300):
+            return response
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < self.compress_min_size:
+            return response
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding == 'br':
+            response.set_data(brotli.compress(data, quality=self.brotli_quality))
+        elif encoding == 'gzip':
+            response.set_data(gzip.compress(data, compresslevel=self.compress_level))
+        else:
+            return response
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+FraudDetector micro-benchmarks with a stored baseline and regression gates.
+
+Times model loading, _extract_features, single-row predict_fraud, batched
+predict_fraud_batch, get_fraud_indicators and training at several dataset
+sizes, and records the peak Python/numpy allocation of each (tracemalloc).
+Models are trained into a temporary directory, so ./models is untouched.
+
+--save-baseline writes the results as the new baseline. Otherwise they are
+compared with the baseline, and the script exits non-zero when any
+benchmark is slower or allocates more than the thresholds allow. Baselines
+are only comparable on the same machine; record one per CI runner.
+
+    python benchmarks/fraud_model.py --save-baseline
+    python benchmarks/fraud_model.py --time-threshold 0.2 --memory-threshold 0.2
+    python benchmarks/fraud_model.py --train-sizes 2000,5000 --repeats 3
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fraud_detection import FraudDetector  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'fraud_model.json')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--time-threshold', type=float, default=0.25,
+                        help='allowed slowdown against the baseline (0.25 = 25%%)')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help='allowed growth in peak allocation against the baseline')
+    parser.add_argument('--repeats', type=int, default=5, help='timed repeats per benchmark (the fastest is kept)')
+    parser.add_argument('--train-sizes', default='2000,5000,20000')
+    parser.add_argument('--batch-sizes', default='100,1000')
+    parser.add_argument('--output', help='also write this run to a JSON file')
+    return parser.parse_args()
+
+
+def sample_transactions(count, seed=7):
+    """Stand-ins with the attributes the detector reads from Transaction rows"""
+    import random
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    return [SimpleNamespace(
+        amount=round(rng.lognormvariate(4, 1.2) * rng.choice((1, -1)), 2),
+        timestamp=start + timedelta(seconds=rng.randrange(365 * 86400)),
+    ) for _ in range(count)]
+
+
+def measure(fn, repeats, number=1):
+    """Best seconds per call over ``repeats`` runs of ``number`` calls, and peak bytes allocated
+
+    The fastest run is the least disturbed by other load, as with timeit.
+    """
+    fn()  # warm caches and lazy imports
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - started) / number)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+@contextlib.contextmanager
+def quiet():
+    # Training prints a classification report
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def run_benchmarks(args):
+    results = {}
+    train_sizes = [int(n) for n in args.train_sizes.split(',') if n]
+    batch_sizes = [int(n) for n in args.batch_sizes.split(',') if n]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # FraudDetector keeps its models under ./models
+        os.chdir(workdir)
+        try:
+            for size in train_sizes:
+                def train(size=size):
+                    with quiet():
+                        FraudDetector()._train_models(n_samples=size)
+                # Training is slow; fewer repeats keep the suite practical
+                results[f"train[{size}]"] = measure(train, max(1, args.repeats // 2))
+                print(f"  trained on {size} rows")
+
+            # The largest training run leaves the production-sized models on disk
+            def load():
+                with quiet():
+                    FraudDetector().warm_up()
+            results['model_load'] = measure(load, args.repeats)
+
+            detector = FraudDetector()
+            with quiet():
+                detector.warm_up()
+            transactions = sample_transactions(max(batch_sizes + [1000]))
+            one = transactions[0]
+            results['extract_features'] = measure(lambda: detector._extract_features(one), args.repeats, number=2000)
+            results['predict_fraud'] = measure(lambda: detector.predict_fraud(one), args.repeats, number=50)
+            for size in batch_sizes:
+                batch = transactions[:size]
+                results[f"predict_fraud_batch[{size}]"] = measure(
+                    lambda batch=batch: detector.predict_fraud_batch(batch), args.repeats
+                )
+            results['get_fraud_indicators'] = measure(
+                lambda: detector.get_fraud_indicators(one), args.repeats, number=2000
+            )
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    """Print the comparison table; return the list of regressions"""
+    regressions = []
+    print(f"\n{'benchmark':<28}{'time':>12}{'baseline':>12}{'change':>9}{'peak KiB':>11}{'baseline':>10}{'change':>9}")
+    for name, current in results.items():
+        old = baseline['results'].get(name)
+        if old is None:
+            print(f"{name:<28}{format_seconds(current['seconds']):>12}{'-':>12}{'new':>9}"
+                  f"{current['peak_bytes'] / 1024:>11.0f}{'-':>10}")
+            continue
+        time_change = current['seconds'] / old['seconds'] - 1 if old['seconds'] else 0.0
+        memory_change = current['peak_bytes'] / old['peak_bytes'] - 1 if old['peak_bytes'] else 0.0
+        flags = ''
+        if time_change > time_threshold:
+            regressions.append(f"{name}: {time_change:+.0%} time")
+            flags += ' TIME'
+        if memory_change > memory_threshold:
+            regressions.append(f"{name}: {memory_change:+.0%} memory")
+            flags += ' MEM'
+        print(f"{name:<28}{format_seconds(current['seconds']):>12}{format_seconds(old['seconds']):>12}"
+              f"{time_change:>+9.0%}{current['peak_bytes'] / 1024:>11.0f}{old['peak_bytes'] / 1024:>10.0f}"
+              f"{memory_change:>+9.0%}{flags}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    print("Running FraudDetector benchmarks...")
+    run = {
+        'recorded_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'environment': environment(),
+        'results': run_benchmarks(args),
+    }
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(run, fh, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as fh:
+            json.dump(run, fh, indent=2)
+        for name, result in run['results'].items():
+            print(f"  {name:<28}{format_seconds(result['seconds']):>12}{result['peak_bytes'] / 1024:>10.0f} KiB")
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        for name, result in run['results'].items():
+            print(f"  {name:<28}{format_seconds(result['seconds']):>12}{result['peak_bytes'] / 1024:>10.0f} KiB")
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    if baseline.get('environment') != run['environment']:
+        print(f"Warning: baseline was recorded on {baseline.get('environment')}; timings may not be comparable")
+    regressions = compare(run['results'], baseline, args.time_threshold, args.memory_threshold)
+    if regressions:
+        print("\nFAIL: " + '; '.join(regressions))
+        sys.exit(1)
+    print("\nOK: no regressions past "
+          f"{args.time_threshold:.0%} time / {args.memory_threshold:.0%} memory")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test with a realistic traffic mix.
+
+Virtual users sign in as their own customer and loop over a weighted mix of
+operations: logins, dashboard views, transfers, deposits, withdrawals,
+card block toggles, statement downloads and admin alert views. By default
+the real Flask app runs in-process against a throwaway SQLite database
+seeded by the synthetic data generator; with --url the same traffic goes
+over HTTP to a running server (e.g. gunicorn -c gunicorn.conf.py app:app),
+whose DATABASE_URL must also be set here so users can be picked; start that
+server with RATE_LIMIT_URL=none:// since all virtual users share one ip.
+
+Per-route p50/p95/p99 latency, throughput and error rate are written as
+JSON; --compare prints the change against an earlier result file.
+
+    python benchmarks/load_test.py --users 16 --seconds 60 --output results/main.json
+    python benchmarks/load_test.py --mix dashboard=70,transfer=30 --compare results/main.json
+    DATABASE_URL=sqlite:////srv/bank.db python benchmarks/load_test.py --url http://127.0.0.1:8000
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_MIX = ('login=5,dashboard=35,transfer=12,deposit=10,withdrawal=10,'
+               'card_toggle=10,statement=3,admin_alerts=15')
+PASSWORD = 'password123'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running server (default: run the app in-process)')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of traffic left out of the results')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='operation=weight pairs')
+    parser.add_argument('--scale', type=float, default=0.2,
+                        help='in-process only: thousands of generated users to seed')
+    parser.add_argument('--admin', default='admin:admin123', help='admin username:password')
+    parser.add_argument('--label', default='', help='free-form name stored with the results')
+    parser.add_argument('--output', default='load_test_results.json')
+    parser.add_argument('--compare', help='earlier result file to diff against')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            sys.exit(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ---- clients ----
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None, headers=None):
+        response = self.client.open(path, method=method, data=data, headers=headers)
+        response.get_data()
+        status = response.status_code
+        response.close()
+        return status
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    """Cookie-keeping HTTP client that reports redirects instead of following them"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method, path, data=None, headers=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method,
+                                         headers={'Accept-Encoding': 'gzip', **(headers or {})})
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+# ---- traffic ----
+
+class VirtualUser:
+    def __init__(self, make_client, customer, peers, admin):
+        self.make_client = make_client
+        self.customer = customer
+        self.peers = peers
+        self.admin = admin
+        self.client = make_client()
+        self.admin_client = None
+
+    def login(self):
+        return self.client.request('POST', '/login', {'username': self.customer['username'],
+                                                      'password': PASSWORD})
+
+    def admin_session(self):
+        if self.admin_client is None:
+            self.admin_client = self.make_client()
+            self.admin_client.request('POST', '/login', {'username': self.admin[0], 'password': self.admin[1]})
+        return self.admin_client
+
+
+def op_login(vu, rng):
+    vu.client = vu.make_client()
+    return vu.login()
+
+
+def op_dashboard(vu, rng):
+    return vu.client.request('GET', '/dashboard')
+
+
+def op_transfer(vu, rng):
+    return vu.client.request('POST', '/transfer', {
+        'from_account': rng.choice(vu.customer['accounts']),
+        'to_account': rng.choice(vu.peers),
+        'amount': '1.00', 'description': 'Load test'
+    })
+
+
+def op_deposit(vu, rng):
+    return vu.client.request('POST', '/deposit', {
+        'account_id': rng.choice(vu.customer['accounts']), 'amount': '1.00', 'description': 'Load test'
+    })
+
+
+def op_withdrawal(vu, rng):
+    return vu.client.request('POST', '/withdraw', {
+        'account_id': rng.choice(vu.customer['accounts']), 'amount': '1.00', 'description': 'Load test'
+    })
+
+
+def op_card_toggle(vu, rng):
+    if not vu.customer['cards']:
+        return vu.client.request('GET', '/cards')
+    return vu.client.request('POST', f"/toggle_card_view/{rng.choice(vu.customer['cards'])}")
+
+
+def op_statement(vu, rng):
+    return vu.client.request('GET', '/statements/download')
+
+
+def op_admin_alerts(vu, rng):
+    return vu.admin_session().request('GET', '/admin/alerts')
+
+
+OPERATIONS = {
+    'login': op_login,
+    'dashboard': op_dashboard,
+    'transfer': op_transfer,
+    'deposit': op_deposit,
+    'withdrawal': op_withdrawal,
+    'card_toggle': op_card_toggle,
+    'statement': op_statement,
+    'admin_alerts': op_admin_alerts,
+}
+
+
+def run_user(vu, mix, seed, measure_from, stop_at, samples):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    vu.login()
+    while True:
+        name = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        if started >= stop_at:
+            return
+        try:
+            status = OPERATIONS[name](vu, rng)
+        except Exception as e:
+            status = f"{type(e).__name__}"
+        if started >= measure_from:
+            samples.append((name, time.perf_counter() - started, status, time.perf_counter()))
+
+
+# ---- fixtures ----
+
+def prepare_in_process(args):
+    db_dir = tempfile.mkdtemp(prefix='securebank-load-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir, 'load.db')}"
+    os.environ.setdefault('MAIL_OUTBOX_WORKERS', '0')
+    # Every virtual user comes from 127.0.0.1
+    os.environ.setdefault('RATE_LIMIT_URL', 'none://')
+
+    from app import app, db, User, fraud_detector, password_hasher, transaction_search, fraud_rollups, account_summaries
+    from synthetic_data import GenerationSpec, SyntheticDataGenerator
+
+    with app.app_context():
+        db.create_all()
+        transaction_search.ensure_index()
+        admin_username, admin_password = args.admin.split(':', 1)
+        db.session.add(User(username=admin_username, email='admin@securebank.com',
+                            password_hash=password_hasher.hash(admin_password),
+                            first_name='Admin', last_name='User', is_admin=True))
+        db.session.commit()
+        spec = GenerationSpec(users=max(args.users * 2, int(args.scale * 1000)), seed=args.seed)
+        with transaction_search.bulk_load():
+            SyntheticDataGenerator(app, db).generate(spec, password_hash=password_hasher.hash(PASSWORD))
+        fraud_rollups.rebuild()
+        account_summaries.rebuild()
+        db.session.commit()
+    fraud_detector.warm_up()
+    return app, (lambda: InProcessClient(app))
+
+
+def pick_customers(count, seed):
+    """Customers with their account ids and card ids, plus account numbers to send money to"""
+    from app import app, db, Account, Card, User
+
+    with app.app_context():
+        users = User.query.filter(User.is_admin.is_(False)).order_by(User.id).limit(count * 4).all()
+        rng = random.Random(seed)
+        chosen = rng.sample(users, min(count, len(users)))
+        ids = [user.id for user in chosen]
+        accounts = db.session.query(Account.user_id, Account.id, Account.account_number)\
+            .filter(Account.user_id.in_(ids)).all()
+        cards = db.session.query(Card.user_id, Card.id).filter(Card.user_id.in_(ids)).all()
+        peers = [number for (number,) in db.session.query(Account.account_number).limit(1000)]
+
+    customers = []
+    for user in chosen:
+        own = [a for a in accounts if a.user_id == user.id]
+        if own:
+            customers.append({
+                'username': user.username,
+                'accounts': [a.id for a in own],
+                'numbers': [a.account_number for a in own],
+                'cards': [c.id for c in cards if c.user_id == user.id],
+            })
+    if not customers:
+        sys.exit("No customers with accounts found; run 'flask generate-data' first")
+    return customers, peers
+
+
+# ---- results ----
+
+def summarize(samples, seconds):
+    routes = {}
+    for name, latency, status, _ in samples:
+        routes.setdefault(name, []).append((latency, status))
+    summary = {}
+    for name, rows in sorted(routes.items()):
+        latencies = [latency * 1000 for latency, _ in rows]
+        statuses = {}
+        for _, status in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(1 for _, status in rows if not isinstance(status, int) or status >= 400)
+        summary[name] = {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4),
+            'throughput_rps': round(len(rows) / seconds, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'max_ms': round(max(latencies), 2),
+            'statuses': statuses,
+        }
+    total = len(samples)
+    errors = sum(route['errors'] for route in summary.values())
+    all_latencies = [latency * 1000 for _, latency, _, _ in samples] or [0.0]
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'throughput_rps': round(total / seconds, 2),
+        'p50_ms': round(percentile(all_latencies, 50), 2),
+        'p95_ms': round(percentile(all_latencies, 95), 2),
+        'p99_ms': round(percentile(all_latencies, 99), 2),
+    }, summary
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_report(results):
+    print(f"{'route':<14}{'reqs':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, route in results['routes'].items():
+        print(f"{name:<14}{route['requests']:>8}{route['throughput_rps']:>9.1f}{route['error_rate'] * 100:>6.1f}%"
+              f"{route['p50_ms']:>9.1f}{route['p95_ms']:>9.1f}{route['p99_ms']:>9.1f}")
+    total = results['total']
+    print(f"{'TOTAL':<14}{total['requests']:>8}{total['throughput_rps']:>9.1f}{total['error_rate'] * 100:>6.1f}%"
+          f"{total['p50_ms']:>9.1f}{total['p95_ms']:>9.1f}{total['p99_ms']:>9.1f}   (latencies in ms)")
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+
+    print(f"\nAgainst {baseline_path} ({baseline.get('label') or baseline.get('git_revision')}):")
+    print(f"{'route':<14}{'rps':>10}{'p95':>10}{'p99':>10}{'err% now/then':>16}")
+    rows = dict(results['routes'], TOTAL=results['total'])
+    old_rows = dict(baseline['routes'], TOTAL=baseline['total'])
+    for name, route in rows.items():
+        old = old_rows.get(name)
+        if old is None:
+            continue
+        print(f"{name:<14}{change(route['throughput_rps'], old['throughput_rps']):>10}"
+              f"{change(route['p95_ms'], old['p95_ms']):>10}{change(route['p99_ms'], old['p99_ms']):>10}"
+              f"{route['error_rate'] * 100:>8.1f}/{old['error_rate'] * 100:.1f}")
+
+
+def main():
+    args = parse_args()
+    mix = parse_mix(args.mix)
+    if args.url:
+        make_client = lambda: HttpClient(args.url)  # noqa: E731
+    else:
+        _, make_client = prepare_in_process(args)
+    customers, peers = pick_customers(args.users, args.seed)
+    admin = tuple(args.admin.split(':', 1))
+
+    samples = []
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    stop_at = measure_from + args.seconds
+    threads = []
+    for i in range(args.users):
+        customer = customers[i % len(customers)]
+        others = [number for number in peers if number not in customer['numbers']]
+        vu = VirtualUser(make_client, customer, others, admin)
+        thread = threading.Thread(target=run_user, args=(vu, mix, args.seed * 1000 + i, measure_from, stop_at, samples))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    total, routes = summarize(samples, args.seconds)
+    results = {
+        'label': args.label,
+        'git_revision': git_revision(),
+        'started_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'target': args.url or 'in-process',
+        'config': {
+            'users': args.users, 'seconds': args.seconds, 'warmup': args.warmup, 'mix': mix,
+            'scale': None if args.url else args.scale, 'seed': args.seed,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'database': os.environ.get('DATABASE_URL', '').split('://')[0] or 'sqlite',
+        },
+        'total': total,
+        'routes': routes,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as fh:
+        json.dump(results, fh, indent=2)
+
+    print_report(results)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
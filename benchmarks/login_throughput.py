@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark.
+
+Registers a batch of users in a throwaway SQLite database and replays
+concurrent POST /login requests through the Flask test client, reporting
+logins per second and latency percentiles for the configured hasher.
+
+    python benchmarks/login_throughput.py --logins 200 --concurrency 8
+    python benchmarks/login_throughput.py --algorithm scrypt
+    python benchmarks/login_throughput.py --algorithm bcrypt --rounds 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--algorithm', default=os.getenv('PASSWORD_HASH_ALGORITHM', 'bcrypt'))
+    parser.add_argument('--rounds', type=int, default=int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12)))
+    parser.add_argument('--workers', type=int, default=0, help='hashing pool size (0 = cpu count)')
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    args = parse_args()
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file.name}"
+    os.environ['PASSWORD_HASH_ALGORITHM'] = args.algorithm
+    os.environ['PASSWORD_BCRYPT_ROUNDS'] = str(args.rounds)
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    os.environ['PASSWORD_HASH_MAX_QUEUE'] = str(args.logins)
+    # Measures hashing throughput, not the login rate limit
+    os.environ['RATE_LIMIT_URL'] = 'none://'
+
+    from app import app, db, User, password_hasher
+
+    try:
+        with app.app_context():
+            db.create_all()
+            password_hash = password_hasher.hash('password123')
+            db.session.add_all([
+                User(username=f"bench{i}", email=f"bench{i}@example.com",
+                     password_hash=password_hash, first_name='Bench', last_name=str(i))
+                for i in range(args.users)
+            ])
+            db.session.commit()
+
+        def login(i):
+            client = app.test_client()
+            started = time.perf_counter()
+            response = client.post('/login', data={
+                'username': f"bench{i % args.users}",
+                'password': 'password123'
+            })
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - started
+    finally:
+        password_hasher.shutdown()
+        os.unlink(db_file.name)
+
+    latencies = [latency * 1000 for latency, _ in results]
+    failures = sum(1 for _, status in results if status != 302)
+
+    print(f"Algorithm:    {args.algorithm}" + (f" (rounds={args.rounds})" if args.algorithm == 'bcrypt' else ""))
+    print(f"Hash workers: {password_hasher.workers}, client threads: {args.concurrency}")
+    print(f"Logins:       {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), {failures} failed")
+    print(f"Latency ms:   p50={statistics.median(latencies):.1f} "
+          f"p95={percentile(latencies, 95):.1f} p99={percentile(latencies, 99):.1f}")
+
+
+if __name__ == "__main__":
+    main()
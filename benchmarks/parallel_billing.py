@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Parallel subscription billing on SQLite.
+
+Seeds a throwaway SQLite database (production profile) with due
+subscriptions spread over many accounts, bills them with
+``BillingEngine.run_parallel`` and checks that every subscription was
+charged exactly once, that balances moved by exactly the charged amount and
+that no chunk failed. Shards that lose the write lock ("database is
+locked") leave their subscriptions for the next run, so a failure here
+means forked workers are not taking BEGIN IMMEDIATE transactions.
+
+    python benchmarks/parallel_billing.py
+    python benchmarks/parallel_billing.py --subscriptions 20000 --processes 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=2001, help='due subscriptions to bill')
+    parser.add_argument('--accounts', type=int, default=400, help='accounts the subscriptions debit')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=100)
+    return parser.parse_args()
+
+
+def prepare(args):
+    db_dir = tempfile.mkdtemp(prefix='securebank-billing-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir, 'billing.db')}"
+    os.environ['SQLITE_PROFILE'] = 'production'
+    os.environ['BILLING_CHUNK_SIZE'] = str(args.chunk_size)
+    os.environ.setdefault('MAIL_OUTBOX_WORKERS', '0')
+
+    from app import app, db, User, Account, Subscription
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [{
+            'username': f"biller{i}", 'email': f"biller{i}@example.com", 'password_hash': 'x',
+            'first_name': 'Bill', 'last_name': f"User{i}"
+        } for i in range(args.accounts)])
+        user_ids = db.session.execute(db.select(User.id).order_by(User.id)).scalars().all()
+        db.session.execute(db.insert(Account), [{
+            'account_number': f"BILL{i:08d}", 'account_type': 'checking', 'balance': 1000000.0, 'user_id': user_id
+        } for i, user_id in enumerate(user_ids)])
+        accounts = db.session.execute(db.select(Account.id, Account.user_id).order_by(Account.id)).all()
+        due = datetime.utcnow() - timedelta(days=1)
+        db.session.execute(db.insert(Subscription), [{
+            'name': f"Plan {i}", 'amount': 10.0, 'billing_cycle': 'monthly', 'status': 'active',
+            'user_id': accounts[i % len(accounts)].user_id, 'account_id': accounts[i % len(accounts)].id,
+            'next_billing_date': due
+        } for i in range(args.subscriptions)])
+        db.session.commit()
+    return app
+
+
+def main():
+    args = parse_args()
+    app = prepare(args)
+    from app import db, Account, Subscription, Transaction, billing_engine
+
+    with app.app_context():
+        started = time.perf_counter()
+        result = billing_engine.run_parallel(args.processes)
+        seconds = time.perf_counter() - started
+        charged = db.session.query(Transaction).filter_by(transaction_type='subscription').count()
+        still_due = db.session.query(Subscription).filter(Subscription.next_billing_date <= datetime.utcnow()).count()
+        debited = args.accounts * 1000000.0 - db.session.query(db.func.sum(Account.balance)).scalar()
+
+    print(f"Billed {result.charged} of {args.subscriptions} subscriptions with {args.processes} processes "
+          f"in {seconds:.2f}s ({result.chunks} chunks)")
+    failures = [f"chunk failed: {error}" for error in result.errors]
+    if result.charged != args.subscriptions or charged != args.subscriptions:
+        failures.append(f"{result.charged} charged, {charged} charge transactions, {args.subscriptions} due")
+    if still_due:
+        failures.append(f"{still_due} subscriptions are still due")
+    if abs(debited - args.subscriptions * 10.0) > 0.005:
+        failures.append(f"balances moved by {debited:.2f}, expected {args.subscriptions * 10.0:.2f}")
+    for failure in failures:
+        print("FAIL", failure)
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
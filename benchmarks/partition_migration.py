@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Check the monthly partitioning migration against a real PostgreSQL.
+
+Migrates an EMPTY scratch database to the revision before partitioning,
+seeds transactions over several months (plus fraud alerts and transfer
+pairs pointing at them), then upgrades and checks that every row was
+copied, that a partition exists for each month up to
+TRANSACTION_PARTITION_MONTHS_AHEAD, that the indexes kept their names,
+that ``ensure_future`` moves rows out of the default partition, and that
+the downgrade restores a plain table. Exits non-zero on any failure.
+
+Skipped (exit 0) unless a PostgreSQL URL is given, so it can sit in CI
+next to the SQLite gates:
+
+    POSTGRES_TEST_URL=postgresql://localhost/securebank_scratch python benchmarks/partition_migration.py
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BEFORE = '0b6e4d1f9a28'
+PARTITIONED = '5d8e2f1a9c4b'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--database-url', default=os.getenv('POSTGRES_TEST_URL'),
+                        help='scratch PostgreSQL database (default: $POSTGRES_TEST_URL)')
+    parser.add_argument('--months', type=int, default=6, help='months of history to seed')
+    parser.add_argument('--per-month', type=int, default=200, help='transactions per month')
+    return parser.parse_args()
+
+
+def seed(db, args):
+    from app import Account, FraudAlert, Transaction, User
+
+    # Core inserts: the ORM hooks maintain tables later revisions add
+    db.session.execute(db.insert(User), [{'username': 'partition', 'email': 'partition@example.com',
+                                          'password_hash': 'x', 'first_name': 'P', 'last_name': 'M'}])
+    user_id = db.session.execute(db.select(User.id)).scalar()
+    db.session.execute(db.insert(Account), [{'account_number': f"PART{i}", 'account_type': 'checking',
+                                             'balance': 0.0, 'user_id': user_id} for i in range(2)])
+    first, second = db.session.execute(db.select(Account.id).order_by(Account.id)).scalars().all()
+    now = datetime.utcnow()
+    rows = [{'transaction_type': 'deposit', 'amount': 1.0, 'description': f"seed {m}/{i}",
+             'account_id': first if i % 2 else second, 'timestamp': now - timedelta(days=30 * m + i % 28)}
+            for m in range(args.months) for i in range(args.per_month)]
+    db.session.execute(db.insert(Transaction), rows)
+    ids = db.session.execute(db.select(Transaction.id).order_by(Transaction.id).limit(2)).scalars().all()
+    db.session.execute(db.update(Transaction).where(Transaction.id == ids[0]).values(related_transaction_id=ids[1]))
+    db.session.execute(db.insert(FraudAlert), [{'transaction_id': ids[0], 'alert_type': 'seed', 'severity': 'low',
+                                                'description': 'seed', 'is_resolved': False, 'created_at': now}])
+    db.session.commit()
+    return len(rows)
+
+
+def indexes(db):
+    return set(db.session.execute(db.text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = to_regclass('\"transaction\"')"
+    )).scalars())
+
+
+def main():
+    args = parse_args()
+    if not args.database_url:
+        print("SKIP: set POSTGRES_TEST_URL (or --database-url) to a scratch PostgreSQL database")
+        return
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('MAIL_OUTBOX_WORKERS', '0')
+
+    from flask_migrate import downgrade, upgrade
+    from app import app, db, transaction_partitions
+    from transaction_partitions import add_months, month_start, partition_name
+
+    failures = []
+
+    def expect(condition, message):
+        print(('ok   ' if condition else 'FAIL ') + message)
+        if not condition:
+            failures.append(message)
+
+    with app.app_context():
+        if db.session.execute(db.text(
+            "SELECT count(*) FROM information_schema.tables WHERE table_schema = current_schema()"
+        )).scalar():
+            sys.exit("The database is not empty; point this at a scratch database")
+
+        upgrade(revision=BEFORE)
+        seeded = seed(db, args)
+        before = indexes(db)
+        upgrade(revision=PARTITIONED)
+        db.session.remove()
+
+        expect(transaction_partitions.is_partitioned(), "transaction is partitioned")
+        count = db.session.execute(db.text('SELECT count(*) FROM "transaction"')).scalar()
+        expect(count == seeded, f"{count} of {seeded} rows copied")
+        names = {p['name'] for p in transaction_partitions.partitions()}
+        this_month = month_start(date.today())
+        wanted = {partition_name(add_months(this_month, i))
+                  for i in range(-args.months, app.config['TRANSACTION_PARTITION_MONTHS_AHEAD'] + 1)}
+        expect(wanted <= names, f"partitions up to {app.config['TRANSACTION_PARTITION_MONTHS_AHEAD']} months ahead")
+        expect(indexes(db) == before, "index names kept")
+        expect(all(len(name) <= 63 for name in before), "index names fit in identifiers")
+
+        far = add_months(this_month, app.config['TRANSACTION_PARTITION_MONTHS_AHEAD'] + 2)
+        account_id = db.session.execute(db.text("SELECT min(id) FROM account")).scalar()
+        db.session.execute(db.text(
+            'INSERT INTO "transaction" (transaction_type, amount, account_id, "timestamp") '
+            "VALUES ('deposit', 1, :account_id, :ts)"
+        ), {'account_id': account_id, 'ts': datetime(far.year, far.month, 2)})
+        db.session.commit()
+        transaction_partitions.ensure_future(months_ahead=app.config['TRANSACTION_PARTITION_MONTHS_AHEAD'] + 2)
+        waiting = db.session.execute(db.text('SELECT count(*) FROM transaction_default')).scalar()
+        expect(waiting == 0 and partition_name(far) in {p['name'] for p in transaction_partitions.partitions()},
+               "ensure_future moved rows out of the default partition")
+        db.session.commit()
+
+        downgrade(revision=BEFORE)
+        db.session.remove()
+        expect(not transaction_partitions.is_partitioned(), "downgrade restores a plain table")
+        count = db.session.execute(db.text('SELECT count(*) FROM "transaction"')).scalar()
+        expect(count == seeded + 1, f"{count} of {seeded + 1} rows restored")
+        expect(indexes(db) == before, "index names restored")
+
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Per-route SQL query budgets.
+
+Seeds a throwaway SQLite database with the synthetic data generator, signs
+in as the owner of the busiest account (and as the admin), and requests
+every page with cold caches under ``sql_profiler.assert_max_queries``.
+Prints each route's query count and exits non-zero when a route goes over
+its budget, so an N+1 introduced by a lazy relationship fails CI instead of
+surfacing in production. Budgets do not grow with the data, which is what
+catches a query per row. N+1 suspects are printed by the profiler.
+
+    python benchmarks/query_budget.py
+    python benchmarks/query_budget.py --users 500 --slack 0
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'password123'
+ADMIN = ('admin', 'admin123')
+
+# Queries allowed for one cold-cache request; {account} is the customer's busiest account.
+# Conditional views (dashboard, account, cards, /api/*) re-read the signed-in user for their body.
+CUSTOMER_BUDGETS = {
+    '/dashboard': 7,
+    '/profile': 4,
+    '/account/{account}': 6,
+    '/transfer': 2,
+    '/deposit': 2,
+    '/withdraw': 2,
+    '/cards': 5,
+    '/subscriptions': 4,
+    '/upis': 2,
+    '/api/transactions': 5,
+    '/api/transactions?account_id={account}': 6,
+    '/statements/view': 4,
+    '/api/summary': 5,
+    '/api/summary?account_id={account}': 6,
+}
+ADMIN_BUDGETS = {
+    '/admin/alerts': 3,
+    '/admin/analytics': 3,
+    '/admin/transactions/search?q=transfer': 2,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=200, help='generated customers to seed')
+    parser.add_argument('--slack', type=int, default=0, help='extra queries allowed on every route')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+def prepare(args):
+    db_dir = tempfile.mkdtemp(prefix='securebank-budget-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir, 'budget.db')}"
+    os.environ.setdefault('MAIL_OUTBOX_WORKERS', '0')
+    os.environ.setdefault('SQL_PROFILER', 'on')
+
+    from app import app, db, User, password_hasher, transaction_search, fraud_rollups, account_summaries
+    from synthetic_data import GenerationSpec, SyntheticDataGenerator
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        transaction_search.ensure_index()
+        db.session.add(User(username=ADMIN[0], email='admin@securebank.com',
+                            password_hash=password_hasher.hash(ADMIN[1]),
+                            first_name='Admin', last_name='User', is_admin=True))
+        db.session.commit()
+        with transaction_search.bulk_load():
+            SyntheticDataGenerator(app, db).generate(
+                GenerationSpec(users=args.users, seed=args.seed), password_hash=password_hasher.hash(PASSWORD)
+            )
+        fraud_rollups.rebuild()
+        account_summaries.rebuild()
+        db.session.commit()
+    return app
+
+
+def busiest_customer():
+    """The owner of the account with the most transactions, and that account"""
+    from app import app, db, Account, Transaction, User
+
+    with app.app_context():
+        account_id, user_id = db.session.query(Transaction.account_id, Account.user_id)\
+            .join(Account, Account.id == Transaction.account_id)\
+            .group_by(Transaction.account_id, Account.user_id)\
+            .order_by(db.func.count(Transaction.id).desc())\
+            .first()
+        return db.session.get(User, user_id).username, account_id
+
+
+def clear_caches():
+    from app import query_cache, template_caching
+    for backend in (query_cache.backend, template_caching.backend):
+        clear = getattr(backend, 'clear', None)
+        if clear:
+            clear()
+
+
+def check_routes(client, budgets, context, slack):
+    from app import sql_profiler
+    from sql_profiler import QueryBudgetExceeded
+
+    failures = []
+    for template, budget in budgets.items():
+        path = template.format(**context)
+        clear_caches()
+        try:
+            with sql_profiler.assert_max_queries(budget + slack) as statements:
+                response = client.get(path)
+            verdict = 'ok'
+        except QueryBudgetExceeded as e:
+            failures.append(f"{path}: {e}")
+            verdict = 'OVER'
+        if response.status_code != 200:
+            failures.append(f"{path}: HTTP {response.status_code}")
+            verdict = f"HTTP {response.status_code}"
+        print(f"  {path:<45}{len(statements):>4} / {budget:<4}{verdict}")
+    return failures
+
+
+def main():
+    args = parse_args()
+    print("Seeding...")
+    app = prepare(args)
+    username, account_id = busiest_customer()
+    context = {'account': account_id}
+
+    failures = []
+    print(f"\nCustomer pages ({username}):")
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': PASSWORD})
+    failures += check_routes(client, CUSTOMER_BUDGETS, context, args.slack)
+
+    print("\nAdmin pages:")
+    admin = app.test_client()
+    admin.post('/login', data={'username': ADMIN[0], 'password': ADMIN[1]})
+    failures += check_routes(admin, ADMIN_BUDGETS, context, args.slack)
+
+    for failure in failures:
+        print(f"\nFAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("\nOK: every route within its query budget")
+
+
+if __name__ == '__main__':
+    main()
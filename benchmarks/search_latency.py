@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Transaction search latency benchmark.
+
+Fills a throwaway SQLite database with synthetic transactions, builds the
+FTS5 index and times a mix of investigator searches through
+TransactionSearch: free text, account, amount range, IP and combinations,
+reporting p50/p95/max latency per query kind.
+
+    python benchmarks/search_latency.py --rows 1000000
+    python benchmarks/search_latency.py --rows 200000 --repeat 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MERCHANTS = ['Coffee Shop', 'Grocery Store', 'Gas Station', 'Online Retailer', 'Restaurant',
+             'Pharmacy', 'Electronics Store', 'Airline', 'Hotel', 'Bookstore', 'Cinema', 'Gym']
+CITIES = ['New York', 'London', 'Berlin', 'Mumbai', 'Tokyo', 'Sydney', 'Toronto', 'Paris',
+          'Singapore', 'Dubai', 'Lagos', 'Sao Paulo']
+TYPES = ['deposit', 'withdrawal', 'transfer', 'subscription', 'upi']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=30, help='runs of each query kind')
+    parser.add_argument('--batch', type=int, default=20000)
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def generate(args, db, Account, Transaction):
+    from sqlalchemy import insert
+
+    db.session.execute(insert(Account), [{
+        'account_number': f"ACC{i:08d}", 'account_type': random.choice(['savings', 'checking']),
+        'balance': 1000.0, 'user_id': 1
+    } for i in range(1, args.accounts + 1)])
+    db.session.commit()
+
+    start = datetime.utcnow() - timedelta(days=365)
+    written = 0
+    while written < args.rows:
+        batch = min(args.batch, args.rows - written)
+        rows = []
+        for _ in range(batch):
+            kind = random.choice(TYPES)
+            amount = round(random.lognormvariate(3.5, 1.2), 2)
+            rows.append({
+                'transaction_type': kind,
+                'amount': amount if kind == 'deposit' else -amount,
+                'description': f"{random.choice(MERCHANTS)} purchase #{random.randint(1, 99999)}",
+                'account_id': random.randint(1, args.accounts),
+                'timestamp': start + timedelta(seconds=random.randint(0, 365 * 86400)),
+                'location': random.choice(CITIES),
+                'ip_address': f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}",
+                'is_fraudulent': False,
+                'fraud_score': 0.0,
+            })
+        db.session.execute(insert(Transaction), rows)
+        db.session.commit()
+        written += batch
+        print(f"\r  {written:,} rows", end='', flush=True)
+    print()
+
+
+def main():
+    args = parse_args()
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_file.name}"
+
+    from app import app, db, Account, Transaction, User, transaction_search
+
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username='bench', email='bench@example.com', password_hash='x',
+                                first_name='Bench', last_name='User'))
+            db.session.commit()
+
+            print(f"Generating {args.rows:,} transactions...")
+            started = time.perf_counter()
+            generate(args, db, Account, Transaction)
+            print(f"  loaded in {time.perf_counter() - started:.1f}s")
+            started = time.perf_counter()
+            transaction_search.ensure_index()
+            print(f"  full-text index built in {time.perf_counter() - started:.1f}s")
+
+            def account():
+                return random.randint(1, args.accounts)
+
+            def ip():
+                return db.session.query(Transaction.ip_address)\
+                    .filter(Transaction.id == random.randint(1, args.rows)).scalar()
+
+            kinds = {
+                'text (common word)': lambda: dict(q='coffee'),
+                'text (two words)': lambda: dict(q=f"{random.choice(CITIES).split()[0]} {random.choice(MERCHANTS).split()[0]}"),
+                'text (rare id)': lambda: dict(q=str(random.randint(1, 99999))),
+                'account': lambda: dict(account_id=account()),
+                'account + text': lambda: dict(account_id=account(), q=random.choice(MERCHANTS).split()[0]),
+                'amount range': lambda: dict(min_amount=4900, max_amount=5000),
+                'ip address': lambda: dict(ip_address=ip()),
+                'text + amount + dates': lambda: dict(q='hotel', min_amount=100, max_amount=500,
+                                                      since=datetime.utcnow() - timedelta(days=30)),
+                'text page 10': lambda: dict(q='grocery', page=10),
+            }
+
+            print(f"\n{'query':<24}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+            for name, make_params in kinds.items():
+                timings = []
+                for _ in range(args.repeat):
+                    params = make_params()
+                    started = time.perf_counter()
+                    transaction_search.search(**params)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    db.session.rollback()
+                print(f"{name:<24}{percentile(timings, 50):>10.2f}{percentile(timings, 95):>10.2f}{max(timings):>10.2f}")
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_file.name + suffix):
+                os.unlink(db_file.name + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Concurrent SQLite read/write benchmark.
+
+Runs several processes against one SQLite file, mimicking gunicorn
+workers: writers move money between accounts (read balance, update it,
+insert a transaction row) and readers sum recent transactions. The same
+workload is run with SQLite's defaults and with the production profile
+from sqlite_tuning.py, reporting throughput and "database is locked"
+failures for each.
+
+    python benchmarks/sqlite_concurrency.py --writers 4 --readers 4 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+# Add parent directory to path to import our modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_tuning import SQLITE_DEFAULTS, configure_sqlite  # noqa: E402
+
+ACCOUNTS = 1000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    return parser.parse_args()
+
+
+def make_engine(path, profile):
+    engine = create_engine(f"sqlite:///{path}")
+    configure_sqlite(engine, dict(SQLITE_DEFAULTS, SQLITE_PROFILE=profile))
+    return engine
+
+
+def setup_database(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE account (id INTEGER PRIMARY KEY, balance FLOAT NOT NULL)")
+        conn.exec_driver_sql(
+            "CREATE TABLE \"transaction\" (id INTEGER PRIMARY KEY, account_id INTEGER NOT NULL, "
+            "amount FLOAT NOT NULL, timestamp FLOAT NOT NULL)"
+        )
+        conn.exec_driver_sql("CREATE INDEX ix_transaction_account ON \"transaction\" (account_id, timestamp)")
+        conn.execute(text("INSERT INTO account (id, balance) VALUES (:id, 1000000)"),
+                     [{'id': i} for i in range(1, ACCOUNTS + 1)])
+    engine.dispose()
+
+
+def writer(path, profile, deadline, results):
+    engine = make_engine(path, profile)
+    ops = errors = 0
+    while time.time() < deadline:
+        source, target = random.sample(range(1, ACCOUNTS + 1), 2)
+        amount = round(random.uniform(1, 100), 2)
+        try:
+            # Same as immediate_transaction(): take the write lock up front.
+            # The option is a no-op without the production profile.
+            with engine.connect() as conn, conn.execution_options(sqlite_immediate=True).begin():
+                balance = conn.execute(text("SELECT balance FROM account WHERE id = :id"),
+                                       {'id': source}).scalar()
+                if balance >= amount:
+                    conn.execute(text("UPDATE account SET balance = balance - :a WHERE id = :id"),
+                                 {'a': amount, 'id': source})
+                    conn.execute(text("UPDATE account SET balance = balance + :a WHERE id = :id"),
+                                 {'a': amount, 'id': target})
+                    conn.execute(text("INSERT INTO \"transaction\" (account_id, amount, timestamp) "
+                                      "VALUES (:id, :a, :t)"),
+                                 {'id': source, 'a': -amount, 't': time.time()})
+            ops += 1
+        except OperationalError:
+            errors += 1
+    results.put(('write', ops, errors))
+
+
+def reader(path, profile, deadline, results):
+    engine = make_engine(path, profile)
+    ops = errors = 0
+    while time.time() < deadline:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM \"transaction\" "
+                                  "WHERE account_id = :id"),
+                             {'id': random.randint(1, ACCOUNTS)}).one()
+                conn.execute(text("SELECT balance FROM account WHERE id = :id"),
+                             {'id': random.randint(1, ACCOUNTS)}).scalar()
+            ops += 1
+        except OperationalError:
+            errors += 1
+    results.put(('read', ops, errors))
+
+
+def run(profile, args):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.unlink(path)
+    try:
+        setup_database(path)
+        results = multiprocessing.Queue()
+        deadline = time.time() + args.seconds
+        processes = [multiprocessing.Process(target=writer, args=(path, profile, deadline, results))
+                     for _ in range(args.writers)]
+        processes += [multiprocessing.Process(target=reader, args=(path, profile, deadline, results))
+                      for _ in range(args.readers)]
+        for process in processes:
+            process.start()
+        totals = {'write': [0, 0], 'read': [0, 0]}
+        for _ in processes:
+            kind, ops, errors = results.get()
+            totals[kind][0] += ops
+            totals[kind][1] += errors
+        for process in processes:
+            process.join()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+    print(f"{profile:>10}: writes {totals['write'][0] / args.seconds:8.1f}/s "
+          f"({totals['write'][1]} locked), reads {totals['read'][0] / args.seconds:8.1f}/s "
+          f"({totals['read'][1]} locked)")
+    return totals
+
+
+def main():
+    args = parse_args()
+    print(f"{args.writers} writer and {args.readers} reader processes, {args.seconds:.0f}s per profile")
+    before = run('default', args)
+    after = run('production', args)
+    for kind in ('write', 'read'):
+        if before[kind][0]:
+            print(f"{kind} throughput change: {after[kind][0] / before[kind][0]:.2f}x")
+    total_before = before['write'][0] + before['read'][0]
+    total_after = after['write'][0] + after['read'][0]
+    if total_before:
+        print(f"total throughput change: {total_after / total_before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
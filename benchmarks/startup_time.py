@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+App import-time benchmark and regression guard.
+
+Imports app.py in fresh interpreters under ``python -X importtime`` and
+reports the median wall time, the slowest imported modules and whether any
+module that should load lazily (pandas, scikit-learn, reportlab, smtplib,
+...) was pulled in at import. Exits non-zero when the median exceeds
+``--max-seconds`` or a lazy module was imported, so it can gate CI.
+
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --runs 10 --max-seconds 1.5 --top 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on the routes or threads that need them, never by ``import app``
+LAZY_MODULES = ('pandas', 'numpy', 'sklearn', 'joblib', 'reportlab', 'smtplib', 'email.mime')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=2.0,
+                        help='fail when the median import time exceeds this')
+    parser.add_argument('--top', type=int, default=15, help='slowest modules to list')
+    return parser.parse_args()
+
+
+def parse_importtime(stderr):
+    """Map module name -> cumulative import time in microseconds"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative_us)
+    return modules
+
+
+def import_once(database_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}", FRAUD_MODEL_WARMUP='background')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"import app failed:\n{result.stderr[-2000:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'startup.db')
+        import_once(database_path)  # warm the OS page cache and .pyc files
+        runs = [import_once(database_path) for _ in range(args.runs)]
+
+    timings = [elapsed for elapsed, _ in runs]
+    modules = runs[-1][1]
+    median = statistics.median(timings)
+    print(f"import app: median {median * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms over {args.runs} runs")
+
+    print("\nSlowest top-level imports (cumulative):")
+    top_level = {name: us for name, us in modules.items() if '.' not in name}
+    for name, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    eager = sorted(name for name in modules
+                   if any(name == lazy or name.startswith(lazy + '.') for lazy in LAZY_MODULES))
+    failures = []
+    if eager:
+        failures.append(f"modules that should load lazily were imported: {', '.join(eager[:10])}")
+    if median > args.max_seconds:
+        failures.append(f"median import time {median:.2f}s exceeds the {args.max_seconds:.2f}s budget")
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+import multiprocessing
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.exc import OperationalError
+
+from sqlite_tuning import begin_immediate
+
+BILLING_CYCLES = {
+    'daily': relativedelta(days=1),
+    'weekly': relativedelta(weeks=1),
+    'monthly': relativedelta(months=1),
+    'quarterly': relativedelta(months=3),
+    'yearly': relativedelta(years=1),
+    'annual': relativedelta(years=1),
+    'annually': relativedelta(years=1),
+}
+
+# Subscriptions that could not be charged are retried after this long
+RETRY_INTERVAL = timedelta(days=1)
+
+# Times a chunk is retried after waiting out SQLite's busy timeout
+LOCK_RETRIES = 5
+
+
+def _lock_timeout(error):
+    return isinstance(error, OperationalError) and 'database is locked' in str(error)
+
+
+def cycle_delta(billing_cycle):
+    """Map the free-text billing cycle to a period, defaulting to monthly"""
+    return BILLING_CYCLES.get((billing_cycle or '').strip().lower(), BILLING_CYCLES['monthly'])
+
+
+@dataclass
+class BillingResult:
+    charged: int = 0
+    amount: float = 0.0
+    insufficient_funds: int = 0
+    card_blocked: int = 0
+    no_funding_source: int = 0
+    flagged: int = 0
+    chunks: int = 0
+    errors: list = field(default_factory=list)
+
+    def merge(self, other):
+        for name in ('charged', 'amount', 'insufficient_funds', 'card_blocked',
+                     'no_funding_source', 'flagged', 'chunks'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.errors.extend(other.errors)
+        return self
+
+
+class BillingEngine:
+    """Charges due subscriptions in chunks with set-based writes.
+
+    Each chunk is one transaction: a single SELECT of due subscriptions
+    (keyset paginated on id), one locked read of the debited balances,
+    one UPDATE ... CASE for all balance changes, one multi-row INSERT of
+    transactions, one batched fraud scoring call and one bulk UPDATE of
+    the subscriptions' next due dates.
+    """
+
+    def __init__(self, app, db, fraud_detector, Subscription, Account, Card,
+                 Transaction, FraudAlert, query_cache=None, rollups=None, summaries=None, versions=None,
+                 chunk_size=500, fraud_threshold=0.7):
+        self.app = app
+        self.db = db
+        self.fraud_detector = fraud_detector
+        self.Subscription = Subscription
+        self.Account = Account
+        self.Card = Card
+        self.Transaction = Transaction
+        self.FraudAlert = FraudAlert
+        self.query_cache = query_cache
+        self.rollups = rollups
+        self.summaries = summaries
+        self.versions = versions
+        self.chunk_size = chunk_size
+        self.fraud_threshold = fraud_threshold
+
+    def run(self, now=None, shard=0, shards=1):
+        """Bill every due subscription whose debited account falls in ``shard``"""
+        now = now or datetime.utcnow()
+        result = BillingResult()
+        last_id = 0
+        lock_waits = 0
+        while True:
+            # Counted only once the chunk commits, so a retried chunk is not counted twice
+            chunk = BillingResult(chunks=1)
+            due = None
+            try:
+                # Each chunk reads balances and then writes them: on SQLite take
+                # the write lock up front, whichever process or thread runs this
+                begin_immediate(self.db.session)
+                due = self._due_chunk(now, last_id, shard, shards)
+                if not due:
+                    self.db.session.rollback()
+                    break
+                debited = self._bill_chunk(due, now, chunk)
+                self.db.session.commit()
+            except Exception as e:
+                self.db.session.rollback()
+                if _lock_timeout(e) and lock_waits < LOCK_RETRIES:
+                    # Other shards held the SQLite write lock past the busy timeout
+                    lock_waits += 1
+                    continue
+                if due is None:
+                    result.errors.append(f"shard {shard} stopped after subscription {last_id}: {e}")
+                    break
+                chunk = BillingResult(chunks=1, errors=[f"chunk ending at subscription {due[-1].id}: {e}"])
+            else:
+                lock_waits = 0
+                if self.query_cache is not None:
+                    # Balances and alerts were written with Core statements,
+                    # which bypass the ORM events that normally invalidate
+                    self.query_cache.invalidate_rows(self.Account, debited)
+                    self.query_cache.invalidate_model(self.FraudAlert)
+            last_id = due[-1].id
+            result.merge(chunk)
+        return result
+
+    def run_parallel(self, processes, now=None):
+        """Split one billing run across worker processes by account shard"""
+        if processes <= 1:
+            return self.run(now=now)
+        now = now or datetime.utcnow()
+        global _parallel_engine
+        _parallel_engine = self
+        # Loaded once here and inherited by the children, instead of by each
+        # child inside its first chunk while it holds the SQLite write lock
+        self.fraud_detector.warm_up()
+        # Children must not share the parent's pooled connections
+        self.db.engine.dispose()
+        ctx = multiprocessing.get_context('fork')
+        with ctx.Pool(processes) as pool:
+            results = pool.map(_run_shard, [(now, shard, processes) for shard in range(processes)])
+        return _merge_all(results)
+
+    # ---- internals ----
+
+    def _due_chunk(self, now, last_id, shard, shards):
+        Subscription, Card = self.Subscription, self.Card
+        debit_account_id = func.coalesce(Card.account_id, Subscription.account_id)
+        query = self.db.session.query(
+            Subscription.id, Subscription.name, Subscription.amount, Subscription.billing_cycle,
+            Subscription.next_billing_date, Subscription.card_id, Card.blocked,
+            debit_account_id.label('account_id')
+        ).outerjoin(Card, Subscription.card_id == Card.id).filter(
+            Subscription.status.in_(('active', 'past_due')),
+            Subscription.next_billing_date <= now,
+            Subscription.id > last_id
+        )
+        if shards > 1:
+            query = query.filter(func.coalesce(debit_account_id, 0) % shards == shard)
+        return query.order_by(Subscription.id).limit(self.chunk_size).all()
+
+    def _bill_chunk(self, due, now, result):
+        Account, Transaction = self.Account, self.Transaction
+        account_ids = {row.account_id for row in due if row.account_id is not None}
+        balances = dict(
+            self.db.session.query(Account.id, Account.balance)
+            .filter(Account.id.in_(account_ids)).with_for_update().all()
+        ) if account_ids else {}
+
+        debits = {}
+        charges = []
+        subscription_updates = []
+        for row in due:
+            if row.account_id is None or row.account_id not in balances:
+                result.no_funding_source += 1
+                subscription_updates.append(self._retry(row, now))
+                continue
+            if row.card_id is not None and row.blocked:
+                result.card_blocked += 1
+                subscription_updates.append(self._retry(row, now))
+                continue
+            available = (balances[row.account_id] or 0.0) - debits.get(row.account_id, 0.0)
+            if available < row.amount:
+                result.insufficient_funds += 1
+                subscription_updates.append(self._retry(row, now))
+                continue
+
+            debits[row.account_id] = debits.get(row.account_id, 0.0) + row.amount
+            charges.append(Transaction(
+                transaction_type='subscription',
+                amount=-row.amount,
+                description=f"Subscription payment: {row.name}",
+                account_id=row.account_id,
+                card_id=row.card_id,
+                subscription_id=row.id,
+                timestamp=now
+            ))
+            subscription_updates.append({
+                'id': row.id,
+                'status': 'active',
+                'next_billing_date': row.next_billing_date + cycle_delta(row.billing_cycle),
+                'last_billed_at': now
+            })
+
+        if debits:
+            self.db.session.execute(
+                update(Account)
+                .where(Account.id.in_(debits))
+                .values(balance=Account.balance - case(debits, value=Account.id))
+                .execution_options(synchronize_session=False)
+            )
+
+        if charges:
+            scores = self.fraud_detector.predict_fraud_batch(charges)
+            rows = []
+            for charge, score in zip(charges, scores):
+                rows.append({
+                    'transaction_type': charge.transaction_type,
+                    'amount': charge.amount,
+                    'description': charge.description,
+                    'account_id': charge.account_id,
+                    'card_id': charge.card_id,
+                    'subscription_id': charge.subscription_id,
+                    'timestamp': charge.timestamp,
+                    'fraud_score': float(score),
+                    'is_fraudulent': bool(score > self.fraud_threshold)
+                })
+            ids = self.db.session.execute(
+                insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+                rows
+            ).scalars().all()
+            alerts = [{
+                'transaction_id': transaction_id,
+                'alert_type': 'High Fraud Score',
+                'severity': 'high',
+                'description': f"Transaction flagged with fraud score: {row['fraud_score']:.3f}",
+                'is_resolved': False,
+                'created_at': now
+            } for transaction_id, row in zip(ids, rows) if row['is_fraudulent']]
+            if alerts:
+                self.db.session.execute(insert(self.FraudAlert), alerts)
+            if self.rollups is not None:
+                self.rollups.record(self.db.session, transactions=rows, alerts=alerts)
+            if self.summaries is not None:
+                self.summaries.record(self.db.session, rows)
+            result.charged += len(rows)
+            result.amount += sum(-row['amount'] for row in rows)
+            result.flagged += len(alerts)
+
+        if self.versions is not None:
+            self.versions.bump(self.db.session, accounts=debits)
+
+        if subscription_updates:
+            self.db.session.execute(update(self.Subscription), subscription_updates)
+        return list(debits)
+
+    @staticmethod
+    def _retry(row, now):
+        return {'id': row.id, 'status': 'past_due', 'next_billing_date': now + RETRY_INTERVAL}
+
+
+_parallel_engine = None
+
+
+def _run_shard(args):
+    now, shard, shards = args
+    engine = _parallel_engine
+    with engine.app.app_context():
+        return engine.run(now=now, shard=shard, shards=shards)
+
+
+def _merge_all(results):
+    total = BillingResult()
+    for result in results:
+        total.merge(result)
+    return total
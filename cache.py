@@ -0,0 +1,371 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+
+class CacheMetrics:
+    """Thread-safe hit/miss counters shared by all cache backends"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.sets = 0
+            self.invalidations = 0
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'sets': self.sets,
+                'invalidations': self.invalidations,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class LRUCache:
+    """In-process LRU cache with a per-entry time to live"""
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache:
+    """Cache backend for any client speaking the redis-py API (redis, fakeredis, ...)"""
+
+    def __init__(self, client, ttl=60, prefix='securebank:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class NullCache:
+    """Backend that never stores anything, used when caching is disabled"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+def create_backend(url, max_entries=10000, ttl=60):
+    """Build a cache backend from a URL such as memory://, redis://host:6379/0 or none://"""
+    if not url or url.startswith('memory://'):
+        return LRUCache(max_entries=max_entries, ttl=ttl)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisCache.from_url(url, ttl=ttl)
+    if url.startswith('none://'):
+        return NullCache()
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+class QueryCache:
+    """Caches primary-key and lookup queries for registered models.
+
+    Rows are cached as plain column dictionaries and re-attached to the
+    current session without a SELECT. Lookups (e.g. account_number -> id,
+    user_id -> [ids]) only store primary keys, so a changed row is
+    invalidated in exactly one place.
+
+    Sessions flagged with ``fresh_reads`` (views answering conditional
+    GETs, see ``DataVersions.conditional``) read through to the database
+    and only refill the cache.
+
+    Invalidation only reaches other workers through a shared backend, so
+    columns that change with every write (``Account.balance``) can be
+    registered as ``volatile``: they are never cached, and a cache hit
+    reads them back with one small query.
+    """
+
+    def __init__(self, db, backend, metrics=None):
+        self.db = db
+        self.backend = backend
+        self.metrics = metrics or CacheMetrics()
+        self.lookups = {}
+        self.aggregates = {}
+        self.volatile = {}
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_soft_rollback', self._after_rollback)
+
+    # ---- registration / invalidation ----
+
+    def register(self, model, lookups=(), aggregates=(), volatile=()):
+        """Enable caching for a model, the columns it is looked up by, the
+        cached aggregate keys that must be dropped whenever it changes and
+        the columns that are always read from the database"""
+        self.lookups[model] = tuple(lookups)
+        self.aggregates[model] = tuple(aggregates)
+        self.volatile[model] = tuple(volatile)
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, self._on_write)
+
+    def _on_write(self, mapper, connection, target):
+        model = mapper.class_
+        state = inspect(target)
+        keys = [self._pk_key(model, target.id)]
+        for column in self.lookups.get(model, ()):
+            history = state.attrs[column].history
+            values = set(history.added or ()) | set(history.deleted or ()) | set(history.unchanged or ())
+            keys.extend(self._lookup_key(model, column, value) for value in values)
+        keys.extend(self.aggregates.get(model, ()))
+        self.invalidate(*keys)
+        # Invalidate again once the transaction commits so a concurrent
+        # reader cannot repopulate the cache with the pre-commit row.
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault('cache_invalidations', set()).update(keys)
+
+    def _after_commit(self, session):
+        keys = session.info.pop('cache_invalidations', None)
+        if keys:
+            self.invalidate(*keys)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('cache_invalidations', None)
+
+    def invalidate(self, *keys):
+        self.backend.delete(*keys)
+        self.metrics.incr('invalidations', len(keys))
+
+    def invalidate_model(self, model):
+        """Drop a model's aggregate keys after a bulk write that skipped ORM events"""
+        keys = self.aggregates.get(model, ())
+        if keys:
+            self.invalidate(*keys)
+
+    def invalidate_rows(self, model, idents):
+        """Drop cached rows changed outside the ORM (bulk or Core UPDATEs)"""
+        keys = [self._pk_key(model, ident) for ident in idents]
+        if keys:
+            self.invalidate(*keys)
+
+    # ---- lookups ----
+
+    def get(self, model, ident):
+        """Return the instance with primary key ``ident``, like ``session.get``"""
+        if ident is None:
+            return None
+        ident = int(ident)
+        session = self.db.session
+        existing = session.identity_map.get(identity_key(model, ident))
+        if existing is not None:
+            return existing
+
+        key = self._pk_key(model, ident)
+        row = self.backend.get(key) if self._can_read() else None
+        if row is not None:
+            self.metrics.incr('hits')
+            instance = self._attach(model, row)
+            self._load_volatile(model, [instance])
+            return instance
+
+        self.metrics.incr('misses')
+        instance = session.get(model, ident)
+        if instance is not None and self._can_store():
+            self._store(model, instance)
+        return instance
+
+    def get_by(self, model, column, value):
+        """Return the single instance whose unique ``column`` equals ``value``"""
+        key = self._lookup_key(model, column, value)
+        ident = self.backend.get(key) if self._can_read() else None
+        if ident is not None:
+            self.metrics.incr('hits')
+            return self.get(model, ident)
+
+        self.metrics.incr('misses')
+        instance = model.query.filter_by(**{column: value}).first()
+        if instance is not None and self._can_store():
+            self.backend.set(key, instance.id)
+            self.metrics.incr('sets')
+            self._store(model, instance)
+        return instance
+
+    def get_id_by(self, model, column, value):
+        """Return only the primary key for a unique lookup, caching the mapping"""
+        key = self._lookup_key(model, column, value)
+        ident = self.backend.get(key) if self._can_read() else None
+        if ident is not None:
+            self.metrics.incr('hits')
+            return ident
+
+        self.metrics.incr('misses')
+        row = self.db.session.query(model.id).filter_by(**{column: value}).first()
+        if row is None or not self._can_store():
+            return row.id if row is not None else None
+        self.backend.set(key, row.id)
+        self.metrics.incr('sets')
+        return row.id
+
+    def list_by(self, model, column, value):
+        """Return all instances whose ``column`` equals ``value``, ordered by id"""
+        key = self._lookup_key(model, column, value)
+        idents = self.backend.get(key) if self._can_read() else None
+        if idents is not None:
+            self.metrics.incr('hits')
+            instances = self._get_many(model, idents)
+            return [instance for instance in instances if instance is not None]
+
+        self.metrics.incr('misses')
+        instances = model.query.filter_by(**{column: value}).order_by(model.id).all()
+        if not self._can_store():
+            return instances
+        self.backend.set(key, [instance.id for instance in instances])
+        self.metrics.incr('sets')
+        for instance in instances:
+            self._store(model, instance)
+        return instances
+
+    def aggregate(self, key, loader, ttl=None):
+        """Return a cached aggregate, computing it with ``loader()`` on a miss"""
+        value = self.backend.get(key) if self._can_read() else None
+        if value is not None:
+            self.metrics.incr('hits')
+            return value
+
+        self.metrics.incr('misses')
+        value = loader()
+        if self._can_store():
+            self.backend.set(key, value, ttl=ttl)
+            self.metrics.incr('sets')
+        return value
+
+    # ---- helpers ----
+
+    def _can_read(self):
+        # Set while a view whose ETag came from the database renders its body
+        return not self.db.session.info.get('fresh_reads')
+
+    def _can_store(self):
+        # Rows read from a lagging replica may predate an invalidation
+        return not self.db.session.info.get('replica_reads')
+
+    def _get_many(self, model, idents):
+        """``get`` for several keys, reading their volatile columns in one query"""
+        session = self.db.session
+        instances, attached = [], []
+        for ident in idents:
+            existing = session.identity_map.get(identity_key(model, ident))
+            row = self.backend.get(self._pk_key(model, ident)) if existing is None else None
+            if existing is not None or row is None:
+                instances.append(existing if existing is not None else self.get(model, ident))
+                continue
+            self.metrics.incr('hits')
+            instance = self._attach(model, row)
+            attached.append(instance)
+            instances.append(instance)
+        self._load_volatile(model, attached)
+        return instances
+
+    def _load_volatile(self, model, instances):
+        columns = self.volatile.get(model, ())
+        if not columns or not instances:
+            return
+        by_id = {instance.id: instance for instance in instances}
+        rows = self.db.session.execute(
+            select(model.id, *(getattr(model, column) for column in columns)).where(model.id.in_(list(by_id)))
+        ).all()
+        for ident, *values in rows:
+            for column, value in zip(columns, values):
+                set_committed_value(by_id[ident], column, value)
+
+    def _store(self, model, instance):
+        mapper = inspect(model)
+        skip = self.volatile.get(model, ())
+        row = {attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs if attr.key not in skip}
+        self.backend.set(self._pk_key(model, instance.id), row)
+        self.metrics.incr('sets')
+
+    def _attach(self, model, row):
+        instance = model()
+        for name, value in row.items():
+            setattr(instance, name, value)
+        make_transient_to_detached(instance)
+        return self.db.session.merge(instance, load=False)
+
+    @staticmethod
+    def _pk_key(model, ident):
+        return f"{model.__tablename__}:pk:{ident}"
+
+    @staticmethod
+    def _lookup_key(model, column, value):
+        return f"{model.__tablename__}:{column}:{value}"
@@ -0,0 +1,196 @@
+import functools
+import hashlib
+import os
+
+from flask import g, has_request_context, make_response, request, session
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import object_session
+
+
+def code_fingerprint(root, paths=('app.py', 'templates', 'static/dist/manifest.json')):
+    """Hash the code and templates that shape responses.
+
+    Part of every ETag, so a deploy that changes a page invalidates what
+    browsers hold. Every worker of one deploy computes the same value.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        full = os.path.join(root, path)
+        files = [full] if os.path.isfile(full) else sorted(
+            os.path.join(d, f) for d, _, names in os.walk(full) for f in names
+        )
+        for name in files:
+            with open(name, 'rb') as fh:
+                digest.update(fh.read())
+    return digest.hexdigest()[:12]
+
+
+class DataVersions:
+    """Per-user and per-account version counters for conditional GETs.
+
+    Counters live in the ``data_version`` table and are bumped in the same
+    database transaction as the write that changes the data, so every
+    worker sees the same version the moment the write commits. A read
+    endpoint turns the versions it depends on into a strong ETag and can
+    answer ``If-None-Match`` with 304 after a single primary-key lookup.
+
+    A write to an account also bumps its owner, so a user's version moves
+    whenever anything on their dashboard does.
+    """
+
+    def __init__(self, db, model, Account, account_models=(), user_models=(), salt=''):
+        self.db = db
+        self.model = model
+        self.Account = Account
+        self.salt = salt
+        self._account_owners = {}
+
+        event.listen(Account, 'after_insert', self._on_account_write)
+        event.listen(Account, 'after_update', self._on_account_write)
+        event.listen(Account, 'after_delete', self._on_account_write)
+        for watched in account_models:
+            for name in ('after_insert', 'after_update', 'after_delete'):
+                event.listen(watched, name, self._on_account_child_write)
+        for watched in user_models:
+            for name in ('after_insert', 'after_update', 'after_delete'):
+                event.listen(watched, name, self._on_user_child_write)
+        event.listen(db.session, 'after_flush', self._after_flush)
+
+    # ---- ORM hooks ----
+
+    def _on_account_write(self, mapper, connection, target):
+        self._account_owners[target.id] = target.user_id
+        self._pending(target).update({('account', target.id), ('user', target.user_id)})
+
+    def _on_account_child_write(self, mapper, connection, target):
+        self._pending(target).add(('account', target.account_id))
+
+    def _on_user_child_write(self, mapper, connection, target):
+        # The User model itself has ``id``; everything else points at one
+        user_id = getattr(target, 'user_id', None) or target.id
+        self._pending(target).add(('user', user_id))
+
+    @staticmethod
+    def _pending(target):
+        return object_session(target).info.setdefault('version_scopes', set())
+
+    def _after_flush(self, session, flush_context):
+        scopes = session.info.pop('version_scopes', None)
+        if scopes:
+            accounts = {ident for kind, ident in scopes if kind == 'account'}
+            users = {ident for kind, ident in scopes if kind == 'user'}
+            self.bump(session, accounts=accounts, users=users)
+
+    # ---- writes ----
+
+    def bump(self, session, accounts=(), users=()):
+        """Advance the versions of ``accounts`` (and their owners) and ``users``.
+
+        Called automatically for ORM writes; code that writes with Core
+        statements calls it inside the same transaction.
+        """
+        accounts = {i for i in accounts if i is not None}
+        users = {i for i in users if i is not None}
+        users.update(self._owners(session, accounts).values())
+        scopes = sorted([f"account:{i}" for i in accounts] + [f"user:{i}" for i in users])
+        if not scopes:
+            return
+        if has_request_context():
+            g.pop('data_versions', None)
+
+        table = self.model.__table__
+        dialect = session.get_bind(self.model).dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = dialect_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['scope'], set_={'version': table.c.version + 1}
+            )
+            session.execute(stmt, [{'scope': scope, 'version': 1} for scope in scopes])
+            return
+        for scope in scopes:
+            result = session.execute(
+                update(table).where(table.c.scope == scope).values(version=table.c.version + 1)
+            )
+            if result.rowcount == 0:
+                session.execute(insert(table), {'scope': scope, 'version': 1})
+
+    def _owners(self, session, account_ids):
+        # Accounts never change owner, so the mapping is kept per process
+        missing = [i for i in account_ids if i not in self._account_owners]
+        if missing:
+            if len(self._account_owners) > 50000:
+                self._account_owners.clear()
+            Account = self.Account
+            self._account_owners.update(session.execute(
+                select(Account.id, Account.user_id).where(Account.id.in_(missing))
+            ).all())
+        return {i: self._account_owners[i] for i in account_ids if i in self._account_owners}
+
+    # ---- reads ----
+
+    def get(self, *scopes):
+        # Remembered for the rest of the request (ETag, then fragments) until a write bumps them
+        known = g.setdefault('data_versions', {}) if has_request_context() else {}
+        missing = [scope for scope in scopes if scope not in known]
+        if missing:
+            Version = self.model
+            found = dict(self.db.session.query(Version.scope, Version.version)
+                         .filter(Version.scope.in_(missing)).all())
+            known.update({scope: found.get(scope, 0) for scope in missing})
+        return {scope: known[scope] for scope in scopes}
+
+    def etag(self, *scopes):
+        versions = self.get(*scopes)
+        # Compressed and plain bodies are different representations, so the
+        # encoding the client negotiates is part of the (strong) validator
+        parts = [self.salt, request.full_path, request.headers.get('X-Requested-With', ''),
+                 request.headers.get('Accept-Encoding', '')]
+        parts += [f"{scope}={versions[scope]}" for scope in scopes]
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def conditional(self, scopes):
+        """Decorator answering GETs with 304 while the data behind them is unchanged.
+
+        ``scopes`` receives the view arguments and returns scope strings such
+        as ``user:5`` or ``account:7``, or None to skip conditional handling
+        (for example when the user may not see the resource). Place it below
+        ``login_required``.
+
+        The ETag comes from the database, so the body must too: the view
+        runs with ``fresh_reads`` set on the session, which makes the query
+        cache read through, and rows loaded before it (the signed-in user)
+        are expired and read again. Otherwise another worker's stale cache
+        entry could be served, and then kept, under the new ETag.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                # Pending flash messages are only shown by a fresh render
+                wanted = scopes(**kwargs) if request.method in ('GET', 'HEAD') and '_flashes' not in session else None
+                if not wanted:
+                    return view(*args, **kwargs)
+                etag = self.etag(*wanted)
+                if request.if_none_match.contains(etag):
+                    response = make_response('', 304)
+                else:
+                    response = make_response(self._render_fresh(view, args, kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                response.vary.add('Cookie')
+                response.vary.add('X-Requested-With')
+                return response
+            return wrapper
+        return decorator
+
+    def _render_fresh(self, view, args, kwargs):
+        session = self.db.session
+        session.expire_all()
+        session.info['fresh_reads'] = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            session.info.pop('fresh_reads', None)
@@ -0,0 +1,148 @@
+import functools
+import itertools
+import os
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+
+def normalize_database_url(url):
+    if url and url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def engine_options(prefix):
+    """Read pool settings for one engine from ``<prefix>_POOL_SIZE`` style env vars"""
+    options = {}
+    for name, key, cast in (
+        ('POOL_SIZE', 'pool_size', int),
+        ('MAX_OVERFLOW', 'max_overflow', int),
+        ('POOL_TIMEOUT', 'pool_timeout', float),
+        ('POOL_RECYCLE', 'pool_recycle', int),
+        ('POOL_PRE_PING', 'pool_pre_ping', lambda v: v.lower() in ('1', 'true', 'yes')),
+    ):
+        value = os.getenv(f"{prefix}_{name}")
+        if value:
+            options[key] = cast(value)
+    return options
+
+
+def replica_binds(urls, options):
+    """Build SQLALCHEMY_BINDS entries for the read replicas"""
+    return {
+        f"{REPLICA_BIND_PREFIX}{i}": dict(options, url=normalize_database_url(url))
+        for i, url in enumerate(urls)
+    }
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to a replica while the request allows it.
+
+    Flushes, UPDATE/DELETE statements and anything outside a read-only
+    view always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('db_use_replica'):
+            if clause is None or isinstance(clause, Select):
+                router = current_app.extensions.get('db_router')
+                engine = router.pick_replica() if router else None
+                if engine is not None:
+                    self.info['replica_reads'] = True
+                    router.count('replica_reads')
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Routes read-only views to replica engines with read-your-writes stickiness"""
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self.sticky_seconds = app.config.get('DB_REPLICA_STICKY_SECONDS', 5)
+        self.replica_keys = sorted(key for key in app.config.get('SQLALCHEMY_BINDS', {})
+                                   if key.startswith(REPLICA_BIND_PREFIX))
+        self._cycle = itertools.cycle(self.replica_keys) if self.replica_keys else None
+        self._lock = threading.Lock()
+        self.counters = {'replica_reads': 0, 'primary_sticky': 0, 'checkouts': {}, 'connects': {}}
+        app.extensions['db_router'] = self
+
+        event.listen(db.session, 'after_flush', self._after_flush)
+        with app.app_context():
+            for key, engine in db.engines.items():
+                self._instrument_pool(key or 'primary', engine)
+
+    # ---- routing ----
+
+    def read_only(self, view=None, methods=('GET', 'HEAD')):
+        """Decorator for views whose ``methods`` only read and may use a replica"""
+        if view is None:
+            return functools.partial(self.read_only, methods=methods)
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.replica_keys and request.method in methods:
+                if self._wrote_recently():
+                    self.count('primary_sticky')
+                else:
+                    g.db_use_replica = True
+            return view(*args, **kwargs)
+        return wrapper
+
+    def pick_replica(self):
+        if not self._cycle:
+            return None
+        with self._lock:
+            key = next(self._cycle)
+        return self.db.engines[key]
+
+    def _wrote_recently(self):
+        last_write = session.get('db_last_write')
+        return last_write is not None and time.time() - last_write < self.sticky_seconds
+
+    def _after_flush(self, db_session, flush_context):
+        # Remember the write in the user's (signed, cross-worker) session cookie
+        # so their next reads stay on the primary until replicas catch up
+        if self.replica_keys and has_request_context():
+            session['db_last_write'] = time.time()
+
+    # ---- metrics ----
+
+    def count(self, name, key=None):
+        with self._lock:
+            if key is None:
+                self.counters[name] += 1
+            else:
+                self.counters[name][key] = self.counters[name].get(key, 0) + 1
+
+    def _instrument_pool(self, name, engine):
+        event.listen(engine, 'checkout', lambda *args: self.count('checkouts', name))
+        event.listen(engine, 'connect', lambda *args: self.count('connects', name))
+
+    def pool_stats(self):
+        """Per-engine pool usage plus routing counters"""
+        stats = {}
+        for key, engine in self.db.engines.items():
+            pool = engine.pool
+            name = key or 'primary'
+            entry = {'pool': type(pool).__name__, 'status': pool.status()}
+            for attr in ('size', 'checkedin', 'checkedout', 'overflow'):
+                method = getattr(pool, attr, None)
+                if callable(method):
+                    entry[attr] = method()
+            entry['checkouts'] = self.counters['checkouts'].get(name, 0)
+            entry['connects'] = self.counters['connects'].get(name, 0)
+            stats[name] = entry
+        return {
+            'engines': stats,
+            'replica_reads': self.counters['replica_reads'],
+            'primary_sticky_requests': self.counters['primary_sticky']
+        }
@@ -1,19 +1,25 @@
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier, IsolationForest
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, confusion_matrix
-import joblib
+# pandas, numpy, scikit-learn and joblib are imported where they are used:
+# together they take most of a second to import, and a process that never
+# scores a transaction (CLI commands, fresh workers answering their first
+# page) should not pay for them.
 import os
+import threading
+import time
 from datetime import datetime, timedelta
 import random
 
 class FraudDetector:
+    """Random Forest plus Isolation Forest fraud scoring.
+
+    Constructing a detector is free; models are loaded (or trained, the
+    first time) by ``warm_up()``, which scoring calls on demand. Call
+    ``warm_up(background=True)`` at startup to load them off the request path.
+    """
+
     def __init__(self):
         self.rf_model = None
         self.isolation_model = None
-        self.scaler = StandardScaler()
+        self.scaler = None
         self.label_encoders = {}
         self.feature_columns = [
             'amount', 'hour_of_day', 'day_of_week', 'is_weekend',
@@ -24,14 +30,41 @@ class FraudDetector:
         self.scaler_path = 'models/scaler.pkl'
         self.encoders_path = 'models/encoders.pkl'
         
-        # Create models directory if it doesn't exist
-        os.makedirs('models', exist_ok=True)
-        
-        # Load or train models
-        self._load_or_train_models()
-    
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._warm_up_thread = None
+        # Called as observer(mode, seconds, scores) after every scoring call
+        self.score_observers = []
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def warm_up(self, background=False):
+        """Load or train the models once per process.
+
+        With ``background=True`` this returns immediately and loads in a
+        daemon thread; scoring that arrives first waits for it to finish.
+        """
+        if self._ready.is_set():
+            return
+        if background:
+            with self._lock:
+                if self._warm_up_thread is None:
+                    self._warm_up_thread = threading.Thread(
+                        target=self.warm_up, name='fraud-model-warm-up', daemon=True
+                    )
+                    self._warm_up_thread.start()
+            return
+        with self._lock:
+            if not self._ready.is_set():
+                self._load_or_train_models()
+                self._ready.set()
+
     def _load_or_train_models(self):
         """Load existing models or train new ones if they don't exist"""
+        import joblib
+
         try:
             if os.path.exists(self.model_path) and os.path.exists('models/isolation_forest.pkl'):
                 self.rf_model = joblib.load(self.model_path)
@@ -49,6 +82,9 @@ class FraudDetector:
     
     def _generate_synthetic_data(self, n_samples=10000):
         """Generate synthetic transaction data for training"""
+        import numpy as np
+        import pandas as pd
+
         np.random.seed(42)
         
         data = []
@@ -111,10 +147,18 @@ class FraudDetector:
         
         return pd.DataFrame(data)
     
-    def _train_models(self):
+    def _train_models(self, n_samples=20000):
         """Train the fraud detection models"""
+        import joblib
+        from sklearn.ensemble import RandomForestClassifier, IsolationForest
+        from sklearn.metrics import classification_report
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler, LabelEncoder
+
+        self.scaler = StandardScaler()
+
         # Generate synthetic training data
-        df = self._generate_synthetic_data(20000)
+        df = self._generate_synthetic_data(n_samples)
         
         # Prepare features
         X = df[self.feature_columns].copy()
@@ -156,6 +200,7 @@ class FraudDetector:
         print(classification_report(y_test, y_pred))
         
         # Save models
+        os.makedirs('models', exist_ok=True)
         joblib.dump(self.rf_model, self.model_path)
         joblib.dump(self.isolation_model, 'models/isolation_forest.pkl')
         joblib.dump(self.scaler, self.scaler_path)
@@ -209,7 +254,11 @@ class FraudDetector:
     
     def predict_fraud(self, transaction):
         """Predict fraud probability for a transaction"""
+        import pandas as pd
+
+        started = time.perf_counter()
         try:
+            self.warm_up()
             # Extract features
             features = self._extract_features(transaction)
             
@@ -235,13 +284,51 @@ class FraudDetector:
             
             # Combine both scores (higher values indicate more suspicious)
             combined_score = (fraud_probability + (1 - anomaly_score)) / 2
+            self._notify('single', started, [combined_score])
             
             return combined_score
             
         except Exception as e:
             print(f"Error in fraud prediction: {e}")
+            self._notify('single', started, [])
             return 0.5  # Default to medium risk if error occurs
     
+    def predict_fraud_batch(self, transactions):
+        """Predict fraud probabilities for many transactions in one model call"""
+        if not transactions:
+            return []
+        import pandas as pd
+
+        started = time.perf_counter()
+        try:
+            self.warm_up()
+            features = pd.DataFrame([self._extract_features(t) for t in transactions])
+            features['amount_category'] = self.label_encoders['amount_category'].transform(
+                features['amount_category']
+            )
+            feature_vectors_scaled = self.scaler.transform(features[self.feature_columns])
+            
+            fraud_probabilities = self.rf_model.predict_proba(feature_vectors_scaled)[:, 1]
+            anomaly_scores = self.isolation_model.decision_function(feature_vectors_scaled)
+            
+            combined_scores = (fraud_probabilities + (1 - anomaly_scores)) / 2
+            scores = combined_scores.tolist()
+            self._notify('batch', started, scores)
+            return scores
+            
+        except Exception as e:
+            print(f"Error in batch fraud prediction: {e}")
+            self._notify('batch', started, [])
+            return [0.5] * len(transactions)
+    
+    def _notify(self, mode, started, scores):
+        seconds = time.perf_counter() - started
+        for observer in self.score_observers:
+            try:
+                observer(mode, seconds, scores)
+            except Exception as e:
+                print(f"Fraud score observer failed: {e}")
+
     def get_fraud_indicators(self, transaction):
         """Get detailed fraud indicators for a transaction"""
         features = self._extract_features(transaction)
@@ -300,5 +387,7 @@ class FraudDetector:
     def retrain_models(self, new_data=None):
         """Retrain models with new data"""
         print("Retraining fraud detection models...")
-        self._train_models()
+        with self._lock:
+            self._train_models()
+            self._ready.set()
         print("Models retrained successfully") 
\ No newline at end of file
@@ -0,0 +1,282 @@
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import String, case, cast, delete, event, func, insert, inspect, literal, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import object_session
+
+# Dimensions a transaction is counted under; alerts are counted by severity
+TRANSACTION_DIMENSIONS = ('all', 'transaction_type', 'account_type', 'hour_of_day')
+ALERT_DIMENSION = 'alert_severity'
+DIMENSIONS = TRANSACTION_DIMENSIONS + (ALERT_DIMENSION,)
+
+MEASURES = ('txn_count', 'amount_sum', 'flagged_count', 'alert_count')
+
+
+class FraudRollups:
+    """Daily fraud analytics rollups kept up to date as rows are written.
+
+    Every transaction adds to one row per dimension (overall, type, account
+    type and hour of day) for its day, and every alert to one row for its
+    severity, so analytics read a few hundred rollup rows instead of
+    scanning ``transaction``. Deltas are collected from ORM events and
+    upserted in the same database transaction as the writes themselves.
+    Each (day, dimension, value) is split across ``shards`` rows picked at
+    random per flush, so concurrent writers on PostgreSQL don't queue on
+    the single "today / all" row; readers sum the shards.
+    """
+
+    def __init__(self, db, model, Transaction, Account, FraudAlert, shards=8, archive=None):
+        self.db = db
+        self.model = model
+        self.Transaction = Transaction
+        self.Account = Account
+        self.FraudAlert = FraudAlert
+        self.shards = max(1, shards)
+        self.archive = archive
+        self._account_types = {}
+
+        event.listen(Transaction, 'after_insert', self._on_transaction_insert)
+        event.listen(Transaction, 'after_update', self._on_transaction_update)
+        event.listen(FraudAlert, 'after_insert', self._on_alert_insert)
+        event.listen(db.session, 'after_flush', self._after_flush)
+
+    # ---- ORM hooks ----
+
+    def _on_transaction_insert(self, mapper, connection, target):
+        self._pending(target).append(('transaction', self._transaction_row(target), 1))
+
+    def _on_transaction_update(self, mapper, connection, target):
+        history = inspect(target).attrs.is_fraudulent.history
+        if history.has_changes():
+            was_flagged = bool(history.deleted and history.deleted[0])
+            if was_flagged != bool(target.is_fraudulent):
+                self._pending(target).append(('flag', self._transaction_row(target), 1 if target.is_fraudulent else -1))
+
+    def _on_alert_insert(self, mapper, connection, target):
+        self._pending(target).append(('alert', {
+            'created_at': target.created_at, 'severity': target.severity
+        }, 1))
+
+    def _after_flush(self, session, flush_context):
+        pending = session.info.pop('rollup_events', None)
+        if not pending:
+            return
+        deltas = {}
+        transactions = [row for kind, row, _ in pending if kind != 'alert']
+        account_types = self._lookup_account_types(session, {row['account_id'] for row in transactions})
+        for kind, row, sign in pending:
+            if kind == 'alert':
+                self._add_alert(deltas, row)
+            elif kind == 'transaction':
+                self._add_transaction(deltas, row, account_types)
+            else:
+                self._add_flag(deltas, row, account_types, sign)
+        self._apply(session, deltas)
+
+    @staticmethod
+    def _pending(target):
+        return object_session(target).info.setdefault('rollup_events', [])
+
+    @staticmethod
+    def _transaction_row(target):
+        return {
+            'timestamp': target.timestamp,
+            'transaction_type': target.transaction_type,
+            'amount': target.amount,
+            'account_id': target.account_id,
+            'is_fraudulent': target.is_fraudulent,
+        }
+
+    # ---- bulk writers ----
+
+    def record(self, session, transactions=(), alerts=()):
+        """Roll up rows written with Core statements, which skip the ORM hooks.
+
+        ``transactions`` and ``alerts`` are the parameter dicts that were
+        inserted; call this inside the same database transaction.
+        """
+        deltas = {}
+        account_types = self._lookup_account_types(session, {row['account_id'] for row in transactions})
+        for row in transactions:
+            self._add_transaction(deltas, row, account_types)
+        for row in alerts:
+            self._add_alert(deltas, row)
+        self._apply(session, deltas)
+
+    # ---- deltas ----
+
+    def _add_transaction(self, deltas, row, account_types):
+        timestamp = row.get('timestamp') or datetime.utcnow()
+        flagged = 1 if row.get('is_fraudulent') else 0
+        for dimension, value in self._transaction_keys(row, timestamp, account_types):
+            measures = deltas.setdefault((timestamp.date(), dimension, value), [0, 0.0, 0, 0])
+            measures[0] += 1
+            measures[1] += abs(row['amount'] or 0.0)
+            measures[2] += flagged
+
+    def _add_flag(self, deltas, row, account_types, sign):
+        timestamp = row.get('timestamp') or datetime.utcnow()
+        for dimension, value in self._transaction_keys(row, timestamp, account_types):
+            deltas.setdefault((timestamp.date(), dimension, value), [0, 0.0, 0, 0])[2] += sign
+
+    def _add_alert(self, deltas, row):
+        created_at = row.get('created_at') or datetime.utcnow()
+        deltas.setdefault((created_at.date(), ALERT_DIMENSION, row['severity']), [0, 0.0, 0, 0])[3] += 1
+
+    @staticmethod
+    def _transaction_keys(row, timestamp, account_types):
+        return (
+            ('all', 'all'),
+            ('transaction_type', row['transaction_type']),
+            ('account_type', account_types.get(row['account_id'], 'unknown')),
+            ('hour_of_day', str(timestamp.hour)),
+        )
+
+    def _lookup_account_types(self, session, account_ids):
+        # Account types never change, so a per-process map saves a query per flush
+        missing = [i for i in account_ids if i is not None and i not in self._account_types]
+        if missing:
+            if len(self._account_types) > 50000:
+                self._account_types.clear()
+            Account = self.Account
+            self._account_types.update(session.execute(
+                select(Account.id, Account.account_type).where(Account.id.in_(missing))
+            ).all())
+        return self._account_types
+
+    def _apply(self, session, deltas):
+        if not deltas:
+            return
+        shard = random.randrange(self.shards)
+        # Sorted so concurrent writers take row locks in the same order
+        rows = [{
+            'day': day, 'dimension': dimension, 'value': value, 'shard': shard,
+            'txn_count': measures[0], 'amount_sum': measures[1],
+            'flagged_count': measures[2], 'alert_count': measures[3]
+        } for (day, dimension, value), measures in sorted(deltas.items())]
+
+        table = self.model.__table__
+        dialect = session.get_bind(self.model).dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = dialect_insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['day', 'dimension', 'value', 'shard'],
+                set_={name: table.c[name] + stmt.excluded[name] for name in MEASURES}
+            )
+            session.execute(stmt, rows)
+            return
+
+        # Portable fallback: increment, then insert the rows that did not exist yet
+        for row in rows:
+            result = session.execute(
+                update(table).where(
+                    table.c.day == row['day'], table.c.dimension == row['dimension'],
+                    table.c.value == row['value'], table.c.shard == row['shard']
+                ).values({name: table.c[name] + row[name] for name in MEASURES})
+            )
+            if result.rowcount == 0:
+                session.execute(insert(table), row)
+
+    # ---- rebuild ----
+
+    def rebuild(self, since=None):
+        """Recompute rollups from the base tables, for days on or after ``since``.
+
+        Runs as set-based INSERT ... SELECTs in the caller's transaction. On
+        PostgreSQL the rollup table is locked against concurrent increments
+        first, so writes that land during the rebuild are neither lost nor
+        double counted. Days in archived months are left as they are, since
+        their rows are partly gone from the database: ``since`` is moved up
+        to ``archive.live_since()``. Returns the number of rollup rows written.
+        """
+        session = self.db.session
+        Rollup, Transaction, Account, FraudAlert = self.model, self.Transaction, self.Account, self.FraudAlert
+        floor = self.archive.live_since() if self.archive is not None else None
+        if floor is not None and (since is None or since < floor):
+            since = floor
+        if session.get_bind(Rollup).dialect.name == 'postgresql':
+            session.execute(text(f"LOCK TABLE {Rollup.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+
+        cleared = delete(Rollup)
+        if since is not None:
+            cleared = cleared.where(Rollup.day >= since)
+        session.execute(cleared)
+
+        day = func.date(Transaction.timestamp)
+        dimensions = {
+            'all': literal('all'),
+            'transaction_type': Transaction.transaction_type,
+            'account_type': func.coalesce(Account.account_type, 'unknown'),
+            'hour_of_day': cast(func.extract('hour', Transaction.timestamp), String),
+        }
+        columns = ['day', 'dimension', 'value', 'shard'] + list(MEASURES)
+        written = 0
+        for dimension, value in dimensions.items():
+            query = select(
+                day, literal(dimension), value, literal(0),
+                func.count(Transaction.id),
+                func.coalesce(func.sum(func.abs(Transaction.amount)), 0.0),
+                func.coalesce(func.sum(case((Transaction.is_fraudulent.is_(True), 1), else_=0)), 0),
+                literal(0)
+            ).select_from(Transaction).where(Transaction.timestamp.is_not(None))
+            if dimension == 'account_type':
+                query = query.outerjoin(Account, Transaction.account_id == Account.id)
+            if since is not None:
+                query = query.where(Transaction.timestamp >= _start_of(since))
+            written += session.execute(
+                insert(Rollup).from_select(columns, query.group_by(day, value))
+            ).rowcount or 0
+
+        alert_day = func.date(FraudAlert.created_at)
+        query = select(
+            alert_day, literal(ALERT_DIMENSION), FraudAlert.severity, literal(0),
+            literal(0), literal(0.0), literal(0), func.count(FraudAlert.id)
+        ).where(FraudAlert.created_at.is_not(None))
+        if since is not None:
+            query = query.where(FraudAlert.created_at >= _start_of(since))
+        written += session.execute(
+            insert(Rollup).from_select(columns, query.group_by(alert_day, FraudAlert.severity))
+        ).rowcount or 0
+        return written
+
+    # ---- queries ----
+
+    def report(self, dimension='all', days=30, today=None):
+        """Totals per value and a daily series for the last ``days`` days"""
+        Rollup = self.model
+        today = today or datetime.utcnow().date()
+        since = today - timedelta(days=days - 1)
+        sums = [func.sum(getattr(Rollup, name)).label(name) for name in MEASURES]
+        base = self.db.session.query(Rollup.value, *sums).filter(
+            Rollup.dimension == dimension, Rollup.day >= since
+        )
+        totals = base.group_by(Rollup.value).order_by(Rollup.value).all()
+        daily = self.db.session.query(Rollup.day, Rollup.value, *sums).filter(
+            Rollup.dimension == dimension, Rollup.day >= since
+        ).group_by(Rollup.day, Rollup.value).order_by(Rollup.day, Rollup.value).all()
+        return {
+            'dimension': dimension,
+            'since': since.isoformat(),
+            'until': today.isoformat(),
+            'totals': [_measures(row, value=row.value) for row in totals],
+            'daily': [_measures(row, day=row.day.isoformat(), value=row.value) for row in daily],
+        }
+
+
+def _start_of(day):
+    return datetime.combine(day, datetime.min.time())
+
+
+def _measures(row, **keys):
+    transactions = int(row.txn_count or 0)
+    flagged = int(row.flagged_count or 0)
+    return dict(
+        keys,
+        transactions=transactions,
+        amount=round(float(row.amount_sum or 0.0), 2),
+        flagged=flagged,
+        fraud_rate=round(flagged / transactions, 4) if transactions else 0.0,
+        alerts=int(row.alert_count or 0),
+    )
@@ -0,0 +1,49 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py app:app
+
+Threaded workers keep long-lived connections such as the admin alert
+stream from tying up a whole worker process each.
+"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+# Must exceed ALERT_STREAM_MAX_SECONDS so streams end on their own terms
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 330))
+graceful_timeout = 30
+keepalive = 5
+
+# Workers write metric snapshots here so /metrics can add them up
+if not os.getenv('METRICS_DIR'):
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='securebank-metrics-')
+
+# Token buckets shared by all workers, on tmpfs where available
+if not os.getenv('RATE_LIMIT_URL'):
+    shm_dir = tempfile.mkdtemp(prefix='securebank-ratelimit-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    os.environ['RATE_LIMIT_URL'] = f"shm://{os.path.join(shm_dir, 'buckets')}"
+
+
+
+def on_starting(server):
+    from metrics import clear_directory
+    clear_directory(os.environ['METRICS_DIR'])
+
+
+def post_worker_init(worker):
+    # Start loading the fraud models as soon as the worker is up, not on its first request
+    from app import app, fraud_detector
+    if app.config['FRAUD_MODEL_WARMUP'] == 'background':
+        fraud_detector.warm_up(background=True)
+
+
+def worker_exit(server, worker):
+    from app import app_metrics
+    app_metrics.registry.flush()
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(os.environ['METRICS_DIR'], worker.pid)
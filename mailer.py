@@ -0,0 +1,224 @@
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+
+from sqlite_tuning import begin_immediate
+
+
+class SMTPConnection:
+    """A persistent SMTP session that reconnects on demand"""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 timeout=30, idle_timeout=60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._server = None
+        self._last_used = 0.0
+
+    # smtplib and the email package are imported on first send, not by every
+    # process that imports the app
+
+    def _connect(self):
+        import smtplib
+
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self._server = server
+
+    def send(self, msg):
+        import smtplib
+
+        if self._server is None:
+            self._connect()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle connection; reconnect once and retry
+            self._server = None
+            self._connect()
+            self._server.send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+
+    def close(self):
+        if self._server is None:
+            return
+        import smtplib
+
+        try:
+            self._server.quit()
+        except smtplib.SMTPException:
+            pass
+        except OSError:
+            pass
+        self._server = None
+
+
+class EmailOutbox:
+    """Durable email queue drained by background worker threads.
+
+    Request handlers call ``enqueue`` which only inserts a row. Workers
+    claim pending rows in batches with a claim token (so several processes
+    can drain the same table), send them over a reused SMTP connection and
+    retry failures with exponential backoff.
+    """
+
+    def __init__(self, app, db, model):
+        self.app = app
+        self.db = db
+        self.model = model
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return self.app.config
+
+    # ---- producer side ----
+
+    def enqueue(self, to_email, subject, body, commit=True):
+        """Queue an email for delivery; the caller's request never touches SMTP"""
+        message = self.model(to_email=to_email, subject=subject, body=body)
+        self.db.session.add(message)
+        if commit:
+            self.db.session.commit()
+        self.start()
+        self._wakeup.set()
+        return message
+
+    # ---- worker side ----
+
+    def start(self, workers=None):
+        """Start the in-process drain threads once per process"""
+        workers = self.config['MAIL_OUTBOX_WORKERS'] if workers is None else workers
+        with self._lock:
+            if self._threads or workers <= 0:
+                return
+            for i in range(workers):
+                thread = threading.Thread(target=self.run, name=f"email-outbox-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def run(self):
+        connection = self._connection()
+        try:
+            while not self._stop.is_set():
+                try:
+                    with self.app.app_context():
+                        sent = self.drain_once(connection)
+                except Exception as e:
+                    print("Email outbox error:", e)
+                    sent = 0
+                if not sent:
+                    connection.close_if_idle()
+                    self._wakeup.wait(self.config['MAIL_POLL_INTERVAL'])
+                    self._wakeup.clear()
+        finally:
+            connection.close()
+
+    def drain_once(self, connection=None):
+        """Claim and deliver one batch; returns the number of rows processed"""
+        own_connection = connection is None
+        connection = connection or self._connection()
+        try:
+            batch = self._claim_batch()
+            for message in batch:
+                self._deliver(connection, message)
+            if batch:
+                self.db.session.commit()
+            return len(batch)
+        finally:
+            if own_connection:
+                connection.close()
+
+    def _claim_batch(self):
+        Outbox = self.model
+        now = datetime.utcnow()
+        lease_expired = now - timedelta(seconds=self.config['MAIL_CLAIM_LEASE'])
+        # Workers race to claim the same rows; on SQLite take the write lock before reading them
+        begin_immediate(self.db.session)
+        claimable = or_(
+            and_(Outbox.status == 'pending', Outbox.next_attempt_at <= now),
+            and_(Outbox.status == 'sending', Outbox.claimed_at < lease_expired)
+        )
+        ids = [row.id for row in self.db.session.query(Outbox.id).filter(claimable)
+               .order_by(Outbox.id).limit(self.config['MAIL_BATCH_SIZE'])]
+        if not ids:
+            self.db.session.rollback()
+            return []
+
+        token = uuid.uuid4().hex
+        Outbox.query.filter(Outbox.id.in_(ids), claimable).update(
+            {'status': 'sending', 'claimed_at': now, 'claim_token': token},
+            synchronize_session=False
+        )
+        self.db.session.commit()
+        return Outbox.query.filter_by(claim_token=token).order_by(Outbox.id).all()
+
+    def _deliver(self, connection, message):
+        import smtplib
+
+        message.attempts += 1
+        try:
+            connection.send(self._build(message))
+        except smtplib.SMTPRecipientsRefused as e:
+            self._fail(message, e, permanent=True)
+        except (smtplib.SMTPException, OSError) as e:
+            connection.close()
+            self._fail(message, e)
+        else:
+            message.status = 'sent'
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+
+    def _fail(self, message, error, permanent=False):
+        message.last_error = str(error)[:500]
+        if permanent or message.attempts >= self.config['MAIL_MAX_ATTEMPTS']:
+            message.status = 'failed'
+            print(f"Email {message.id} to {message.to_email} failed permanently: {error}")
+            return
+        delay = min(self.config['MAIL_MAX_BACKOFF'],
+                    self.config['MAIL_RETRY_BACKOFF'] * 2 ** (message.attempts - 1))
+        message.status = 'pending'
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def _build(self, message):
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg['From'] = f"{self.config['MAIL_SENDER_NAME']} <{self.config['MAIL_SENDER']}>"
+        msg['To'] = message.to_email
+        msg['Subject'] = message.subject
+        msg.attach(MIMEText(message.body, 'plain'))
+        return msg
+
+    def _connection(self):
+        return SMTPConnection(
+            self.config['MAIL_SERVER'],
+            self.config['MAIL_PORT'],
+            username=self.config['MAIL_USERNAME'],
+            password=self.config['MAIL_PASSWORD'],
+            use_tls=self.config['MAIL_USE_TLS']
+        )
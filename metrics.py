@@ -0,0 +1,487 @@
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event, inspect
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+SCORE_BUCKETS = (.1, .2, .3, .4, .5, .6, .7, .8, .9, 1.0)
+
+ARCHIVE_FILE = 'archive.json'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def samples(self):
+        """[(label values, value), ...] for this process"""
+        with self._lock:
+            return [(labels, self._copy(value)) for labels, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """A gauge summed over the live worker processes.
+
+    ``set_function`` makes it read a callable whenever the registry takes a
+    snapshot, for values that already exist elsewhere (pool sizes, ...).
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def set_function(self, function):
+        """``function()`` returns {label values: value}"""
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                values = self._function()
+            except Exception as e:
+                print(f"Metric {self.name} failed: {e}")
+                values = {}
+            with self._lock:
+                self._values = dict(values)
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """Bucket counts are kept per bucket and made cumulative on export"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # One slot per bucket, one for +Inf, then the sum
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _copy(self, value):
+        return list(value)
+
+
+class MetricsRegistry:
+    """Metrics for one process, optionally aggregated across gunicorn workers.
+
+    With a ``directory``, every worker writes its snapshot to
+    ``live-<pid>.json`` there every ``flush_interval`` seconds (and when it
+    exits), and ``collect()`` adds up all snapshots. Counters and histograms
+    of workers that exit are folded into ``archive.json`` so totals never
+    go backwards; their gauges are dropped. Recording is an in-memory
+    update under a lock, so the request path never touches the disk.
+    """
+
+    def __init__(self, directory=None, prefix='securebank_', flush_interval=5.0):
+        self.directory = directory
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self._metrics = {}
+        self._flusher_pid = None
+        self._flusher_lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    # ---- snapshots ----
+
+    def snapshot(self):
+        return {
+            name: {'type': metric.kind, 'samples': [[list(labels), value] for labels, value in metric.samples()]}
+            for name, metric in self._metrics.items()
+        }
+
+    def flush(self):
+        """Write this process's snapshot for the other workers to read"""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"live-{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(tmp_path, path)
+
+    def ensure_flusher(self):
+        """Start the background flush thread once per (forked) process"""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Metrics flush failed: {e}")
+
+    # ---- aggregation ----
+
+    def collect(self):
+        """{name: {label values: value}} summed over every worker"""
+        if not self.directory:
+            return {name: dict(metric.samples()) for name, metric in self._metrics.items()}
+        self.flush()
+        totals = {}
+        paths = glob.glob(os.path.join(self.directory, 'live-*.json'))
+        for path in paths:
+            pid = int(os.path.basename(path)[len('live-'):-len('.json')])
+            if not _pid_alive(pid):
+                # A worker that died without its child_exit hook running
+                mark_process_dead(self.directory, pid)
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            # Shared, so a worker being folded into the archive is never counted twice
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                data = _read_snapshot(path)
+                if data:
+                    _merge(totals, data)
+        return {
+            name: {tuple(labels): value for labels, value in totals.get(name, {}).items()}
+            for name in self._metrics
+        }
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        collected = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, value in sorted(collected[name].items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(pairs + [('le', bound)])} {_number(cumulative)}")
+                lines.append(f"{name}_sum{_labels(pairs)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(pairs)} {_number(cumulative)}")
+        return '\n'.join(lines) + '\n'
+
+
+def mark_process_dead(directory, pid):
+    """Fold a finished worker's counters and histograms into the archive.
+
+    Safe to call from the gunicorn master and from workers at the same time.
+    """
+    path = os.path.join(directory, f"live-{pid}.json")
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        data = _read_snapshot(path)
+        if data is None:
+            return
+        archive_path = os.path.join(directory, ARCHIVE_FILE)
+        archive = {}
+        _merge(archive, _read_snapshot(archive_path) or {}, kinds=True)
+        _merge(archive, {name: entry for name, entry in data.items() if entry['type'] != 'gauge'}, kinds=True)
+        tmp_path = f"{archive_path}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump({
+                name: {'type': entry.pop('__type__'), 'samples': [[list(k), v] for k, v in entry.items()]}
+                for name, entry in archive.items()
+            }, fh)
+        os.replace(tmp_path, archive_path)
+        os.remove(path)
+
+
+def clear_directory(directory):
+    """Remove every snapshot; call once when the server (re)starts"""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(totals, data, kinds=False):
+    for name, entry in data.items():
+        series = totals.setdefault(name, {})
+        if kinds:
+            series['__type__'] = entry['type']
+        for labels, value in entry['samples']:
+            key = tuple(labels)
+            current = series.get(key)
+            if current is None:
+                series[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                series[key] = [a + b for a, b in zip(current, value)]
+            else:
+                series[key] = current + value
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="{_label_value(value)}"' for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _label_value(value):
+    if isinstance(value, float):
+        return _number(value)
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value)) if isinstance(value, (int, float)) else str(value)
+
+
+class AppMetrics:
+    """Request, database, pool, fraud scoring and money-movement metrics.
+
+    Requests are timed per URL rule (never per raw path, which would make
+    a series per account id). Every SQL statement is counted and timed per
+    engine and per request; pool checkouts are timed around the pool's own
+    wait. Transactions and fraud alerts are counted when their session
+    commits, the same way the alert stream publishes them.
+    """
+
+    def __init__(self, app, db, registry, fraud_detector, Transaction, FraudAlert):
+        self.app = app
+        self.db = db
+        self.registry = registry
+        self.Transaction = Transaction
+        self.FraudAlert = FraudAlert
+
+        self.requests = registry.counter(
+            'http_requests_total', 'HTTP requests by route and status', ('method', 'route', 'status'))
+        self.request_seconds = registry.histogram(
+            'http_request_duration_seconds', 'HTTP request latency', ('method', 'route'))
+        self.in_flight = registry.gauge(
+            'http_requests_in_flight', 'HTTP requests being served', ('route',))
+        self.request_queries = registry.histogram(
+            'db_queries_per_request', 'SQL statements issued per HTTP request', ('route',), QUERY_COUNT_BUCKETS)
+        self.request_query_seconds = registry.histogram(
+            'db_time_per_request_seconds', 'Time spent in SQL per HTTP request', ('route',), QUERY_BUCKETS)
+        self.query_seconds = registry.histogram(
+            'db_query_duration_seconds', 'SQL statement latency', ('engine',), QUERY_BUCKETS)
+        self.query_errors = registry.counter(
+            'db_query_errors_total', 'SQL statements that raised', ('engine',))
+        self.pool_wait = registry.histogram(
+            'db_pool_checkout_wait_seconds', 'Time waiting for a pooled connection', ('engine',), QUERY_BUCKETS)
+        self.pool_checked_out = registry.gauge(
+            'db_pool_checked_out', 'Connections checked out of the pool', ('engine',))
+        self.fraud_seconds = registry.histogram(
+            'fraud_score_duration_seconds', 'Fraud model scoring latency', ('mode',))
+        self.fraud_scores = registry.histogram(
+            'fraud_score', 'Distribution of fraud scores', (), SCORE_BUCKETS)
+        self.alerts = registry.counter(
+            'fraud_alerts_created_total', 'Fraud alerts created', ('alert_type', 'severity'))
+        self.money_operations = registry.counter(
+            'money_operations_total', 'Committed money-moving operations', ('type',))
+        self.money_value = registry.counter(
+            'money_moved_total', 'Value moved by committed operations', ('type',))
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        with app.app_context():
+            for key, engine in db.engines.items():
+                self._instrument_engine(key or 'primary', engine)
+        self.pool_checked_out.set_function(self._pool_checked_out)
+
+        fraud_detector.score_observers.append(self._observe_scores)
+
+        event.listen(Transaction, 'after_insert', self._on_transaction)
+        event.listen(FraudAlert, 'after_insert', self._on_alert)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        event.listen(db.session, 'after_soft_rollback', self._after_rollback)
+
+    def response(self):
+        return Response(self.registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    # ---- requests ----
+
+    def _before_request(self):
+        self.registry.ensure_flusher()
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.metrics_request = [route, time.perf_counter(), 0, 0.0, None]
+        self.in_flight.inc(route)
+
+    def _after_request(self, response):
+        state = g.get('metrics_request')
+        if state is not None:
+            state[4] = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        state = g.pop('metrics_request', None)
+        if state is None:
+            return
+        route, started, queries, query_seconds, status = state
+        self.in_flight.dec(route)
+        self.request_seconds.observe(time.perf_counter() - started, request.method, route)
+        self.requests.inc(request.method, route, status or 500)
+        self.request_queries.observe(queries, route)
+        self.request_query_seconds.observe(query_seconds, route)
+
+    # ---- database ----
+
+    def _instrument_engine(self, name, engine):
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info['metrics_query_started'].pop()
+            self.query_seconds.observe(elapsed, name)
+            if has_request_context():
+                state = g.get('metrics_request')
+                if state is not None:
+                    state[2] += 1
+                    state[3] += elapsed
+
+        def handle_error(context):
+            started = context.connection.info.get('metrics_query_started') if context.connection else None
+            if started:
+                started.pop()
+            self.query_errors.inc(name)
+
+        event.listen(engine, 'before_cursor_execute', before_execute)
+        event.listen(engine, 'after_cursor_execute', after_execute)
+        event.listen(engine, 'handle_error', handle_error)
+        self._time_pool(name, engine.pool)
+        # dispose() replaces the pool, which would drop the timing wrapper
+        event.listen(engine, 'engine_disposed', lambda engine: self._time_pool(name, engine.pool))
+
+    def _time_pool(self, name, pool):
+        do_get = pool._do_get
+
+        def timed_do_get():
+            started = time.perf_counter()
+            try:
+                return do_get()
+            finally:
+                self.pool_wait.observe(time.perf_counter() - started, name)
+
+        pool._do_get = timed_do_get
+
+    def _pool_checked_out(self):
+        values = {}
+        with self.app.app_context():
+            for key, engine in self.db.engines.items():
+                checkedout = getattr(engine.pool, 'checkedout', None)
+                if callable(checkedout):
+                    values[(key or 'primary',)] = checkedout()
+        return values
+
+    # ---- fraud scoring ----
+
+    def _observe_scores(self, mode, seconds, scores):
+        self.fraud_seconds.observe(seconds, mode)
+        for score in scores:
+            self.fraud_scores.observe(score)
+
+    # ---- committed writes ----
+
+    def _on_transaction(self, mapper, connection, target):
+        # A transfer is two rows; count its debit leg only
+        if target.transaction_type == 'transfer' and (target.amount or 0) > 0:
+            return
+        self._pending(target).append(('money', target.transaction_type, abs(target.amount or 0)))
+
+    def _on_alert(self, mapper, connection, target):
+        self._pending(target).append(('alert', target.alert_type, target.severity))
+
+    def _pending(self, target):
+        return inspect(target).session.info.setdefault('metrics_events', [])
+
+    def _after_commit(self, session):
+        for kind, first, second in session.info.pop('metrics_events', ()):
+            if kind == 'money':
+                self.money_operations.inc(first)
+                self.money_value.inc(first, amount=second)
+            else:
+                self.alerts.inc(first, second)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop('metrics_events', None)
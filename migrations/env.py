@@ -1,4 +1,5 @@
 import logging
+import re
 from logging.config import fileConfig
 
 from flask import current_app
@@ -45,6 +46,24 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# Schema objects created outside the models: the search index (SQLite FTS5
+# shadow tables, PostgreSQL tsvector column and its GIN index) and the monthly
+# partitions of transaction. Autogenerate must not try to drop them.
+UNMANAGED_TABLES = re.compile(r'^transaction_(fts(_\w+)?|y\d{4}m\d{2}|default|unpartitioned)$')
+UNMANAGED_COLUMNS = {('transaction', 'search_vector')}
+UNMANAGED_INDEXES = {'ix_transaction_search_vector'}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table':
+        return not UNMANAGED_TABLES.match(name)
+    if type_ == 'column':
+        return (object.table.name, name) not in UNMANAGED_COLUMNS
+    if type_ == 'index':
+        return name not in UNMANAGED_INDEXES
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +84,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +113,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
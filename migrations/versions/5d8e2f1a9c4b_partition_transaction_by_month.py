@@ -0,0 +1,216 @@
+"""Partition transaction by month (PostgreSQL)
+
+Revision ID: 5d8e2f1a9c4b
+Revises: 0b6e4d1f9a28
+Create Date: 2026-10-19 19:42:08.513270
+
+"""
+import os
+import time
+from datetime import date
+
+from alembic import op
+from flask import current_app
+import sqlalchemy as sa
+
+from transaction_partitions import add_months, month_start, partition_name
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8e2f1a9c4b'
+down_revision = '0b6e4d1f9a28'
+branch_labels = None
+depends_on = None
+
+# Rows copied per transaction while the application keeps running
+BATCH_SIZE = int(os.getenv('PARTITION_BATCH_SIZE', 20000))
+BATCH_PAUSE = float(os.getenv('PARTITION_BATCH_PAUSE', 0))
+
+NEW = 'transaction_partitioned'
+OLD = 'transaction_unpartitioned'
+
+# PostgreSQL silently cuts longer identifiers, which would make renames miss
+MAX_IDENTIFIER = 63
+
+
+def _months(first, last):
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def _suffixed(name, suffix):
+    """``name`` + ``suffix``, shortened to fit in an identifier"""
+    return name[:MAX_IDENTIFIER - len(suffix)] + suffix
+
+
+def _columns(bind, table):
+    # Generated columns (search_vector) are recomputed by the target table
+    return bind.execute(sa.text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND is_generated = 'NEVER' "
+        "ORDER BY ordinal_position"
+    ), {'table': table}).scalars().all()
+
+
+def _indexes(bind, table):
+    """(name, 'USING ...' clause) of the plain indexes on ``table``"""
+    rows = bind.execute(sa.text(
+        "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = to_regclass(:table) AND NOT i.indisprimary ORDER BY c.relname"
+    ), {'table': f'"{table}"'}).all()
+    return [(name, definition[definition.index(' USING '):]) for name, definition in rows]
+
+
+def _foreign_keys(bind, table):
+    """(name, definition) of the foreign keys from ``table`` to other tables"""
+    return bind.execute(sa.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE contype = 'f' AND conrelid = to_regclass(:table) AND confrelid <> conrelid ORDER BY conname"
+    ), {'table': f'"{table}"'}).all()
+
+
+def _foreign_keys_to(bind, table):
+    """(table, name) of the foreign keys pointing at ``table``, its own included"""
+    return bind.execute(sa.text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = to_regclass(:table) ORDER BY conname"
+    ), {'table': f'"{table}"'}).all()
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # Declarative partitioning is PostgreSQL only; other databases keep the plain table
+        return
+    if bind.execute(sa.text(f"SELECT to_regclass('{OLD}')")).scalar() is not None:
+        raise RuntimeError(f"{OLD} is left over from an earlier run; drop it first")
+
+    columns = _columns(bind, 'transaction')
+    column_list = ', '.join(f'"{c}"' for c in columns)
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('\"transaction\"', 'id')")).scalar()
+
+    # 1. An empty partitioned copy with a partition per month of existing data.
+    # The partition key has to be part of the primary key, and every row needs one.
+    op.execute('UPDATE "transaction" SET "timestamp" = now() AT TIME ZONE \'utc\' WHERE "timestamp" IS NULL')
+    op.execute(f'CREATE TABLE {NEW} (LIKE "transaction" INCLUDING DEFAULTS INCLUDING GENERATED) '
+               'PARTITION BY RANGE ("timestamp")')
+    op.execute(f'ALTER TABLE {NEW} ALTER COLUMN "timestamp" SET NOT NULL')
+    op.execute(f'ALTER TABLE {NEW} ADD CONSTRAINT {NEW}_pkey PRIMARY KEY (id, "timestamp")')
+    first = bind.execute(sa.text('SELECT min("timestamp") FROM "transaction"')).scalar() or date.today()
+    # The same horizon `flask create-partitions` keeps ready afterwards
+    last = add_months(month_start(date.today()), current_app.config['TRANSACTION_PARTITION_MONTHS_AHEAD'])
+    for month in _months(first, last):
+        op.execute(f"CREATE TABLE {partition_name(month)} PARTITION OF {NEW} "
+                   f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')")
+    op.execute(f"CREATE TABLE transaction_default PARTITION OF {NEW} DEFAULT")
+    indexes = _indexes(bind, 'transaction')
+    for name, using in indexes:
+        op.execute(f"CREATE INDEX {_suffixed(name, '_p')} ON {NEW} {using}")
+    # Foreign keys into transaction (fraud_alert.transaction_id and
+    # related_transaction_id) cannot follow it: a partitioned table is only
+    # unique on (id, timestamp). They are dropped below; the ORM relationships stay.
+    for name, definition in _foreign_keys(bind, 'transaction'):
+        op.execute(f"ALTER TABLE {NEW} ADD CONSTRAINT {name} {definition}")
+
+    # 2. Mirror every write to the old table from now on. Upserts, so a row
+    # the backfill is copying at the same moment is neither lost nor doubled.
+    values = ', '.join(f'NEW."{c}"' for c in columns)
+    updates = ', '.join(f'"{c}" = EXCLUDED."{c}"' for c in columns)
+    op.execute(f"""CREATE FUNCTION transaction_partition_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM {NEW} WHERE id = OLD.id;
+            RETURN OLD;
+        END IF;
+        NEW."timestamp" := coalesce(NEW."timestamp", now() AT TIME ZONE 'utc');
+        IF TG_OP = 'UPDATE' THEN
+            DELETE FROM {NEW} WHERE id = OLD.id AND "timestamp" IS DISTINCT FROM NEW."timestamp";
+        END IF;
+        INSERT INTO {NEW} ({column_list}) VALUES ({values})
+            ON CONFLICT (id, "timestamp") DO UPDATE SET {updates};
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql""")
+    op.execute('CREATE TRIGGER transaction_partition_sync BEFORE INSERT OR UPDATE OR DELETE ON "transaction" '
+               'FOR EACH ROW EXECUTE FUNCTION transaction_partition_sync()')
+
+    # 3. Backfill in id ranges, one short transaction each. FOR KEY SHARE holds
+    # off a concurrent delete of a row until its copy has committed.
+    with op.get_context().autocommit_block():
+        low, high = bind.execute(sa.text('SELECT min(id), max(id) FROM "transaction"')).one()
+        copied = 0
+        started = time.time()
+        for batch_start in range(low, high + 1, BATCH_SIZE) if high is not None else ():
+            copied += bind.execute(sa.text(
+                f'INSERT INTO {NEW} ({column_list}) '
+                f'SELECT {column_list} FROM "transaction" WHERE id >= :low AND id < :high FOR KEY SHARE '
+                'ON CONFLICT (id, "timestamp") DO NOTHING'
+            ), {'low': batch_start, 'high': batch_start + BATCH_SIZE}).rowcount
+            print(f"  partitioning transaction: ids up to {min(batch_start + BATCH_SIZE - 1, high)} of {high}, "
+                  f"{copied} rows copied ({time.time() - started:.0f}s)")
+            if BATCH_PAUSE:
+                time.sleep(BATCH_PAUSE)
+        # Both counts come from one snapshot, so the mirror must match exactly
+        source, target = bind.execute(sa.text(
+            f'SELECT (SELECT count(*) FROM "transaction"), (SELECT count(*) FROM {NEW})'
+        )).one()
+        if source != target:
+            raise RuntimeError(f"Backfill mismatch: {source} rows in transaction, {target} in {NEW}")
+
+    # 4. Swap under a short exclusive lock. The old table is kept, detached
+    # from everything, as transaction_unpartitioned until it is dropped by hand.
+    op.execute('LOCK TABLE "transaction" IN ACCESS EXCLUSIVE MODE')
+    op.execute('DROP TRIGGER transaction_partition_sync ON "transaction"')
+    op.execute('DROP FUNCTION transaction_partition_sync()')
+    for table, name in _foreign_keys_to(bind, 'transaction'):
+        op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+    for name, _ in _foreign_keys(bind, 'transaction'):
+        op.execute(f'ALTER TABLE "transaction" DROP CONSTRAINT {name}')
+    op.execute('ALTER TABLE "transaction" ALTER COLUMN id DROP DEFAULT')
+    op.execute(f'ALTER TABLE "transaction" RENAME TO {OLD}')
+    op.execute(f'ALTER INDEX transaction_pkey RENAME TO {OLD}_pkey')
+    for name, _ in indexes:
+        op.execute(f'ALTER INDEX {name} RENAME TO {_suffixed(name, "_unpartitioned")}')
+    op.execute(f'ALTER TABLE {NEW} RENAME TO "transaction"')
+    op.execute(f'ALTER INDEX {NEW}_pkey RENAME TO transaction_pkey')
+    for name, _ in indexes:
+        op.execute(f'ALTER INDEX {_suffixed(name, "_p")} RENAME TO {name}')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "transaction".id')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    # Copies everything back in one transaction; writes wait until it commits
+    op.execute('LOCK TABLE "transaction" IN EXCLUSIVE MODE')
+    columns = ', '.join(f'"{c}"' for c in _columns(bind, 'transaction'))
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('\"transaction\"', 'id')")).scalar()
+    indexes = _indexes(bind, 'transaction')
+    foreign_keys = _foreign_keys(bind, 'transaction')
+
+    op.execute('CREATE TABLE transaction_restored (LIKE "transaction" INCLUDING DEFAULTS INCLUDING GENERATED)')
+    op.execute(f'INSERT INTO transaction_restored ({columns}) SELECT {columns} FROM "transaction"')
+    op.execute('ALTER TABLE transaction_restored ALTER COLUMN "timestamp" DROP NOT NULL')
+    op.execute('ALTER TABLE transaction_restored ADD CONSTRAINT transaction_restored_pkey PRIMARY KEY (id)')
+    for name, using in indexes:
+        op.execute(f"CREATE INDEX {_suffixed(name, '_r')} ON transaction_restored {using}")
+    for name, definition in foreign_keys:
+        op.execute(f"ALTER TABLE transaction_restored ADD CONSTRAINT {name} {definition}")
+
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY transaction_restored.id')
+    op.execute('DROP TABLE "transaction"')
+    op.execute(f'DROP TABLE IF EXISTS {OLD}')
+    op.execute('ALTER TABLE transaction_restored RENAME TO "transaction"')
+    op.execute('ALTER INDEX transaction_restored_pkey RENAME TO transaction_pkey')
+    for name, _ in indexes:
+        op.execute(f'ALTER INDEX {_suffixed(name, "_r")} RENAME TO {name}')
+    op.execute('ALTER TABLE "transaction" ADD CONSTRAINT transaction_related_transaction_id_fkey '
+               'FOREIGN KEY (related_transaction_id) REFERENCES "transaction" (id)')
+    op.execute('ALTER TABLE fraud_alert ADD CONSTRAINT fraud_alert_transaction_id_fkey '
+               'FOREIGN KEY (transaction_id) REFERENCES "transaction" (id)')
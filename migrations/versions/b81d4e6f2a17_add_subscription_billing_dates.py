@@ -0,0 +1,34 @@
+"""Add subscription billing dates
+
+Revision ID: b81d4e6f2a17
+Revises: 7f4a2c91e0b3
+Create Date: 2026-10-19 11:21:05.904412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81d4e6f2a17'
+down_revision = '7f4a2c91e0b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('subscription', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_billing_date', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_billed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_subscription_status_next_billing', ['status', 'next_billing_date'], unique=False)
+
+    # Existing subscriptions become due on their creation date and are
+    # picked up by the next billing run
+    op.execute("UPDATE subscription SET next_billing_date = COALESCE(created_at, CURRENT_TIMESTAMP)")
+
+
+def downgrade():
+    with op.batch_alter_table('subscription', schema=None) as batch_op:
+        batch_op.drop_index('ix_subscription_status_next_billing')
+        batch_op.drop_column('last_billed_at')
+        batch_op.drop_column('next_billing_date')
@@ -0,0 +1,99 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashing jobs are already queued"""
+
+
+class PasswordHasher:
+    """Runs password hashing on a bounded thread pool.
+
+    bcrypt, scrypt and pbkdf2 all release the GIL while hashing, so moving
+    them onto a pool keeps threaded workers responsive and caps how much
+    CPU a burst of logins can take. ``algorithm`` is either ``'bcrypt'`` or
+    any werkzeug method string (``'scrypt'``, ``'pbkdf2:sha256:600000'``).
+    """
+
+    BCRYPT_MAX_BYTES = 72
+
+    def __init__(self, algorithm='bcrypt', bcrypt_rounds=12, workers=None,
+                 max_queue=64, timeout=10):
+        self.algorithm = algorithm
+        self.bcrypt_rounds = bcrypt_rounds
+        self.timeout = timeout
+        self.workers = workers or os.cpu_count() or 2
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix='password-hasher')
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self._method_prefix = None
+
+    # ---- public API ----
+
+    def hash(self, password):
+        """Hash a password with the configured algorithm"""
+        return self._submit(self._hash, password)
+
+    def verify(self, stored_hash, password):
+        """Check a password against a stored bcrypt or werkzeug hash"""
+        return self._submit(self._verify, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """Return True if a stored hash uses a different algorithm or cost"""
+        if self.algorithm == 'bcrypt':
+            if not self._is_bcrypt(stored_hash):
+                return True
+            return int(stored_hash.split('$')[2]) != self.bcrypt_rounds
+        if self._is_bcrypt(stored_hash):
+            return True
+        return stored_hash.split('$', 1)[0] != self._werkzeug_prefix()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    # ---- internals ----
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("Password hashing queue is full")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def _hash(self, password):
+        if self.algorithm == 'bcrypt':
+            encoded = password.encode('utf-8')
+            if len(encoded) > self.BCRYPT_MAX_BYTES:
+                raise ValueError(f"Password must be at most {self.BCRYPT_MAX_BYTES} bytes")
+            salt = bcrypt.gensalt(rounds=self.bcrypt_rounds)
+            return bcrypt.hashpw(encoded, salt).decode('ascii')
+        return generate_password_hash(password, method=self.algorithm)
+
+    def _verify(self, stored_hash, password):
+        if not stored_hash:
+            return False
+        if self._is_bcrypt(stored_hash):
+            encoded = password.encode('utf-8')
+            if len(encoded) > self.BCRYPT_MAX_BYTES:
+                return False
+            return bcrypt.checkpw(encoded, stored_hash.encode('ascii'))
+        return check_password_hash(stored_hash, password)
+
+    def _werkzeug_prefix(self):
+        # werkzeug expands short method names ("scrypt") into the full
+        # parameter string it stores, so derive that once from a real hash
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', method=self.algorithm).split('$', 1)[0]
+        return self._method_prefix
+
+    @staticmethod
+    def _is_bcrypt(stored_hash):
+        return stored_hash.startswith(('$2a$', '$2b$', '$2y$'))
@@ -0,0 +1,264 @@
+import fcntl
+import functools
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+from flask import request, session
+from werkzeug.exceptions import TooManyRequests
+
+# Per-route limits: "<count>/<period> per <key>", several separated by ";".
+# Keys are ip, user (the signed-in user, else the ip) and username (the
+# submitted login name, so one account cannot be guessed at from many ips).
+RATE_LIMIT_DEFAULTS = {
+    'RATE_LIMIT_LOGIN': '20/minute per ip; 5/minute per username',
+    'RATE_LIMIT_TRANSFER': '10/minute per user; 30/minute per ip',
+    'RATE_LIMIT_DEPOSIT': '10/minute per user; 30/minute per ip',
+    'RATE_LIMIT_WITHDRAW': '10/minute per user; 30/minute per ip',
+    'RATE_LIMIT_STATEMENT_OTP': '3/10minutes per user; 10/10minutes per ip',
+}
+
+_PERIODS = {'s': 1, 'second': 1, 'm': 60, 'minute': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+_RULE = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+?)s?\s+per\s+(ip|user|username)\s*$')
+
+
+class RateLimited(TooManyRequests):
+    def __init__(self, retry_after):
+        super().__init__(f"Too many requests. Try again in {int(retry_after) + 1} seconds.")
+        self.retry_after = retry_after
+
+
+def parse_limits(spec):
+    """'5/minute per username; 20/10m per ip' -> [(capacity, refill per second, key), ...]"""
+    limits = []
+    for part in filter(None, (p.strip() for p in spec.split(';'))):
+        match = _RULE.match(part.lower())
+        if not match or match.group(3) not in _PERIODS:
+            raise ValueError(f"Invalid rate limit: {part!r}")
+        count, multiplier, unit, key = match.groups()
+        period = int(multiplier or 1) * _PERIODS[unit]
+        limits.append((int(count), int(count) / period, key))
+    return limits
+
+
+class MemoryBuckets:
+    """Token buckets in this process only; for development and tests"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+class SharedMemoryBuckets:
+    """Token buckets in a memory-mapped file shared by every worker on the host.
+
+    The file is a fixed open-addressing table of (key hash, tokens,
+    updated) slots; a full neighbourhood evicts its least recently used
+    bucket, which at worst hands that key a fresh burst. Each decision takes
+    an exclusive flock on the file for a few microseconds. Put the file on
+    tmpfs (/dev/shm) so it never touches a disk.
+    """
+
+    _SLOT = struct.Struct('<Qdd')
+    _PROBES = 8
+
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        # flock is per open file description, so threads of one worker also need a lock
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        # A worker forked from a process that already opened the file would
+        # share its file description, and flock would not exclude the two
+        size = self.slots * self._SLOT.size
+        self._pid = os.getpid()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size != size:
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        path = url[len('shm://'):]
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        return cls(path, **kwargs)
+
+    def take(self, key, capacity, rate, cost=1):
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        now = time.time()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset, tokens, updated = self._find(digest)
+                if updated is None:
+                    tokens = capacity
+                else:
+                    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                self._SLOT.pack_into(self._map, offset, digest, tokens, now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def _find(self, digest):
+        """Slot offset for ``digest`` and its stored state (None when new)"""
+        start = digest % self.slots
+        oldest = None
+        for probe in range(self._PROBES):
+            offset = ((start + probe) % self.slots) * self._SLOT.size
+            slot_key, tokens, updated = self._SLOT.unpack_from(self._map, offset)
+            if slot_key == digest:
+                return offset, tokens, updated
+            if slot_key == 0:
+                return offset, None, None
+            if oldest is None or updated < oldest[1]:
+                oldest = (offset, updated)
+        return oldest[0], None, None
+
+
+class RedisBuckets:
+    """Token buckets in Redis (or any server speaking its protocol), updated atomically in Lua"""
+
+    SCRIPT = """
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local capacity, rate, now, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, client, prefix='securebank:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, tokens = self._script(keys=[self.prefix + key], args=[capacity, rate, time.time(), cost])
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (cost - tokens) / rate
+
+
+def create_buckets(url):
+    """Token bucket store from memory://, shm:///dev/shm/file, redis://host:6379/0 or none://"""
+    if not url or url.startswith('memory://'):
+        return MemoryBuckets()
+    if url.startswith('shm://'):
+        return SharedMemoryBuckets.from_url(url)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBuckets.from_url(url)
+    if url.startswith('none://'):
+        return None
+    raise ValueError(f"Unsupported rate limit URL: {url}")
+
+
+class RateLimiter:
+    """Token-bucket limits per route, keyed by ip, signed-in user or login name.
+
+    Limits come from ``RATE_LIMIT_<NAME>`` config values (see
+    ``RATE_LIMIT_DEFAULTS``); an empty value switches a route's limits off.
+    If the bucket store fails the request is let through, so an outage of
+    the store cannot lock everyone out.
+    """
+
+    def __init__(self, app, buckets):
+        self.app = app
+        self.buckets = buckets
+        self.limited = {}
+        self._lock = threading.Lock()
+
+    def limit(self, name, methods=('POST',)):
+        """Decorator applying the ``RATE_LIMIT_<NAME>`` limits to ``methods`` requests.
+
+        Place it above ``immediate_transaction`` so a throttled request is
+        refused before it takes the SQLite write lock.
+        """
+        limits = parse_limits(self.app.config.get(f"RATE_LIMIT_{name.upper()}", ''))
+
+        def decorator(view):
+            if self.buckets is None or not limits:
+                return view
+
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method in methods:
+                    self.check(name, limits)
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def check(self, name, limits):
+        """Take a token from every bucket the request falls in; raise RateLimited if one is empty"""
+        retry_after = 0.0
+        for capacity, rate, key in limits:
+            identity = self._identity(key)
+            if identity is None:
+                continue
+            try:
+                allowed, wait = self.buckets.take(f"{name}:{key}:{identity}", capacity, rate)
+            except Exception as e:
+                print(f"Rate limit check failed, allowing request: {e}")
+                return
+            if not allowed:
+                retry_after = max(retry_after, wait)
+        if retry_after:
+            with self._lock:
+                self.limited[name] = self.limited.get(name, 0) + 1
+            raise RateLimited(retry_after)
+
+    def _identity(self, key):
+        if key == 'ip':
+            return request.remote_addr
+        if key == 'user':
+            # Read the id Flask-Login keeps in the session rather than
+            # current_user, which would load the user from the database
+            user_id = session.get('_user_id')
+            if user_id is not None:
+                return f"id{user_id}"
+            return f"ip{request.remote_addr}"
+        if key == 'username':
+            username = (request.form.get('username') or '').strip().lower()
+            return username or None
+        raise ValueError(f"Unknown rate limit key: {key}")
+
+    def snapshot(self):
+        with self._lock:
+            return {'store': type(self.buckets).__name__ if self.buckets else None, 'limited': dict(self.limited)}
@@ -0,0 +1,329 @@
+import cProfile
+import fcntl
+import glob
+import itertools
+import json
+import os
+import re
+import secrets
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+MODES = ('cprofile', 'sample')
+ACTIVE_FILE = 'active.json'
+_SESSION_ID = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{6}$')
+
+
+class StackSampler:
+    """Samples the stacks of chosen threads from one background thread.
+
+    Only runs while at least one thread is tracked, and the tracked
+    threads do nothing extra themselves, so the overhead is one stack walk
+    per thread per ``interval``.
+    """
+
+    def __init__(self, interval, root):
+        self.interval = interval
+        # Longest first, so site-packages wins over the stdlib directory that contains it
+        self.prefixes = sorted(
+            {root, sysconfig.get_paths()['purelib'] + os.sep, sysconfig.get_paths()['stdlib'] + os.sep},
+            key=len, reverse=True
+        )
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def track(self, ident):
+        with self._lock:
+            self._tracked[ident] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def untrack(self, ident):
+        with self._lock:
+            return self._tracked.pop(ident, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._tracked:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for ident, stacks in self._tracked.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[self._fold(frame)] += 1
+
+    def _fold(self, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            filename = code.co_filename
+            for prefix in self.prefixes:
+                if filename.startswith(prefix):
+                    filename = filename[len(prefix):]
+                    break
+            names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+class RequestProfiler:
+    """Profiles live requests on demand, across every worker.
+
+    ``start()`` writes a session to ``<directory>/active.json``; each worker
+    watches that file from a background thread, so a request pays a single
+    attribute check while no session is running. A session covers the
+    next ``requests`` matching requests (counted across workers) and/or the
+    next ``seconds``, optionally on one URL rule. ``cprofile`` mode writes a
+    ``.prof`` file per request; ``sample`` mode samples the request thread's
+    stack every ``interval_ms`` and writes folded stacks. ``aggregate()``
+    merges them into ``profile.pstats`` (for pstats/snakeviz) and
+    ``profile.folded`` (for flamegraph.pl or speedscope).
+    """
+
+    def __init__(self, app, directory, poll_interval=1.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._root = app.root_path + os.sep
+        self._session = None
+        self._session_mtime = None
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+        # cProfile allows one active profiler per process from Python 3.12
+        self._cprofile_lock = threading.Lock()
+        self._samplers = {}
+        self._sequence = itertools.count()
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    # ---- control ----
+
+    def start(self, route=None, requests=None, seconds=None, mode='cprofile', interval_ms=5):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if not requests and not seconds:
+            raise ValueError("Give a number of requests, a number of seconds, or both")
+        if requests is not None and int(requests) < 1 or seconds is not None and float(seconds) <= 0:
+            raise ValueError("requests and seconds must be positive")
+        session = {
+            'id': f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}",
+            'route': route or None,
+            'requests': int(requests) if requests else None,
+            'until': time.time() + float(seconds) if seconds else None,
+            'mode': mode,
+            'interval': max(1, int(interval_ms)) / 1000,
+            'started_at': time.time(),
+        }
+        os.makedirs(os.path.join(self.directory, session['id']))
+        self._write_json(os.path.join(self.directory, session['id'], 'session.json'), session)
+        self._write_json(os.path.join(self.directory, ACTIVE_FILE), session)
+        self._session = session
+        return session
+
+    def stop(self, session_id=None):
+        """End the active session (only if it is ``session_id``, when given)"""
+        with self._locked():
+            active = self._read_json(os.path.join(self.directory, ACTIVE_FILE))
+            if active is None or session_id and active['id'] != session_id:
+                return None
+            os.remove(os.path.join(self.directory, ACTIVE_FILE))
+        if self._session and self._session['id'] == active['id']:
+            self._session = None
+        return active['id']
+
+    def active(self):
+        session = self._read_json(os.path.join(self.directory, ACTIVE_FILE))
+        if session is not None and session['until'] and session['until'] < time.time():
+            self.stop(session['id'])
+            return None
+        return session
+
+    def sessions(self):
+        results = []
+        for path in sorted(glob.glob(os.path.join(self.directory, '*', 'session.json')), reverse=True):
+            session = self._read_json(path)
+            if session is None:
+                continue
+            session_dir = os.path.dirname(path)
+            session['profiled_requests'] = len(glob.glob(os.path.join(session_dir, 'requests', '*')))
+            results.append(session)
+        return results
+
+    def aggregate(self, session_id):
+        """Merge a session's per-request files; returns {'pstats': path, 'folded': path}"""
+        import pstats
+
+        session_dir = self.session_dir(session_id)
+        outputs = {}
+        profiles = sorted(glob.glob(os.path.join(session_dir, 'requests', '*.prof')))
+        if profiles:
+            outputs['pstats'] = os.path.join(session_dir, 'profile.pstats')
+            pstats.Stats(*profiles).dump_stats(outputs['pstats'])
+        folded = sorted(glob.glob(os.path.join(session_dir, 'requests', '*.folded')))
+        if folded:
+            stacks = Counter()
+            for path in folded:
+                with open(path) as fh:
+                    for line in fh:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        stacks[stack] += int(count)
+            outputs['folded'] = os.path.join(session_dir, 'profile.folded')
+            with open(outputs['folded'], 'w') as fh:
+                for stack, count in stacks.most_common():
+                    fh.write(f"{stack} {count}\n")
+        return outputs
+
+    def session_dir(self, session_id):
+        if not _SESSION_ID.match(session_id or ''):
+            raise ValueError(f"Invalid profiling session: {session_id}")
+        path = os.path.join(self.directory, session_id)
+        if not os.path.isdir(path):
+            raise ValueError(f"Unknown profiling session: {session_id}")
+        return path
+
+    # ---- per request ----
+
+    def _before_request(self):
+        if self._watcher_pid != os.getpid():
+            self._start_watcher()
+        session = self._session
+        if session is None:
+            return
+        if session['route'] and (request.url_rule is None or request.url_rule.rule != session['route']):
+            return
+        if session['mode'] == 'cprofile':
+            if not self._cprofile_lock.acquire(blocking=False):
+                return
+            if not self._claim(session):
+                self._cprofile_lock.release()
+                return
+            profile = cProfile.Profile()
+            g.request_profile = (session, profile)
+            profile.enable()
+        elif self._claim(session):
+            sampler = self._sampler(session)
+            sampler.track(threading.get_ident())
+            g.request_profile = (session, sampler)
+
+    def _teardown_request(self, exc):
+        state = g.pop('request_profile', None)
+        if state is None:
+            return
+        session, profiler = state
+        requests_dir = os.path.join(self.directory, session['id'], 'requests')
+        os.makedirs(requests_dir, exist_ok=True)
+        name = f"{os.getpid()}-{next(self._sequence)}"
+        try:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+                self._cprofile_lock.release()
+                profiler.dump_stats(os.path.join(requests_dir, f"{name}.prof"))
+            else:
+                stacks = profiler.untrack(threading.get_ident())
+                with open(os.path.join(requests_dir, f"{name}.folded"), 'w') as fh:
+                    for stack, count in stacks.items():
+                        fh.write(f"{stack} {count}\n")
+        except OSError as e:
+            print(f"Could not save request profile: {e}")
+
+    def _claim(self, session):
+        """Take one of the session's request slots, shared by all workers"""
+        if session['until'] and session['until'] < time.time():
+            self._session = None
+            return False
+        if not session['requests']:
+            return True
+        with self._locked():
+            path = os.path.join(self.directory, session['id'], 'claims')
+            try:
+                with open(path) as fh:
+                    claimed = int(fh.read() or 0)
+            except FileNotFoundError:
+                claimed = 0
+            if claimed >= session['requests']:
+                self._session = None
+                return False
+            with open(path, 'w') as fh:
+                fh.write(str(claimed + 1))
+            if claimed + 1 >= session['requests']:
+                # The last slot is taken: end the session for every worker
+                active_path = os.path.join(self.directory, ACTIVE_FILE)
+                active = self._read_json(active_path)
+                if active and active['id'] == session['id']:
+                    os.remove(active_path)
+                self._session = None
+        return True
+
+    def _sampler(self, session):
+        sampler = self._samplers.get(session['interval'])
+        if sampler is None:
+            sampler = self._samplers.setdefault(session['interval'], StackSampler(session['interval'], self._root))
+        return sampler
+
+    # ---- watching the control file ----
+
+    def _start_watcher(self):
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            threading.Thread(target=self._watch, name='request-profiler-watch', daemon=True).start()
+
+    def _watch(self):
+        path = os.path.join(self.directory, ACTIVE_FILE)
+        while True:
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime is None:
+                self._session = None
+            elif mtime != self._session_mtime:
+                self._session = self._read_json(path)
+            session = self._session
+            if session is not None and session['until'] and session['until'] < time.time():
+                self._session = None
+            self._session_mtime = mtime
+            time.sleep(self.poll_interval)
+
+    # ---- files ----
+
+    def _locked(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return _FileLock(os.path.join(self.directory, '.lock'))
+
+    def _write_json(self, path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, path)
+
+    def _read_json(self, path):
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self._fh = open(self.path, 'w')
+        fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self._fh.close()
@@ -1,15 +1,16 @@
 import random
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
 from faker import Faker
 
 fake = Faker()
 
 
 def main():
-    from app import app, db, User, Account, Transaction, FraudAlert, Card, Subscription, UPI, FraudDetector
+    from app import app, db, User, Account, Transaction, FraudAlert, Card, Subscription, UPI, FraudDetector, password_hasher
 
     fraud_detector = FraudDetector()
+    # Train (or load) the models now so the first app start doesn't have to
+    fraud_detector.warm_up()
 
     def generate_unique_upi(user, existing_upis):
         base_upi = f"{user.first_name.lower()}.{user.last_name.lower()}"
@@ -39,7 +40,7 @@ def main():
         admin = User(
             username='admin',
             email='admin@securebank.com',
-            password_hash=generate_password_hash('admin123'),
+            password_hash=password_hasher.hash('admin123'),
             first_name='Admin',
             last_name='User',
             phone='555-0001',
@@ -47,12 +48,14 @@ def main():
         )
         users.append(admin)
 
+        # Every seeded user shares the same password, so hash it once
+        default_password_hash = password_hasher.hash("password123")
         for _ in range(50):
             first_name = fake.first_name()
             last_name = fake.last_name()
             username = f"{first_name.lower()}{random.randint(100, 999)}"
             email = f"{username}@example.com"
-            password_hash = generate_password_hash("password123")
+            password_hash = default_password_hash
             phone = fake.phone_number()
             users.append(User(
                 username=username,
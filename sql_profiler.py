@@ -0,0 +1,179 @@
+import contextlib
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+# Expanded IN lists such as "IN (?, ?, ?)" or "IN (%(id_1_1)s, %(id_1_2)s)"
+_IN_LIST = re.compile(
+    r'\b(IN\s*)\(\s*(?:\?|%\([^)]*\)s|:\w+)(?:\s*,\s*(?:\?|%\([^)]*\)s|:\w+))*\s*\)', re.IGNORECASE
+)
+_WHITESPACE = re.compile(r'\s+')
+# Transaction control and connection setup are not queries
+_NOT_A_QUERY = re.compile(r'^\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|PRAGMA)\b', re.IGNORECASE)
+
+
+def statement_shape(statement):
+    """Normalize a statement so the same query with other parameters matches"""
+    return _IN_LIST.sub(r'\1(?)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class SQLProfiler:
+    """Per-request SQL recording, N+1 detection and a slow query log.
+
+    With ``enabled``, every statement of a request is recorded with its
+    timing and the application line that issued it. A statement shape
+    repeated ``n_plus_one_threshold`` times in one request is reported as an
+    N+1 suspect (a lazy relationship loaded in a loop, usually), and each
+    request gets a ``Server-Timing: db`` header. The slow query log works on
+    its own and reports any statement slower than ``slow_query_ms``, inside
+    a request or not; a slow BEGIN or COMMIT is waiting on a lock (or a
+    sync), not running a query, and is logged and counted as a lock wait. Parameters are never logged, as they may hold card
+    numbers or password hashes. With both off no listener is installed.
+    """
+
+    def __init__(self, app, db, enabled=False, slow_query_ms=0, n_plus_one_threshold=5, history=100):
+        self.app = app
+        self.db = db
+        self.enabled = enabled
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.recent = deque(maxlen=history)
+        self.suspects = Counter()
+        self.slow_queries = 0
+        self.lock_waits = 0
+        self._lock = threading.Lock()
+        self._root = app.root_path + os.sep
+
+        if enabled or slow_query_ms > 0:
+            with app.app_context():
+                for key, engine in db.engines.items():
+                    event.listen(engine, 'before_cursor_execute', self._before_execute)
+                    event.listen(engine, 'after_cursor_execute', self._after_execute)
+        if enabled:
+            app.before_request(self._start)
+            app.after_request(self._finish)
+
+    # ---- statement hooks ----
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_query_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('profiler_query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        profile = g.get('sql_profile') if has_request_context() else None
+        location = None
+        is_query = not _NOT_A_QUERY.match(statement)
+        if profile is not None and is_query:
+            location = self._caller()
+            profile.append((statement_shape(statement), elapsed, location))
+        if self.slow_query_seconds and elapsed >= self.slow_query_seconds:
+            with self._lock:
+                if is_query:
+                    self.slow_queries += 1
+                else:
+                    self.lock_waits += 1
+            where = f"{request.method} {request.path}" if has_request_context() else 'outside a request'
+            print(f"{'Slow query' if is_query else 'Lock wait'} ({elapsed * 1000:.1f} ms, {where}, "
+                  f"{location or self._caller()}): {statement_shape(statement)[:500]}")
+
+    def _caller(self):
+        """First frame in the app's own code (views, helpers or templates)"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(self._root) and filename != __file__ \
+                    and f"{os.sep}site-packages{os.sep}" not in filename:
+                return f"{os.path.relpath(filename, self._root)}:{frame.f_lineno}"
+            frame = frame.f_back
+        return 'unknown'
+
+    # ---- requests ----
+
+    def _start(self):
+        g.sql_profile = []
+
+    def _finish(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        total = sum(elapsed for _, elapsed, _ in profile)
+        shapes = Counter(shape for shape, _, _ in profile)
+        suspects = []
+        for shape, count in shapes.most_common():
+            if count < self.n_plus_one_threshold:
+                break
+            locations = Counter(location for s, _, location in profile if s == shape)
+            suspects.append({'count': count, 'statement': shape, 'locations': dict(locations)})
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        for suspect in suspects:
+            print(f"N+1 suspect on {request.method} {route}: {suspect['count']}x from "
+                  f"{', '.join(suspect['locations'])}: {suspect['statement'][:300]}")
+        with self._lock:
+            for suspect in suspects:
+                self.suspects[(route, suspect['statement'])] += 1
+            self.recent.append({
+                'method': request.method,
+                'route': route,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': len(profile),
+                'db_ms': round(total * 1000, 3),
+                'n_plus_one': suspects,
+            })
+        response.headers.add('Server-Timing', f'db;dur={total * 1000:.1f};desc="{len(profile)} queries"')
+        return response
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'recent_requests': list(self.recent),
+                'n_plus_one_suspects': [
+                    {'route': route, 'statement': statement, 'requests': count}
+                    for (route, statement), count in self.suspects.most_common()
+                ],
+                'slow_queries': self.slow_queries,
+                'lock_waits': self.lock_waits,
+            }
+
+    # ---- query budgets ----
+
+    @contextlib.contextmanager
+    def assert_max_queries(self, limit):
+        """Fail if the block issues more than ``limit`` queries on any engine::
+
+            with sql_profiler.assert_max_queries(6):
+                client.get('/dashboard')
+
+        Yields the list of captured statements.
+        """
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if not _NOT_A_QUERY.match(statement):
+                statements.append(statement_shape(statement))
+
+        with self.app.app_context():
+            engines = list(self.db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            yield statements
+        finally:
+            for engine in engines:
+                event.remove(engine, 'before_cursor_execute', capture)
+        if len(statements) > limit:
+            listing = '\n'.join(f"  {i + 1}. {s[:200]}" for i, s in enumerate(statements))
+            raise QueryBudgetExceeded(f"{len(statements)} queries issued, at most {limit} allowed:\n{listing}")
@@ -0,0 +1,78 @@
+function viewTransactionDetails(transactionId) {
+    const modalBody = document.getElementById('transactionModalBody');
+    modalBody.innerHTML = `
+        <div class="text-center">
+            <i class="fas fa-spinner fa-spin fa-2x text-primary mb-3"></i>
+            <p>Loading transaction details...</p>
+        </div>
+    `;
+    const modal = new bootstrap.Modal(document.getElementById('transactionModal'));
+    modal.show();
+    setTimeout(() => {
+        modalBody.innerHTML = `
+            <div class="row">
+                <div class="col-md-6">
+                    <h6>Transaction Information</h6>
+                    <table class="table table-sm">
+                        <tr><td>Transaction ID:</td><td>#${transactionId}</td></tr>
+                        <tr><td>Type:</td><td>Transfer</td></tr>
+                        <tr><td>Amount:</td><td>$1,250.00</td></tr>
+                        <tr><td>Date:</td><td>2024-01-15 14:30:25</td></tr>
+                        <tr><td>Status:</td><td><span class="badge bg-success">Completed</span></td></tr>
+                    </table>
+                </div>
+                <div class="col-md-6">
+                    <h6>Fraud Detection</h6>
+                    <table class="table table-sm">
+                        <tr><td>Fraud Score:</td><td><span class="fraud-score medium">45.2%</span></td></tr>
+                        <tr><td>Risk Level:</td><td><span class="badge bg-warning">Medium</span></td></tr>
+                        <tr><td>Location:</td><td>New York, NY</td></tr>
+                        <tr><td>IP Address:</td><td>192.168.1.100</td></tr>
+                    </table>
+                </div>
+            </div>
+        `;
+    }, 1000);
+}
+
+function exportTransactions() {
+    alert('Export feature coming soon!');
+}
+
+// Charts
+document.addEventListener('DOMContentLoaded', function() {
+    const riskCtx = document.getElementById('riskChart').getContext('2d');
+    new Chart(riskCtx, {
+        type: 'doughnut',
+        data: {
+            labels: ['Safe', 'Low Risk', 'Medium Risk', 'High Risk'],
+            datasets: [{
+                data: [65, 20, 10, 5],
+                backgroundColor: ['#28a745','#17a2b8','#ffc107','#dc3545']
+            }]
+        },
+        options: { responsive: true, plugins: { legend: { position: 'bottom' } } }
+    });
+
+    // Counts by type come from the precomputed monthly summaries
+    const typeCanvas = document.getElementById('typeChart');
+    fetch(typeCanvas.dataset.summaryUrl, { credentials: 'same-origin' })
+        .then(response => response.json())
+        .then(summary => {
+            const counts = {};
+            summary.months.forEach(month => {
+                Object.entries(month.by_type).forEach(([type, totals]) => {
+                    counts[type] = (counts[type] || 0) + totals.transactions;
+                });
+            });
+            const labels = Object.keys(counts).sort();
+            new Chart(typeCanvas.getContext('2d'), {
+                type: 'bar',
+                data: {
+                    labels: labels.map(type => type.charAt(0).toUpperCase() + type.slice(1)),
+                    datasets: [{ label: 'Count', data: labels.map(type => counts[type]), backgroundColor: ['#3498db','#27ae60','#f39c12','#8e44ad','#e74c3c'] }]
+                },
+                options: { responsive: true, scales: { y: { beginAtZero: true } } }
+            });
+        });
+});
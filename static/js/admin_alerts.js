@@ -0,0 +1,177 @@
+// Filter functionality
+document.addEventListener('DOMContentLoaded', function() {
+    const statusFilter = document.getElementById('statusFilter');
+    const severityFilter = document.getElementById('severityFilter');
+    const typeFilter = document.getElementById('typeFilter');
+    const dateFilter = document.getElementById('dateFilter');
+
+    // Filters are applied server-side; reload the first page on change
+    [statusFilter, severityFilter, typeFilter, dateFilter].forEach(filter => {
+        filter.addEventListener('change', () => document.getElementById('alertFilters').submit());
+    });
+
+    const selectAll = document.getElementById('selectAll');
+    if (selectAll) {
+        selectAll.addEventListener('change', () => {
+            document.querySelectorAll('.alert-select').forEach(box => box.checked = selectAll.checked);
+        });
+    }
+
+    // Initialize charts
+    initializeCharts();
+
+    connectAlertStream();
+});
+
+// Live updates: new alerts raise a banner, resolutions update rows in place
+function connectAlertStream() {
+    if (!window.EventSource) return;
+    const source = new EventSource(ALERTS_CONFIG.streamUrl);
+    let newAlerts = 0;
+
+    source.addEventListener('created', event => {
+        newAlerts += 1;
+        document.getElementById('liveAlertCount').textContent = newAlerts;
+        document.getElementById('liveAlertBanner').classList.remove('d-none');
+    });
+
+    source.addEventListener('resolved', event => {
+        const data = JSON.parse(event.data);
+        const row = document.querySelector(`.alert-row[data-alert-id="${data.id}"]`);
+        if (!row) return;
+        row.dataset.status = 'resolved';
+        row.querySelector('.alert-status').innerHTML =
+            '<span class="badge bg-success"><i class="fas fa-check me-1"></i>Resolved</span>';
+        row.querySelector('.alert-actions').innerHTML = '<span class="text-muted">Resolved by Admin</span>';
+        const checkbox = row.querySelector('.alert-select');
+        if (checkbox) checkbox.remove();
+    });
+}
+
+function bulkResolve(payload, message) {
+    if (!confirm(message)) return;
+    fetch(ALERTS_CONFIG.resolveUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(payload)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            location.reload();
+        } else {
+            alert(data.error || 'Error resolving alerts');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('Error resolving alerts');
+    });
+}
+
+function resolveSelected() {
+    const ids = Array.from(document.querySelectorAll('.alert-select:checked')).map(box => parseInt(box.value));
+    if (!ids.length) {
+        alert('Select at least one alert');
+        return;
+    }
+    bulkResolve({alert_ids: ids}, `Resolve ${ids.length} selected alert(s)?`);
+}
+
+function resolveMatching() {
+    bulkResolve({filters: ALERTS_CONFIG.filters}, 'Resolve every active alert matching the current filters?');
+}
+
+function resolveAlert(alertId) {
+    if (confirm('Are you sure you want to resolve this alert?')) {
+        fetch(`/admin/resolve_alert/${alertId}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                location.reload();
+            } else {
+                alert('Error resolving alert');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error resolving alert');
+        });
+    }
+}
+
+function viewTransaction(transactionId) {
+    alert(`Viewing transaction #${transactionId} - Feature coming soon!`);
+}
+
+function refreshAlerts() {
+    location.reload();
+}
+
+function exportAlerts() {
+    alert('Export feature coming soon!');
+}
+
+function initializeCharts() {
+    // Severity Distribution Chart
+    const severityCtx = document.getElementById('severityChart').getContext('2d');
+    new Chart(severityCtx, {
+        type: 'doughnut',
+        data: {
+            labels: ['Low', 'Medium', 'High', 'Critical'],
+            datasets: [{
+                data: [
+                    ALERTS_CONFIG.severity.low,
+                    ALERTS_CONFIG.severity.medium,
+                    ALERTS_CONFIG.severity.high,
+                    ALERTS_CONFIG.severity.critical
+                ],
+                backgroundColor: [
+                    '#28a745',
+                    '#17a2b8',
+                    '#ffc107',
+                    '#dc3545'
+                ]
+            }]
+        },
+        options: {
+            responsive: true,
+            plugins: {
+                legend: {
+                    position: 'bottom'
+                }
+            }
+        }
+    });
+
+    // Timeline Chart
+    const timelineCtx = document.getElementById('timelineChart').getContext('2d');
+    new Chart(timelineCtx, {
+        type: 'line',
+        data: {
+            labels: ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+            datasets: [{
+                label: 'Alerts',
+                data: [3, 7, 5, 12, 8, 4, 6],
+                borderColor: '#3498db',
+                backgroundColor: 'rgba(52, 152, 219, 0.1)',
+                tension: 0.4
+            }]
+        },
+        options: {
+            responsive: true,
+            scales: {
+                y: {
+                    beginAtZero: true
+                }
+            }
+        }
+    });
+}
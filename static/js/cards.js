@@ -0,0 +1,60 @@
+function flipCard(cardId) {
+    document.getElementById(`cardInner${cardId}`).classList.toggle("flipped");
+}
+
+function filterCards() {
+    const filter = document.getElementById('cardFilter').value;
+    const cards = document.querySelectorAll('.card-item');
+    cards.forEach(card => {
+        card.style.display = !filter || card.dataset.accountType === filter ? "block" : "none";
+    });
+}
+
+document.getElementById('accountSelect')?.addEventListener('change', function() {
+    let type = this.selectedOptions[0].dataset.type;
+    let balance = parseFloat(this.selectedOptions[0].dataset.balance).toFixed(2);
+    document.getElementById('accountInfo').innerText = `Account Type: ${type}, Balance: $${balance}`;
+});
+
+async function toggleCard(cardId) {
+    const url = `/toggle_card_view/${cardId}`;
+    try {
+        const res = await fetch(url, {
+            method: "POST",
+            headers: { "X-Requested-With": "XMLHttpRequest", "Content-Type": "application/json" }
+        });
+        const data = await res.json();
+        if (!data.success) {
+            alert(data.error || "Error toggling card.");
+            return;
+        }
+        location.reload();
+    } catch (error) {
+        console.error(error);
+    }
+}
+
+async function deleteCard(cardId) {
+    if (confirm("Are you sure you want to delete this card?")) {
+        try {
+            const res = await fetch(`/card/delete/${cardId}`, {
+                method: "POST",
+                headers: {
+                    "X-Requested-With": "XMLHttpRequest",
+                    "Content-Type": "application/json"
+                }
+            });
+            const data = await res.json();
+            if (data.success) {
+                // Remove card from DOM without full reload
+                const cardElement = document.getElementById(`card${cardId}`);
+                if (cardElement) cardElement.closest(".card-item").remove();
+            } else {
+                alert(data.error || "Error deleting card.");
+            }
+        } catch (error) {
+            console.error(error);
+            alert("Error deleting card.");
+        }
+    }
+}
@@ -0,0 +1,20 @@
+function loadTransactions() {
+    document.getElementById('transactions-loader').style.display = 'block';
+    fetch('/api/transactions')
+        .then(r => r.json())
+        .then(data => { console.log(data); document.getElementById('transactions-loader').style.display = 'none'; })
+        .catch(err => { console.error(err); document.getElementById('transactions-loader').style.display = 'none'; });
+}
+function showAnalytics() { alert('Analytics coming soon!'); }
+function showSecurity() { alert('Security coming soon!'); }
+
+document.getElementById("toggleCardsBtn").addEventListener("click", function () {
+  const container = document.getElementById("cardsContainer");
+  if (container.style.display === "none") {
+    container.style.display = "flex"; // Show cards
+    this.textContent = "Hide Cards";
+  } else {
+    container.style.display = "none"; // Hide cards
+    this.textContent = "Show Cards";
+  }
+});
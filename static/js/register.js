@@ -0,0 +1,16 @@
+const modal = document.getElementById("termsModal");
+const openBtn = document.getElementById("openTerms");
+const closeBtn = document.getElementById("modalClose");
+
+openBtn.addEventListener("click", e => {
+    e.preventDefault();
+    modal.style.display = "flex";
+});
+closeBtn.addEventListener("click", () => modal.style.display = "none");
+window.addEventListener("click", e => { if (e.target === modal) modal.style.display = "none"; });
+
+const termsCheck = document.getElementById("terms");
+const registerBtn = document.getElementById("registerBtn");
+termsCheck.addEventListener("change", () => {
+    registerBtn.disabled = !termsCheck.checked;
+});
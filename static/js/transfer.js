@@ -0,0 +1,41 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('transferForm');
+    const amountInput = document.getElementById('amount');
+    const fraudPreview = document.getElementById('fraudPreview');
+
+    amountInput.addEventListener('input', function() {
+        const amount = parseFloat(this.value);
+        if (amount > 0) showFraudPreview(amount);
+        else fraudPreview.style.display = 'none';
+    });
+
+    form.addEventListener('submit', function(e) {
+        const amount = parseFloat(amountInput.value);
+        const fromAccount = document.getElementById('from_account').value;
+        if (!fromAccount) { e.preventDefault(); alert('Please select a source account'); return; }
+        if (amount < 1) { e.preventDefault(); alert('Minimum transfer amount is $1.00'); return; }
+        if (amount > 1000 && !confirm(`Are you sure you want to transfer $${amount.toFixed(2)}? This is a large amount.`)) {
+            e.preventDefault(); return;
+        }
+    });
+});
+
+function showFraudPreview(amount) {
+    const fraudPreview = document.getElementById('fraudPreview');
+    const riskLevel = document.getElementById('riskLevel');
+    const fraudScore = document.getElementById('fraudScore');
+    const riskFactors = document.getElementById('riskFactors');
+
+    let risk='low', score=Math.random()*0.3, factors=[];
+    if(amount>1000){risk='medium'; score=0.3+Math.random()*0.4; factors.push('High transaction amount');}
+    if(amount>5000){risk='high'; score=0.7+Math.random()*0.3; factors.push('Very high transaction amount');}
+    if(Math.random()>0.7) {factors.push('Unusual transaction time'); score+=0.1;}
+    if(Math.random()>0.8) {factors.push('New recipient account'); score+=0.15;}
+
+    riskLevel.className=`fraud-score ${risk}`;
+    riskLevel.textContent=risk.toUpperCase();
+    fraudScore.textContent=`${(score*100).toFixed(1)}%`;
+    riskFactors.innerHTML = factors.length>0? factors.map(f=> `<li><i class="fas fa-exclamation-circle text-warning me-2"></i>${f}</li>`).join('') 
+                                          : '<li><i class="fas fa-check-circle text-success me-2"></i>No risk factors detected</li>';
+    fraudPreview.style.display='block';
+}
@@ -0,0 +1,18 @@
+document.addEventListener("DOMContentLoaded", function () {
+    const amountDisplay = document.getElementById("amount_display");
+    const amountHidden = document.getElementById("amount");
+
+    amountDisplay.addEventListener("input", function () {
+        let value = this.value.replace(/[^0-9.]/g, ""); // keep only numbers and dot
+        if (!value) {
+            amountHidden.value = "";
+            this.value = "";
+            return;
+        }
+
+        let parts = value.split(".");
+        parts[0] = parts[0].replace(/\B(?=(\d{3})+(?!\d))/g, ","); // comma formatting
+        this.value = parts.join(".");
+        amountHidden.value = value; // raw numeric value for backend
+    });
+});
@@ -0,0 +1,442 @@
+import csv
+import io
+import multiprocessing
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+
+# Column order of every generated row; tables are written with raw bulk
+# statements, so these must match the models in app.py
+TABLES = {
+    'user': ('id', 'username', 'email', 'password_hash', 'first_name', 'last_name', 'phone',
+             'is_admin', 'created_at'),
+    'account': ('id', 'account_number', 'account_type', 'balance', 'user_id', 'created_at'),
+    'card': ('id', 'card_number', 'expiry_date', 'cvv', 'user_id', 'account_id', 'created_at', 'blocked'),
+    'upi': ('upi_id', 'user_id', 'created_at'),
+    'subscription': ('id', 'name', 'amount', 'billing_cycle', 'user_id', 'account_id', 'card_id',
+                     'created_at', 'status', 'next_billing_date', 'last_billed_at'),
+    'transaction': ('id', 'transaction_type', 'amount', 'description', 'account_id',
+                    'recipient_account_id', 'subscription_id', 'related_transaction_id', 'timestamp',
+                    'is_fraudulent', 'fraud_score', 'location', 'ip_address'),
+    'fraud_alert': ('transaction_id', 'alert_type', 'severity', 'description', 'is_resolved',
+                    'created_at', 'resolved_at'),
+}
+# Tables whose ids are assigned here (others take the database default)
+EXPLICIT_IDS = ('user', 'account', 'card', 'subscription', 'transaction')
+
+FIRST_NAMES = np.array(['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+                        'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+                        'Aarav', 'Priya', 'Wei', 'Mei', 'Carlos', 'Sofia', 'Ahmed', 'Fatima'])
+LAST_NAMES = np.array(['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+                       'Rodriguez', 'Martinez', 'Sharma', 'Patel', 'Wang', 'Li', 'Kim', 'Nguyen',
+                       'Silva', 'Santos', 'Khan', 'Ali', 'Muller', 'Rossi', 'Dubois', 'Tanaka'])
+CITIES = np.array(['New York', 'London', 'Mumbai', 'Singapore', 'Toronto', 'Sydney', 'Berlin', 'Paris',
+                   'Tokyo', 'Dubai', 'Sao Paulo', 'Lagos', 'Chicago', 'Madrid', 'Seoul', 'Mexico City'])
+MERCHANTS = np.array(['Grocery store', 'Fuel station', 'Restaurant', 'Online shopping', 'Pharmacy',
+                      'Electronics', 'Travel booking', 'Utility bill', 'Rent', 'Salary', 'Refund',
+                      'ATM cash', 'Coffee shop', 'Bookstore', 'Gym membership', 'Insurance'])
+SUBSCRIPTIONS = np.array(['Netflix', 'Spotify', 'Amazon Prime', 'YouTube Premium', 'Disney+',
+                          'iCloud', 'Gym', 'News', 'Cloud Storage', 'Music Plus'])
+
+CARD_RATE = 0.7
+FRAUD_RATE = 0.01
+FRAUD_THRESHOLD = 0.7
+SECOND = np.timedelta64(1, 's')
+BILLING_PERIOD = np.timedelta64(30, 'D')
+
+
+@dataclass
+class GenerationSpec:
+    users: int
+    chunk_users: int = 5000
+    transactions_per_account: float = 20.0
+    transfers_per_user: float = 2.0
+    days: int = 365
+    seed: int = 42
+    now: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def chunks(self):
+        return -(-self.users // self.chunk_users)
+
+    def chunk_size(self, chunk):
+        return min(self.chunk_users, self.users - chunk * self.chunk_users)
+
+
+@dataclass
+class GenerationResult:
+    rows: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    def add(self, counts):
+        for table, count in counts.items():
+            self.rows[table] = self.rows.get(table, 0) + count
+        return self
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    @property
+    def rows_per_second(self):
+        return self.total_rows / self.seconds if self.seconds else 0.0
+
+
+class Throttle:
+    """Sleeps just enough to hold a stream of writes at ``rate`` rows per second"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.rows = 0
+
+    def wait(self, rows):
+        self.rows += rows
+        if self.rate:
+            ahead = self.rows / self.rate - (time.monotonic() - self.started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def _rng(spec, chunk):
+    return np.random.default_rng([spec.seed, chunk])
+
+
+def _sample_counts(rng, spec, n_users):
+    """First draws of a chunk's generator; enough to size every id range.
+
+    The parent replays them with the same seed to hand out contiguous id
+    blocks, so workers never coordinate and ids have no gaps.
+    """
+    n_accounts = 2 * n_users
+    has_card = rng.random(n_accounts) < CARD_RATE
+    subscriptions_per_user = rng.integers(0, 3, n_users)
+    charges = rng.integers(0, 7, int(subscriptions_per_user.sum()))
+    transactions_per_account = rng.poisson(spec.transactions_per_account, n_accounts)
+    n_transfers = int(round(n_users * spec.transfers_per_user)) if n_users > 1 else 0
+    return {
+        'has_card': has_card,
+        'subscriptions_per_user': subscriptions_per_user,
+        'charges': charges,
+        'transactions_per_account': transactions_per_account,
+        'n_transfers': n_transfers,
+        'card': int(has_card.sum()),
+        'subscription': len(charges),
+        'transaction': n_accounts + int(transactions_per_account.sum()) + int(charges.sum()) + 2 * n_transfers,
+    }
+
+
+def plan_chunks(spec, first_ids):
+    """Give every chunk its seed and the first id of each table it writes"""
+    plans = []
+    next_ids = dict(first_ids)
+    for chunk in range(spec.chunks):
+        n_users = spec.chunk_size(chunk)
+        counts = _sample_counts(_rng(spec, chunk), spec, n_users)
+        plans.append((chunk, dict(next_ids)))
+        next_ids['user'] += n_users
+        next_ids['account'] += 2 * n_users
+        for table in ('card', 'subscription', 'transaction'):
+            next_ids[table] += counts[table]
+    return plans
+
+
+def _timestamps(values):
+    # The text SQLAlchemy itself stores for DateTime on SQLite; PostgreSQL parses it too
+    return np.char.replace(np.datetime_as_string(values, unit='us'), 'T', ' ').tolist()
+
+
+def _nullable(values, mask):
+    return [value if keep else None for value, keep in zip(values, mask)]
+
+
+def generate_chunk(spec, chunk, ids, password_hash):
+    """Rows for one chunk of users and everything they own, keyed by table"""
+    rng = _rng(spec, chunk)
+    n_users = spec.chunk_size(chunk)
+    counts = _sample_counts(rng, spec, n_users)
+    now = np.datetime64(spec.now, 'us')
+
+    # ---- users and accounts ----
+    user_ids = np.arange(ids['user'], ids['user'] + n_users)
+    user_created = now - rng.integers(spec.days * 86400, (spec.days + 730) * 86400, n_users) * SECOND
+    usernames = [f"user{i}" for i in user_ids.tolist()]
+    users = list(zip(
+        user_ids.tolist(), usernames, [f"{name}@example.com" for name in usernames],
+        [password_hash] * n_users,
+        rng.choice(FIRST_NAMES, n_users).tolist(), rng.choice(LAST_NAMES, n_users).tolist(),
+        [f"555-{n:07d}" for n in rng.integers(0, 10 ** 7, n_users).tolist()],
+        [0] * n_users, _timestamps(user_created),
+    ))
+
+    n_accounts = 2 * n_users
+    account_ids = np.arange(ids['account'], ids['account'] + n_accounts)
+    account_user = np.repeat(user_ids, 2)
+    account_owner_index = np.repeat(np.arange(n_users), 2)
+    account_created = user_created[account_owner_index] + rng.integers(0, 86400, n_accounts) * SECOND
+    account_numbers = np.array([f"ACC{i:012d}" for i in account_ids.tolist()])
+
+    # ---- cards ----
+    has_card = counts['has_card']
+    n_cards = counts['card']
+    card_ids = np.arange(ids['card'], ids['card'] + n_cards)
+    cards = list(zip(
+        card_ids.tolist(), [f"9{i:015d}" for i in card_ids.tolist()],
+        [f"{m:02d}/{y}" for m, y in zip(rng.integers(1, 13, n_cards).tolist(),
+                                         rng.integers(27, 32, n_cards).tolist())],
+        [f"{n:03d}" for n in rng.integers(100, 1000, n_cards).tolist()],
+        account_user[has_card].tolist(), account_ids[has_card].tolist(),
+        _timestamps(account_created[has_card] + rng.integers(0, 30 * 86400, n_cards) * SECOND),
+        (rng.random(n_cards) < 0.02).astype(int).tolist(),
+    ))
+
+    # ---- UPI ids ----
+    upis_per_user = rng.integers(0, 3, n_users)
+    upi_owner_index = np.repeat(np.arange(n_users), upis_per_user)
+    upi_ordinal = np.arange(len(upi_owner_index)) - np.repeat(np.cumsum(upis_per_user) - upis_per_user, upis_per_user)
+    upis = list(zip(
+        [f"user{u}.{k}@upi" for u, k in zip(user_ids[upi_owner_index].tolist(), upi_ordinal.tolist())],
+        user_ids[upi_owner_index].tolist(),
+        _timestamps(user_created[upi_owner_index] + rng.integers(0, 86400, len(upi_owner_index)) * SECOND),
+    ))
+
+    # ---- subscriptions ----
+    n_subscriptions = counts['subscription']
+    charges = counts['charges']
+    subscription_ids = np.arange(ids['subscription'], ids['subscription'] + n_subscriptions)
+    subscription_owner_index = np.repeat(np.arange(n_users), counts['subscriptions_per_user'])
+    subscription_account_index = 2 * subscription_owner_index + rng.integers(0, 2, n_subscriptions)
+    subscription_names = rng.choice(SUBSCRIPTIONS, n_subscriptions)
+    subscription_amounts = np.round(rng.uniform(5, 50, n_subscriptions), 2)
+    # Billed ``charges`` times so far, once per period, with the next charge still ahead
+    subscription_created = now - (charges + 1) * BILLING_PERIOD + rng.integers(1, 29 * 86400, n_subscriptions) * SECOND
+    subscriptions = list(zip(
+        subscription_ids.tolist(), subscription_names.tolist(), subscription_amounts.tolist(),
+        ['monthly'] * n_subscriptions, user_ids[subscription_owner_index].tolist(),
+        account_ids[subscription_account_index].tolist(), [None] * n_subscriptions,
+        _timestamps(subscription_created), ['active'] * n_subscriptions,
+        _timestamps(subscription_created + (charges + 1) * BILLING_PERIOD),
+        _nullable(_timestamps(subscription_created + charges * BILLING_PERIOD), charges > 0),
+    ))
+
+    # ---- transactions: card/cash activity, subscription charges, transfers ----
+    activity_account = np.repeat(np.arange(n_accounts), counts['transactions_per_account'])
+    n_activity = len(activity_account)
+    is_deposit = rng.random(n_activity) < 0.45
+    activity_amount = np.round(rng.lognormal(3.5, 1.1, n_activity), 2)
+    activity_amount = np.where(is_deposit, activity_amount, -activity_amount)
+    account_age = ((now - account_created) / SECOND).astype(np.int64)
+    activity_time = account_created[activity_account] + \
+        (rng.random(n_activity) * account_age[activity_account]).astype(np.int64) * SECOND
+    merchants = rng.choice(MERCHANTS, n_activity).tolist()
+    activity_description = [f"Deposit: {m}" if d else f"Withdrawal: {m}"
+                            for m, d in zip(merchants, is_deposit.tolist())]
+
+    charge_subscription = np.repeat(np.arange(n_subscriptions), charges)
+    charge_ordinal = np.arange(len(charge_subscription)) - np.repeat(np.cumsum(charges) - charges, charges)
+    charge_account = subscription_account_index[charge_subscription]
+    charge_amount = -subscription_amounts[charge_subscription]
+    charge_time = subscription_created[charge_subscription] + (charge_ordinal + 1) * BILLING_PERIOD
+
+    n_transfers = counts['n_transfers']
+    sender_user = rng.integers(0, n_users, n_transfers) if n_transfers else np.zeros(0, dtype=np.int64)
+    # Any other user in the chunk
+    receiver_user = (sender_user + rng.integers(1, max(n_users, 2), n_transfers)) % max(n_users, 1)
+    sender = 2 * sender_user + rng.integers(0, 2, n_transfers)
+    receiver = 2 * receiver_user + rng.integers(0, 2, n_transfers)
+    transfer_amount = np.round(rng.lognormal(4.0, 1.0, n_transfers), 2)
+    latest_created = np.maximum(account_created[sender], account_created[receiver])
+    transfer_time = latest_created + \
+        (rng.random(n_transfers) * ((now - latest_created) / SECOND)).astype(np.int64) * SECOND
+
+    # Opening deposits make each account's balance equal the sum of its ledger and never negative
+    movements = np.bincount(activity_account, weights=activity_amount, minlength=n_accounts) \
+        + np.bincount(charge_account, weights=charge_amount, minlength=n_accounts) \
+        - np.bincount(sender, weights=transfer_amount, minlength=n_accounts) \
+        + np.bincount(receiver, weights=transfer_amount, minlength=n_accounts)
+    opening = np.round(np.maximum(0.0, -movements) + rng.uniform(100, 5000, n_accounts), 2)
+    balances = np.round(opening + movements, 2)
+    accounts = list(zip(
+        account_ids.tolist(), account_numbers.tolist(), ['savings', 'checking'] * n_users,
+        balances.tolist(), account_user.tolist(), _timestamps(account_created),
+    ))
+
+    first_transfer = ids['transaction'] + n_accounts + n_activity + len(charge_account)
+    debit_ids = first_transfer + 2 * np.arange(n_transfers)
+    credit_ids = debit_ids + 1
+    # Debit and credit rows interleave so each pair has adjacent ids
+    transfer_account = np.column_stack([sender, receiver]).ravel()
+    transfer_counterpart = np.column_stack([receiver, sender]).ravel()
+    transfer_related = np.column_stack([credit_ids, debit_ids]).ravel()
+    transfer_amounts = np.column_stack([-transfer_amount, transfer_amount]).ravel()
+    transfer_times = np.repeat(transfer_time, 2)
+    transfer_description = [
+        f"Transfer to {account_numbers[c]}" if k % 2 == 0 else f"Transfer from {account_numbers[c]}"
+        for k, c in enumerate(transfer_counterpart.tolist())
+    ]
+
+    account_index = np.concatenate([np.arange(n_accounts), activity_account, charge_account, transfer_account])
+    n_transactions = len(account_index)
+    assert n_transactions == counts['transaction']
+    transaction_ids = np.arange(ids['transaction'], ids['transaction'] + n_transactions)
+    timestamps = np.concatenate([account_created, activity_time, charge_time, transfer_times])
+    amounts = np.concatenate([opening, activity_amount, charge_amount, transfer_amounts])
+    types = ['deposit'] * n_accounts \
+        + np.where(is_deposit, 'deposit', 'withdrawal').tolist() \
+        + ['subscription'] * len(charge_account) + ['transfer'] * len(transfer_account)
+    descriptions = ['Opening deposit'] * n_accounts + activity_description \
+        + [f"Subscription payment: {name}" for name in subscription_names[charge_subscription].tolist()] \
+        + transfer_description
+    recipients = [None] * (n_accounts + n_activity + len(charge_account)) \
+        + account_ids[transfer_counterpart].tolist()
+    subscription_refs = [None] * (n_accounts + n_activity) + subscription_ids[charge_subscription].tolist() \
+        + [None] * len(transfer_account)
+    related = [None] * (n_accounts + n_activity + len(charge_account)) + transfer_related.tolist()
+
+    flagged = rng.random(n_transactions) < FRAUD_RATE
+    flagged[:n_accounts] = False
+    scores = np.where(flagged, rng.uniform(FRAUD_THRESHOLD, 1.0, n_transactions),
+                      rng.beta(2, 10, n_transactions) * FRAUD_THRESHOLD)
+    scores[:n_accounts] = 0.0
+    scores = np.round(scores, 4)
+    octets = rng.integers(1, 255, (n_transactions, 4)).tolist()
+    transactions = list(zip(
+        transaction_ids.tolist(), types, np.round(amounts, 2).tolist(), descriptions,
+        account_ids[account_index].tolist(), recipients, subscription_refs, related,
+        _timestamps(timestamps), flagged.astype(int).tolist(), scores.tolist(),
+        rng.choice(CITIES, n_transactions).tolist(), ['.'.join(map(str, o)) for o in octets],
+    ))
+
+    # ---- alerts for flagged transactions; older ones are mostly resolved ----
+    flagged_index = np.flatnonzero(flagged)
+    alert_created = timestamps[flagged_index]
+    resolved = (rng.random(len(flagged_index)) < 0.6) & (alert_created < now - np.timedelta64(2, 'D'))
+    alert_resolved_at = alert_created + rng.integers(600, 2 * 86400, len(flagged_index)) * SECOND
+    alerts = list(zip(
+        transaction_ids[flagged_index].tolist(), ['High Fraud Score'] * len(flagged_index),
+        np.where(scores[flagged_index] >= 0.9, 'high', 'medium').tolist(),
+        [f"Transaction flagged with fraud score: {s:.3f}" for s in scores[flagged_index].tolist()],
+        resolved.astype(int).tolist(), _timestamps(alert_created),
+        _nullable(_timestamps(alert_resolved_at), resolved),
+    ))
+
+    return {'user': users, 'account': accounts, 'card': cards, 'upi': upis,
+            'subscription': subscriptions, 'transaction': transactions, 'fraud_alert': alerts}
+
+
+def load_rows(connection, table, rows, batch_size=50000):
+    """Bulk load ``rows`` (tuples in ``TABLES[table]`` order) on ``connection``.
+
+    PostgreSQL gets ``COPY ... FROM STDIN``; other databases a DBAPI
+    ``executemany`` of one prepared INSERT per batch.
+    """
+    if not rows:
+        return
+    columns = TABLES[table]
+    column_list = ', '.join(f'"{name}"' for name in columns)
+    dialect = connection.dialect
+    if dialect.name == 'postgresql':
+        buffer = io.StringIO()
+        # Empty unquoted CSV fields load as NULL
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert(f'COPY "{table}" ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+        return
+    placeholder = '?' if dialect.paramstyle == 'qmark' else '%s'
+    sql = f'INSERT INTO "{table}" ({column_list}) VALUES ({", ".join([placeholder] * len(columns))})'
+    for start in range(0, len(rows), batch_size):
+        connection.exec_driver_sql(sql, rows[start:start + batch_size])
+
+
+class SyntheticDataGenerator:
+    """Generates internally consistent banking data at load-testing scale.
+
+    Users are split into chunks. Each chunk's users, accounts, cards, UPI
+    ids, subscriptions (with their past charges), transfers between its
+    users and fraud alerts are drawn with vectorized numpy sampling from a
+    per-chunk seed, so output is reproducible and chunks are independent.
+    Worker processes generate chunks; on PostgreSQL each worker also loads
+    its chunks with COPY, elsewhere (SQLite allows one writer) the parent
+    loads them with executemany. Account balances equal the sum of their
+    transactions. Loading can be held to a target rate in rows per second.
+    """
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+
+    def generate(self, spec, processes=1, rate=0, password_hash='', progress=None):
+        started = time.monotonic()
+        plans = plan_chunks(spec, self._first_ids())
+        parallel_load = self.db.engine.dialect.name == 'postgresql'
+        result = GenerationResult()
+        throttle = Throttle(rate)
+        jobs = [(spec, chunk, ids, password_hash, rate / max(processes, 1), parallel_load)
+                for chunk, ids in plans]
+
+        global _generator
+        _generator = self
+        if processes > 1:
+            # Children must not share the parent's pooled connections
+            self.db.engine.dispose()
+            ctx = multiprocessing.get_context('fork')
+            with ctx.Pool(processes) as pool:
+                for output in pool.imap(_run_chunk, jobs):
+                    self._collect(output, parallel_load, throttle, result, progress)
+        else:
+            for job in jobs:
+                self._collect(_run_chunk(job), parallel_load, throttle, result, progress)
+
+        self._reset_sequences()
+        result.seconds = time.monotonic() - started
+        return result
+
+    def _collect(self, output, loaded, throttle, result, progress):
+        if loaded:
+            counts = output
+        else:
+            counts = self.load(output, throttle)
+        result.add(counts)
+        if progress:
+            progress(result)
+
+    def load(self, tables, throttle=None):
+        """Insert one generated chunk in a single database transaction"""
+        with self.db.engine.begin() as connection:
+            # Parents before children so foreign keys hold at every point
+            for table in TABLES:
+                load_rows(connection, table, tables[table])
+                if throttle is not None:
+                    throttle.wait(len(tables[table]))
+        return {table: len(rows) for table, rows in tables.items()}
+
+    def _first_ids(self):
+        with self.db.engine.connect() as connection:
+            return {table: connection.exec_driver_sql(f'SELECT COALESCE(MAX(id), 0) FROM "{table}"').scalar() + 1
+                    for table in EXPLICIT_IDS}
+
+    def _reset_sequences(self):
+        if self.db.engine.dialect.name != 'postgresql':
+            return
+        with self.db.engine.begin() as connection:
+            for table in EXPLICIT_IDS:
+                connection.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+                )
+
+
+_generator = None
+
+
+def _run_chunk(args):
+    spec, chunk, ids, password_hash, rate, load = args
+    tables = generate_chunk(spec, chunk, ids, password_hash)
+    if not load:
+        return tables
+    generator = _generator
+    with generator.app.app_context():
+        return generator.load(tables, Throttle(rate))
@@ -0,0 +1,158 @@
+import threading
+import time
+
+from flask import before_render_template, template_rendered
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class RenderMetrics:
+    """Thread-safe render counters per template and per cached fragment"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.templates = {}
+            self.fragments = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stats = self.templates.setdefault(name, {'renders': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['renders'] += 1
+            stats['total_ms'] += seconds * 1000
+            stats['max_ms'] = max(stats['max_ms'], seconds * 1000)
+
+    def fragment(self, name, hit, seconds=0.0):
+        with self._lock:
+            stats = self.fragments.setdefault(name, {'hits': 0, 'misses': 0, 'render_ms': 0.0})
+            stats['hits' if hit else 'misses'] += 1
+            stats['render_ms'] += seconds * 1000
+
+    def snapshot(self):
+        with self._lock:
+            templates = {
+                name: {
+                    'renders': s['renders'],
+                    'avg_ms': round(s['total_ms'] / s['renders'], 3),
+                    'max_ms': round(s['max_ms'], 3),
+                    'total_ms': round(s['total_ms'], 3),
+                } for name, s in self.templates.items()
+            }
+            fragments = {}
+            for name, s in self.fragments.items():
+                lookups = s['hits'] + s['misses']
+                fragments[name] = {
+                    'hits': s['hits'],
+                    'misses': s['misses'],
+                    'hit_ratio': round(s['hits'] / lookups, 4) if lookups else 0.0,
+                    'avg_miss_render_ms': round(s['render_ms'] / s['misses'], 3) if s['misses'] else 0.0,
+                }
+            return {'templates': templates, 'fragments': fragments}
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache 'name'[, scope, ...] %}...{% endcache %}``
+
+    Caches the rendered body under the data versions of ``scope``
+    (``user:5``, ``account:7``, ...), or of the signed-in user when no
+    scope is given. Any write to that data moves the version, so a stale
+    fragment is never looked up again and simply ages out. Only views that
+    render from the database (``DataVersions.conditional``) use the cache;
+    elsewhere the body is rendered every time.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        scopes = []
+        while parser.stream.skip_if('comma'):
+            scopes.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render', [name, nodes.List(scopes)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, name, scopes, caller):
+        fragment_cache = getattr(self.environment, 'fragment_cache', None)
+        if fragment_cache is None:
+            return caller()
+        return fragment_cache.render(name, scopes, caller)
+
+
+class TemplateCaching:
+    """Bytecode cache, fragment cache and render timing for the app's templates.
+
+    Compiled templates are kept on disk by Jinja's bytecode cache, so a
+    restarted worker skips parsing and compiling. Fragments are stored as
+    rendered HTML in a cache backend (see ``cache.create_backend``) under
+    keys built from the current data versions, which ``versions``
+    (a ``DataVersions``) reads once per request.
+    """
+
+    def __init__(self, app, backend, versions, scope, ttl=300, bytecode_dir=''):
+        self.backend = backend
+        self.versions = versions
+        self.scope = scope
+        self.ttl = ttl
+        self.salt = versions.salt
+        self.metrics = RenderMetrics()
+        self._local = threading.local()
+
+        if bytecode_dir != 'none':
+            # None lets Jinja pick a private per-user directory under the temp dir
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_dir or None)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+        before_render_template.connect(self._render_started, app, weak=False)
+        template_rendered.connect(self._render_finished, app, weak=False)
+
+    # ---- render timing ----
+
+    def _render_started(self, sender, template, context, **extra):
+        self._starts().append(time.perf_counter())
+
+    def _render_finished(self, sender, template, context, **extra):
+        starts = self._starts()
+        if starts:
+            self.metrics.observe(template.name, time.perf_counter() - starts.pop())
+
+    def _starts(self):
+        if not hasattr(self._local, 'starts'):
+            self._local.starts = []
+        return self._local.starts
+
+    # ---- fragments ----
+
+    def render(self, name, scopes, caller):
+        # A body built from a worker's query cache may predate the versions
+        # in the key, and every worker sharing the store would then serve it
+        if not self.versions.db.session.info.get('fresh_reads'):
+            return caller()
+        scopes = list(scopes) or self.scope()
+        if not scopes:
+            return caller()
+        versions = self.versions.get(*scopes)
+        key = 'fragment:{}:{}:{}'.format(
+            self.salt, name, ','.join(f"{scope}={versions[scope]}" for scope in scopes)
+        )
+        html = self.backend.get(key)
+        if html is not None:
+            self.metrics.fragment(name, hit=True)
+            return Markup(html)
+        started = time.perf_counter()
+        html = caller()
+        self.metrics.fragment(name, hit=False, seconds=time.perf_counter() - started)
+        self.backend.set(key, str(html), ttl=self.ttl)
+        return html
+
+    def precompile(self, environment):
+        """Compile every template into the bytecode cache; returns the count"""
+        names = environment.list_templates(filter_func=lambda name: name.endswith('.html'))
+        for name in names:
+            environment.get_template(name)
+        return len(names)
@@ -0,0 +1,292 @@
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import and_, delete, exists, or_, select
+from sqlalchemy.orm import aliased
+
+from transaction_partitions import add_months
+
+_MONTH_DIR = re.compile(r'^month=(\d{4}-\d{2})$')
+
+
+def _arrow_type(column):
+    import pyarrow as pa
+    return {
+        int: pa.int64(), float: pa.float64(), str: pa.string(), bool: pa.bool_(), datetime: pa.timestamp('us'),
+    }[column.type.python_type]
+
+
+def _month(value):
+    return value.strftime('%Y-%m')
+
+
+def _chunks(values, size=1000):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class TransactionArchive:
+    """Cold storage for old transactions and resolved fraud alerts.
+
+    ``archive(cutoff)`` moves rows older than ``cutoff`` out of the
+    database into zstd-compressed Parquet files, one directory per month
+    (``<directory>/transactions/month=2024-01/part-*.parquet``), each file
+    sorted by account and time. Reads go through pyarrow datasets: a time
+    range only opens the month directories it covers, and filters on
+    account, amount, type or IP skip row groups by their min/max
+    statistics, so an old statement reads a few row groups instead of
+    rehydrating rows. Transactions that still have a fraud alert, or are
+    referenced by a transaction that stays, are kept in the database.
+
+    Needs pyarrow, which is only imported once something is archived.
+    """
+
+    def __init__(self, db, directory, Transaction, FraudAlert, Account, User, row_group_size=65536, versions=None):
+        self.db = db
+        self.directory = directory
+        self.Transaction = Transaction
+        self.FraudAlert = FraudAlert
+        self.Account = Account
+        self.User = User
+        self.row_group_size = row_group_size
+        self.versions = versions
+        self._datasets = {}
+        self._time_columns = {'transactions': 'timestamp', 'fraud_alerts': 'created_at'}
+        self._tables = {'transactions': Transaction.__table__, 'fraud_alerts': FraudAlert.__table__}
+
+    # ---- what is archived ----
+
+    def months(self, kind='transactions'):
+        try:
+            names = os.listdir(os.path.join(self.directory, kind))
+        except FileNotFoundError:
+            return []
+        return sorted(match.group(1) for match in map(_MONTH_DIR.match, names) if match)
+
+    def live_since(self, kinds=('transactions', 'fraud_alerts')):
+        """First day after the newest archived month of ``kinds``, or None when nothing is archived.
+
+        Earlier rows are partly in the archive, so aggregates rebuilt from
+        the database must not reach back past it.
+        """
+        newest = max((months[-1] for months in map(self.months, kinds) if months), default=None)
+        if newest is None:
+            return None
+        return add_months(datetime.strptime(newest, '%Y-%m').date(), 1)
+
+    def covers(self, start=None, end=None, kind='transactions'):
+        """Whether any archived month overlaps ``[start, end)``"""
+        return any(
+            (start is None or month >= _month(start)) and (end is None or datetime.strptime(month, '%Y-%m') < end)
+            for month in self.months(kind)
+        )
+
+    # ---- archiving ----
+
+    def archive(self, cutoff, batch_size=10000, progress=None):
+        """Move resolved alerts, then transactions, older than ``cutoff`` to the archive.
+
+        Each batch is written and synced to disk before its rows are
+        deleted and committed, and rows already in the archive are not
+        written twice, so an interrupted run can simply be repeated. The
+        deletes skip the ORM, so each batch bumps the data versions of the
+        accounts it touched itself. Returns the number of rows archived per
+        kind.
+        """
+        A = self.FraudAlert
+        archived = {'fraud_alerts': self._archive(
+            'fraud_alerts', and_(A.is_resolved.is_(True), A.created_at < cutoff), batch_size, progress
+        )}
+        archived['transactions'] = self._archive('transactions', self._archivable(cutoff), batch_size, progress)
+        return archived
+
+    def _archivable(self, cutoff):
+        T, A = self.Transaction, self.FraudAlert
+        referrer = aliased(T)
+        return and_(
+            T.timestamp < cutoff,
+            ~exists().where(A.transaction_id == T.id),
+            ~exists().where(referrer.related_transaction_id == T.id, or_(
+                referrer.timestamp >= cutoff,
+                referrer.timestamp.is_(None),
+                exists().where(A.transaction_id == referrer.id),
+            )),
+        )
+
+    def _archive(self, kind, condition, batch_size, progress):
+        table = self._tables[kind]
+        session = self.db.session
+        total, last_id = 0, 0
+        while True:
+            rows = session.execute(
+                select(table).where(condition, table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).mappings().all()
+            if not rows:
+                return total
+            last_id = rows[-1]['id']
+            if kind == 'transactions':
+                # Transfer legs point at each other: take both in one batch, so
+                # neither is deleted while the other still references it
+                ids = [row['id'] for row in rows]
+                rows = list(rows) + session.execute(select(table).where(
+                    condition, table.c.related_transaction_id.in_(ids), table.c.id.notin_(ids)
+                )).mappings().all()
+            self._write(kind, rows)
+            if self.versions is not None:
+                self.versions.bump(session, accounts=self._accounts(kind, rows))
+            for chunk in _chunks(row['id'] for row in rows):
+                session.execute(delete(table).where(table.c.id.in_(chunk)))
+            session.commit()
+            total += len(rows)
+            if progress:
+                progress(kind, total)
+
+    def _accounts(self, kind, rows):
+        if kind == 'transactions':
+            return {row['account_id'] for row in rows}
+        # Alerts are archived before their transactions, which are still in the database
+        T = self.Transaction
+        accounts = set()
+        for chunk in _chunks({row['transaction_id'] for row in rows}):
+            accounts.update(self.db.session.execute(select(T.account_id).where(T.id.in_(chunk))).scalars())
+        return accounts
+
+    def _write(self, kind, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = self._tables[kind]
+        schema = pa.schema([(column.name, _arrow_type(column)) for column in table.columns])
+        time_column = self._time_columns[kind]
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(_month(row[time_column]), []).append(row)
+        for month, month_rows in sorted(by_month.items()):
+            done = self._archived_ids(kind, month, [row['id'] for row in month_rows])
+            month_rows = [dict(row) for row in month_rows if row['id'] not in done]
+            if not month_rows:
+                continue
+            data = pa.Table.from_pylist(month_rows, schema=schema)
+            order = [('account_id', 'ascending')] if 'account_id' in schema.names else []
+            data = data.sort_by(order + [(time_column, 'ascending')])
+            month_dir = os.path.join(self.directory, kind, f"month={month}")
+            os.makedirs(month_dir, exist_ok=True)
+            name = f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}.parquet"
+            # Dot-prefixed files are ignored by readers until the rename
+            tmp_path = os.path.join(month_dir, f".{name}.tmp")
+            pq.write_table(data, tmp_path, compression='zstd', row_group_size=self.row_group_size)
+            with open(tmp_path, 'rb') as fh:
+                os.fsync(fh.fileno())
+            os.replace(tmp_path, os.path.join(month_dir, name))
+            dir_fd = os.open(month_dir, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _archived_ids(self, kind, month, ids):
+        import pyarrow.dataset as ds
+
+        month_dir = os.path.join(self.directory, kind, f"month={month}")
+        if not os.path.isdir(month_dir):
+            return set()
+        found = ds.dataset(month_dir, format='parquet').to_table(columns=['id'], filter=ds.field('id').isin(ids))
+        return set(found.column('id').to_pylist())
+
+    # ---- reading ----
+
+    def read(self, kind, filter=None, start=None, end=None, columns=None):
+        """Archived rows in ``[start, end)`` matching a pyarrow ``filter``, as a pyarrow Table (or None)"""
+        if not self.covers(start, end, kind):
+            return None
+        import pyarrow.dataset as ds
+
+        time_column = self._time_columns[kind]
+        expression = filter if filter is not None else ds.scalar(True)
+        # Month bounds prune whole directories; the exact bounds are checked per row group
+        if start is not None:
+            expression &= (ds.field('month') >= _month(start)) & (ds.field(time_column) >= start)
+        if end is not None:
+            expression &= (ds.field('month') <= _month(end)) & (ds.field(time_column) < end)
+        data = self._dataset(kind).to_table(filter=expression, columns=columns)
+        return data.sort_by([(time_column, 'descending'), ('id', 'descending')])
+
+    def _dataset(self, kind):
+        import pyarrow.dataset as ds
+
+        root = os.path.join(self.directory, kind)
+        # Rediscover files only when another archive run has added some
+        stamp = tuple(os.stat(os.path.join(root, f"month={m}")).st_mtime_ns for m in self.months(kind))
+        cached = self._datasets.get(kind)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, ds.dataset(root, format='parquet', partitioning='hive'))
+            self._datasets[kind] = cached
+        return cached[1]
+
+    def statement_rows(self, account_ids=None, start=None, end=None):
+        """Archived transactions of ``account_ids`` (None for all) in ``[start, end)``,
+        newest first, with ``account_number`` and ``username``
+        """
+        if account_ids is not None and not account_ids or not self.covers(start, end):
+            return []
+        import pyarrow.dataset as ds
+
+        expression = ds.field('account_id').isin(list(account_ids)) if account_ids is not None else None
+        data = self.read('transactions', expression, start, end,
+                         columns=[c.name for c in self.Transaction.__table__.columns])
+        return self._with_accounts(data.to_pylist()) if data is not None else []
+
+    def search(self, q=None, account_id=None, min_amount=None, max_amount=None, ip_address=None,
+               transaction_type=None, since=None, until=None, limit=100):
+        """Archived transactions for ``TransactionSearch``, newest first.
+
+        Free text is a case-insensitive substring match of every word; the
+        other filters are pushed down to the Parquet files.
+        """
+        if not self.covers(since, until):
+            return []
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        expression = ds.scalar(True)
+        if account_id is not None:
+            expression &= ds.field('account_id') == account_id
+        if min_amount is not None or max_amount is not None:
+            low = min_amount or 0.0
+            credits, debits = ds.field('amount') >= low, ds.field('amount') <= -low
+            if max_amount is not None:
+                credits &= ds.field('amount') <= max_amount
+                debits &= ds.field('amount') >= -max_amount
+            expression &= credits | debits
+        if ip_address:
+            expression &= ds.field('ip_address') == ip_address
+        if transaction_type:
+            expression &= ds.field('transaction_type') == transaction_type
+        for term in re.findall(r"[\w.@:-]+", q or ''):
+            matches = [pc.match_substring(ds.field(name), term, ignore_case=True)
+                       for name in ('description', 'location', 'ip_address')]
+            expression &= matches[0] | matches[1] | matches[2]
+        data = self.read('transactions', expression, since, until)
+        if data is None:
+            return []
+        return self._with_accounts(data.slice(0, limit).to_pylist())
+
+    def _with_accounts(self, rows):
+        account_ids = {row['account_id'] for row in rows}
+        owners = {}
+        for chunk in _chunks(account_ids):
+            owners.update((account_id, (number, username)) for account_id, number, username in self.db.session.execute(
+                select(self.Account.id, self.Account.account_number, self.User.username)
+                .join(self.User, self.User.id == self.Account.user_id)
+                .where(self.Account.id.in_(chunk))
+            ))
+        results = []
+        for row in rows:
+            account_number, username = owners.get(row['account_id'], (None, None))
+            results.append(SimpleNamespace(**row, account_number=account_number, username=username, archived=True))
+        return results
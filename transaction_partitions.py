@@ -0,0 +1,194 @@
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+DEFAULT_PARTITION = 'transaction_default'
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"transaction_y{month.year:04d}m{month.month:02d}"
+
+
+# Bounds for dates in a query string; outside them ``to + 1 day`` overflows
+# and month by month walks run past year 1
+EARLIEST_DATE = datetime(1900, 1, 1)
+LATEST_DATE = datetime(2999, 12, 31)
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    day = datetime.strptime(value, '%Y-%m-%d')
+    if not EARLIEST_DATE <= day <= LATEST_DATE:
+        raise ValueError(f"Dates must be between {EARLIEST_DATE:%Y-%m-%d} and {LATEST_DATE:%Y-%m-%d}")
+    return day
+
+
+class Period(namedtuple('Period', 'start end')):
+    """Half-open ``[start, end)`` range of transaction timestamps; None is unbounded.
+
+    Reads that filter on it only touch the partitions the range covers.
+    """
+
+    @classmethod
+    def from_args(cls, args, default_months, today=None):
+        """``?from=YYYY-MM-DD&to=YYYY-MM-DD`` (both inclusive), or ``?months=N``
+        calendar months up to today (0 for everything); defaults to
+        ``default_months``. Raises ValueError for a malformed range or a
+        date outside ``EARLIEST_DATE``..``LATEST_DATE``.
+        """
+        start, end = _parse_date(args.get('from')), _parse_date(args.get('to'))
+        if end is not None:
+            end += timedelta(days=1)
+        if start is None and end is None:
+            months = args.get('months', default_months, type=int)
+            if months is None or months < 0:
+                raise ValueError("months must be a whole number of months")
+            this_month = month_start(today or date.today())
+            if months > (this_month.year - EARLIEST_DATE.year) * 12 + this_month.month:
+                raise ValueError(f"months must not reach back before {EARLIEST_DATE:%Y-%m-%d}")
+            if months:
+                # Whole months, so the range (and every cache key built from it) moves once a month
+                first = add_months(this_month, 1 - months)
+                start = datetime(first.year, first.month, 1)
+        if start is not None and end is not None and start >= end:
+            raise ValueError("The start of the period must be before its end")
+        return cls(start, end)
+
+    def filter(self, column):
+        conditions = []
+        if self.start is not None:
+            conditions.append(column >= self.start)
+        if self.end is not None:
+            conditions.append(column < self.end)
+        return conditions
+
+    @property
+    def key(self):
+        return '..'.join(day.strftime('%Y-%m-%d') if day else '' for day in self)
+
+    def args(self):
+        """Query arguments that select this period again (for links)"""
+        result = {}
+        if self.start is not None:
+            result['from'] = self.start.strftime('%Y-%m-%d')
+        if self.end is not None:
+            result['to'] = (self.end - timedelta(days=1)).strftime('%Y-%m-%d')
+        return result if result else {'months': 0}
+
+    def describe(self):
+        if self.start is None and self.end is None:
+            return 'All transactions'
+        if self.end is None:
+            return f"Since {self.start:%Y-%m-%d}"
+        last = self.end - timedelta(days=1)
+        if self.start is None:
+            return f"Up to {last:%Y-%m-%d}"
+        return f"{self.start:%Y-%m-%d} to {last:%Y-%m-%d}"
+
+
+class TransactionPartitions:
+    """Monthly range partitions of ``transaction`` on PostgreSQL.
+
+    The migration that partitions the table creates one partition per
+    month (``transaction_y2026m10``) plus ``transaction_default``, which
+    catches rows no partition covers yet. ``ensure_future()`` creates the
+    partitions for the coming ``months_ahead`` months, and for any month
+    that has rows waiting in the default partition, moving those rows
+    into place; run it daily (``flask create-partitions``). On other
+    databases, or before the migration has run, it does nothing.
+    """
+
+    def __init__(self, db, months_ahead=3):
+        self.db = db
+        self.months_ahead = months_ahead
+
+    def is_partitioned(self):
+        session = self.db.session
+        if session.get_bind().dialect.name != 'postgresql':
+            return False
+        return session.execute(text(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('\"transaction\"')"
+        )).first() is not None
+
+    def partitions(self):
+        """[{'name', 'bounds', 'rows'}, ...]; rows is the planner's estimate"""
+        if not self.is_partitioned():
+            return []
+        rows = self.db.session.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = '\"transaction\"'::regclass ORDER BY c.relname"
+        )).all()
+        return [{'name': name, 'bounds': bounds, 'rows': max(0, estimate)} for name, bounds, estimate in rows]
+
+    def ensure_future(self, months_ahead=None, today=None):
+        """Create missing partitions up to ``months_ahead`` months from now; returns their names.
+
+        Commits after each partition. Safe to run from several hosts at once.
+        """
+        if not self.is_partitioned():
+            return []
+        months_ahead = self.months_ahead if months_ahead is None else months_ahead
+        first = month_start(today or date.today())
+        wanted = {add_months(first, i) for i in range(months_ahead + 1)}
+        session = self.db.session
+        wanted.update(month_start(day) for (day,) in session.execute(text(
+            f'SELECT DISTINCT date_trunc(\'month\', "timestamp") FROM {DEFAULT_PARTITION} '
+            'WHERE "timestamp" IS NOT NULL'
+        )))
+        existing = {p['name'] for p in self.partitions()}
+        created = []
+        for month in sorted(wanted):
+            if partition_name(month) not in existing:
+                self._create(month)
+                created.append(partition_name(month))
+        return created
+
+    def _create(self, month):
+        session = self.db.session
+        name, lower, upper = partition_name(month), month, add_months(month, 1)
+        # One creator at a time; a second one finds the partition already there
+        session.execute(text("SELECT pg_advisory_xact_lock(hashtext('transaction_partitions'))"))
+        if session.execute(text("SELECT to_regclass(:name)"), {'name': name}).scalar() is not None:
+            session.commit()
+            return
+        bounds = f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        waiting = session.execute(text(
+            f'SELECT 1 FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :lower AND "timestamp" < :upper LIMIT 1'
+        ), {'lower': lower, 'upper': upper}).first()
+        if waiting is None:
+            session.execute(text(f'CREATE TABLE {name} PARTITION OF "transaction" {bounds}'))
+        else:
+            # The default partition may not hold rows of a new partition's range,
+            # so it is detached while they move (this locks the table briefly)
+            columns = ', '.join(f'"{c}"' for c in self._columns())
+            in_range = '"timestamp" >= :lower AND "timestamp" < :upper'
+            session.execute(text(f'ALTER TABLE "transaction" DETACH PARTITION {DEFAULT_PARTITION}'))
+            session.execute(text(f'CREATE TABLE {name} PARTITION OF "transaction" {bounds}'))
+            moved = session.execute(text(
+                f'INSERT INTO "transaction" ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} WHERE {in_range}'
+            ), {'lower': lower, 'upper': upper}).rowcount
+            session.execute(text(f'DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}'),
+                            {'lower': lower, 'upper': upper})
+            session.execute(text(f'ALTER TABLE "transaction" ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT'))
+            print(f"Moved {moved} transactions from {DEFAULT_PARTITION} into {name}")
+        session.commit()
+
+    def _columns(self):
+        """Columns that can be copied (generated ones like search_vector are recomputed)"""
+        return self.db.session.execute(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'transaction' AND is_generated = 'NEVER' "
+            "ORDER BY ordinal_position"
+        )).scalars().all()
@@ -0,0 +1,206 @@
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import and_, column, func, literal_column, or_, table, text
+
+FTS_TABLE = 'transaction_fts'
+
+# External-content FTS5 index over transaction text columns. Triggers keep it
+# in sync with every write, including Core bulk inserts that skip the ORM.
+SQLITE_FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        description, location, ip_address,
+        content='transaction', content_rowid='id', tokenize='unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, location, ip_address)
+        VALUES (new.id, new.description, new.location, new.ip_address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, location, ip_address)
+        VALUES ('delete', old.id, old.description, old.location, old.ip_address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF description, location, ip_address
+        ON "transaction" BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, location, ip_address)
+        VALUES ('delete', old.id, old.description, old.location, old.ip_address);
+        INSERT INTO {FTS_TABLE}(rowid, description, location, ip_address)
+        VALUES (new.id, new.description, new.location, new.ip_address);
+    END""",
+)
+
+# A stored generated column is maintained by PostgreSQL itself on insert/update
+POSTGRES_FTS_DDL = (
+    """ALTER TABLE "transaction" ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple',
+            coalesce(description, '') || ' ' || coalesce(location, '') || ' ' || coalesce(ip_address, '')
+        )) STORED""",
+    """CREATE INDEX IF NOT EXISTS ix_transaction_search_vector ON "transaction" USING gin (search_vector)""",
+)
+
+MAX_PER_PAGE = 100
+# Deep OFFSETs re-rank everything before them; investigators should narrow the filters instead
+MAX_OFFSET = 10000
+
+
+class SearchError(ValueError):
+    pass
+
+
+def fts5_query(text_query):
+    """Turn free text into an FTS5 query of quoted terms (implicit AND).
+
+    Quoting keeps user input from being parsed as FTS5 syntax; the last
+    term is a prefix match so partial words still find results.
+    """
+    terms = re.findall(r"[\w.@:-]+", text_query or '')
+    if not terms:
+        return None
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+class TransactionSearch:
+    """Ranked full-text plus attribute search over transactions.
+
+    Free text goes to FTS5 on SQLite or a GIN-indexed tsvector on
+    PostgreSQL (plain LIKE elsewhere); account, amount, IP, type and date
+    filters are answered from B-tree indexes on ``transaction``. With an
+    ``archive`` (a ``TransactionArchive``), archived transactions in the
+    searched range follow the live ones, unranked.
+    """
+
+    def __init__(self, db, Transaction, Account, archive=None):
+        self.db = db
+        self.Transaction = Transaction
+        self.Account = Account
+        self.archive = archive
+
+    def ensure_index(self):
+        """Create the full-text index if missing (for databases made with create_all)"""
+        dialect = self.db.engine.dialect.name
+        with self.db.engine.begin() as conn:
+            if dialect == 'sqlite':
+                exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                                      {'name': FTS_TABLE}).first()
+                for statement in SQLITE_FTS_DDL:
+                    conn.exec_driver_sql(statement)
+                if not exists:
+                    # Index rows written before the triggers existed
+                    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            elif dialect == 'postgresql':
+                for statement in POSTGRES_FTS_DDL:
+                    conn.exec_driver_sql(statement)
+
+    @contextmanager
+    def bulk_load(self):
+        """Defer full-text indexing of rows inserted inside the block.
+
+        On SQLite the per-row insert trigger is dropped for the duration and
+        the new rows are indexed with one INSERT ... SELECT afterwards, which
+        is several times faster for millions of rows. PostgreSQL maintains
+        its generated column itself, so nothing changes there.
+        """
+        if self.db.engine.dialect.name != 'sqlite' or not self._has_sqlite_index():
+            yield
+            return
+        with self.db.engine.begin() as conn:
+            last_id = conn.exec_driver_sql('SELECT COALESCE(MAX(id), 0) FROM "transaction"').scalar()
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai")
+        try:
+            yield
+        finally:
+            with self.db.engine.begin() as conn:
+                conn.exec_driver_sql(SQLITE_FTS_DDL[1])
+                conn.exec_driver_sql(
+                    f"""INSERT INTO {FTS_TABLE}(rowid, description, location, ip_address)
+                    SELECT id, description, location, ip_address FROM "transaction" WHERE id > ?""",
+                    (last_id,)
+                )
+
+    def _has_sqlite_index(self):
+        with self.db.engine.connect() as conn:
+            return conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                                {'name': FTS_TABLE}).first() is not None
+
+    def search(self, q=None, account_id=None, min_amount=None, max_amount=None, ip_address=None,
+               transaction_type=None, since=None, until=None, page=1, per_page=25):
+        """Return ``(rows, has_more)``; rows are ``(Transaction, account_number, score)``"""
+        Transaction, Account = self.Transaction, self.Account
+        per_page = min(max(per_page, 1), MAX_PER_PAGE)
+        offset = (max(page, 1) - 1) * per_page
+        if offset > MAX_OFFSET:
+            raise SearchError(f"Results past {MAX_OFFSET} are not available; narrow the search")
+
+        score = literal_column('NULL')
+        query = self.db.session.query(Transaction, Account.account_number, score)\
+            .join(Account, Transaction.account_id == Account.id)
+
+        ranked = False
+        if q and q.strip():
+            query, score = self._match(query, q.strip())
+            ranked = score is not None
+            if ranked:
+                query = query.with_entities(Transaction, Account.account_number, score.label('score'))
+
+        if account_id is not None:
+            query = query.filter(Transaction.account_id == account_id)
+        if min_amount is not None or max_amount is not None:
+            # Debits are stored negative; match the range against either sign
+            # as two index ranges rather than abs(), which no index can serve
+            low = min_amount or 0.0
+            credits, debits = [Transaction.amount >= low], [Transaction.amount <= -low]
+            if max_amount is not None:
+                credits.append(Transaction.amount <= max_amount)
+                debits.append(Transaction.amount >= -max_amount)
+            query = query.filter(or_(and_(*credits), and_(*debits)))
+        if ip_address:
+            query = query.filter(Transaction.ip_address == ip_address)
+        if transaction_type:
+            query = query.filter(Transaction.transaction_type == transaction_type)
+        if since is not None:
+            query = query.filter(Transaction.timestamp >= since)
+        if until is not None:
+            query = query.filter(Transaction.timestamp < until)
+
+        if ranked:
+            order = score.asc() if self.db.engine.dialect.name == 'sqlite' else score.desc()
+            query = query.order_by(order, Transaction.id.desc())
+        else:
+            query = query.order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+
+        rows = query.offset(offset).limit(per_page + 1).all()
+        if len(rows) <= per_page and self.archive is not None and self.archive.covers(since, until):
+            # Archived rows come after every live row, so only the last pages need them
+            live = offset + len(rows) if rows else query.order_by(None).count()
+            skip = max(0, offset - live)
+            archived = self.archive.search(
+                q=q, account_id=account_id, min_amount=min_amount, max_amount=max_amount, ip_address=ip_address,
+                transaction_type=transaction_type, since=since, until=until, limit=skip + per_page + 1 - len(rows)
+            )
+            rows += [(t, t.account_number, None) for t in archived[skip:]]
+        return rows[:per_page], len(rows) > per_page
+
+    def _match(self, query, q):
+        Transaction = self.Transaction
+        dialect = self.db.engine.dialect.name
+        if dialect == 'sqlite':
+            match = fts5_query(q)
+            if match is None:
+                raise SearchError("Search text has no searchable words")
+            fts = table(FTS_TABLE, column('rowid'))
+            query = query.join(fts, fts.c.rowid == Transaction.id)\
+                .filter(literal_column(FTS_TABLE).op('MATCH')(match))
+            # bm25() is lower for better matches
+            return query, func.bm25(literal_column(FTS_TABLE))
+        if dialect == 'postgresql':
+            vector = literal_column('"transaction".search_vector')
+            tsquery = func.websearch_to_tsquery('simple', q)
+            return query.filter(vector.op('@@')(tsquery)), func.ts_rank_cd(vector, tsquery)
+        pattern = f"%{q}%"
+        return query.filter(or_(
+            Transaction.description.ilike(pattern),
+            Transaction.location.ilike(pattern),
+            Transaction.ip_address.ilike(pattern),
+        )), None